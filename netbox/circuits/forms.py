@@ -1,7 +1,6 @@
 from __future__ import unicode_literals
 
 from django import forms
-from django.db.models import Count
 
 from dcim.models import Site, Device, Interface, Rack
 from extras.forms import CustomFieldForm, CustomFieldBulkEditForm, CustomFieldFilterForm
@@ -154,20 +153,24 @@ class CircuitFilterForm(BootstrapMixin, CustomFieldFilterForm):
     model = Circuit
     q = forms.CharField(required=False, label='Search')
     type = FilterChoiceField(
-        queryset=CircuitType.objects.annotate(filter_count=Count('circuits')),
+        queryset=CircuitType.objects.all(),
+        filter_count='circuits',
         to_field_name='slug'
     )
     provider = FilterChoiceField(
-        queryset=Provider.objects.annotate(filter_count=Count('circuits')),
+        queryset=Provider.objects.all(),
+        filter_count='circuits',
         to_field_name='slug'
     )
     tenant = FilterChoiceField(
-        queryset=Tenant.objects.annotate(filter_count=Count('circuits')),
+        queryset=Tenant.objects.all(),
+        filter_count='circuits',
         to_field_name='slug',
         null_option=(0, 'None')
     )
     site = FilterChoiceField(
-        queryset=Site.objects.annotate(filter_count=Count('circuit_terminations')),
+        queryset=Site.objects.all(),
+        filter_count='circuit_terminations',
         to_field_name='slug'
     )
 
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2017-08-21 14:02
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circuits', '0009_unicode_literals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='circuit',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='provider',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='circuit',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='circuits_circuit_cf_data_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='provider',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='circuits_provider_cf_data_gin'),
+        ),
+    ]
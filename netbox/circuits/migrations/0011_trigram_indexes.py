@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Trigram indexes supporting case-insensitive substring searches (see utilities.lookups.ILikeContains)
+TRIGRAM_INDEXES_SQL = [
+    'CREATE INDEX circuits_provider_name_trgm ON circuits_provider USING gin (name gin_trgm_ops)',
+    'CREATE INDEX circuits_provider_account_trgm ON circuits_provider USING gin (account gin_trgm_ops)',
+    'CREATE INDEX circuits_provider_noc_contact_trgm ON circuits_provider USING gin (noc_contact gin_trgm_ops)',
+    'CREATE INDEX circuits_provider_admin_contact_trgm ON circuits_provider USING gin (admin_contact gin_trgm_ops)',
+    'CREATE INDEX circuits_provider_comments_trgm ON circuits_provider USING gin (comments gin_trgm_ops)',
+    'CREATE INDEX circuits_circuit_cid_trgm ON circuits_circuit USING gin (cid gin_trgm_ops)',
+    'CREATE INDEX circuits_circuit_description_trgm ON circuits_circuit USING gin (description gin_trgm_ops)',
+    'CREATE INDEX circuits_circuit_comments_trgm ON circuits_circuit USING gin (comments gin_trgm_ops)',
+    'CREATE INDEX circuits_circuittermination_xconnect_id_trgm ON circuits_circuittermination USING gin (xconnect_id gin_trgm_ops)',
+    'CREATE INDEX circuits_circuittermination_pp_info_trgm ON circuits_circuittermination USING gin (pp_info gin_trgm_ops)',
+]
+DROP_TRIGRAM_INDEXES_SQL = [
+    'DROP INDEX circuits_provider_name_trgm',
+    'DROP INDEX circuits_provider_account_trgm',
+    'DROP INDEX circuits_provider_noc_contact_trgm',
+    'DROP INDEX circuits_provider_admin_contact_trgm',
+    'DROP INDEX circuits_provider_comments_trgm',
+    'DROP INDEX circuits_circuit_cid_trgm',
+    'DROP INDEX circuits_circuit_description_trgm',
+    'DROP INDEX circuits_circuit_comments_trgm',
+    'DROP INDEX circuits_circuittermination_xconnect_id_trgm',
+    'DROP INDEX circuits_circuittermination_pp_info_trgm',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circuits', '0010_custom_field_data'),
+        # Creates the pg_trgm extension
+        ('extras', '0010_searchentry'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=TRIGRAM_INDEXES_SQL, reverse_sql=DROP_TRIGRAM_INDEXES_SQL),
+    ]
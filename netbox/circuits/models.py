@@ -1,6 +1,8 @@
 from __future__ import unicode_literals
 
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.urls import reverse
 from django.utils.encoding import python_2_unicode_compatible
@@ -44,11 +46,13 @@ class Provider(CreatedUpdatedModel, CustomFieldModel):
     admin_contact = models.TextField(blank=True, verbose_name='Admin contact')
     comments = models.TextField(blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
 
     csv_headers = ['name', 'slug', 'asn', 'account', 'portal_url']
 
     class Meta:
         ordering = ['name']
+        indexes = [GinIndex(fields=['custom_field_data'], name='circuits_provider_cf_data_gin')]
 
     def __str__(self):
         return self.name
@@ -101,12 +105,15 @@ class Circuit(CreatedUpdatedModel, CustomFieldModel):
     description = models.CharField(max_length=100, blank=True)
     comments = models.TextField(blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
 
     csv_headers = ['cid', 'provider', 'type', 'tenant', 'install_date', 'commit_rate', 'description']
+    csv_related_fields = ['provider', 'type', 'tenant']
 
     class Meta:
         ordering = ['provider', 'cid']
         unique_together = ['provider', 'cid']
+        indexes = [GinIndex(fields=['custom_field_data'], name='circuits_circuit_cf_data_gin')]
 
     def __str__(self):
         return '{} {}'.format(self.provider, self.cid)
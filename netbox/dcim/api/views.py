@@ -1,12 +1,11 @@
 from __future__ import unicode_literals
 from collections import OrderedDict
 
-from rest_framework.decorators import detail_route
+from rest_framework.decorators import detail_route, list_route
 from rest_framework.mixins import ListModelMixin
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, ModelViewSet, ViewSet
 
-from django.conf import settings
 from django.http import HttpResponseBadRequest, HttpResponseForbidden
 from django.shortcuts import get_object_or_404
 
@@ -14,13 +13,17 @@ from dcim.models import (
     ConsolePort, ConsolePortTemplate, ConsoleServerPort, ConsoleServerPortTemplate, Device, DeviceBay,
     DeviceBayTemplate, DeviceRole, DeviceType, Interface, InterfaceConnection, InterfaceTemplate, Manufacturer,
     InventoryItem, Platform, PowerOutlet, PowerOutletTemplate, PowerPort, PowerPortTemplate, Rack, RackGroup,
-    RackReservation, RackRole, Region, Site,
+    RackReservation, RackRole, Region, Site, SYNC_COMPONENTS_PERMISSIONS,
 )
 from dcim import filters
+from dcim.jobs import execute_napalm_methods
 from extras.api.serializers import RenderedGraphSerializer
-from extras.api.views import CustomFieldModelViewSet
+from extras.api.views import background_requested, CustomFieldModelViewSet, enqueue_job
 from extras.models import Graph, GRAPH_TYPE_INTERFACE, GRAPH_TYPE_SITE
-from utilities.api import IsAuthenticatedOrLoginNotRequired, ServiceUnavailable, WritableSerializerMixin
+from extras.rollups import get_stats
+from utilities.api import (
+    IsAuthenticatedOrLoginNotRequired, KeysetPagination, ServiceUnavailable, WritableSerializerMixin,
+)
 from .exceptions import MissingFilterException
 from . import serializers
 
@@ -35,6 +38,14 @@ class RegionViewSet(WritableSerializerMixin, ModelViewSet):
     write_serializer_class = serializers.WritableRegionSerializer
     filter_class = filters.RegionFilter
 
+    @detail_route()
+    def stats(self, request, pk=None):
+        """
+        Object counts for all sites within a region, including those of its child regions.
+        """
+        region = get_object_or_404(Region, pk=pk)
+        return Response(get_stats(region))
+
 
 #
 # Sites
@@ -56,6 +67,14 @@ class SiteViewSet(WritableSerializerMixin, CustomFieldModelViewSet):
         serializer = RenderedGraphSerializer(queryset, many=True, context={'graphed_object': site})
         return Response(serializer.data)
 
+    @detail_route()
+    def stats(self, request, pk=None):
+        """
+        Counts of the objects assigned to a site.
+        """
+        site = get_object_or_404(Site, pk=pk)
+        return Response(get_stats(site))
+
 
 #
 # Rack groups
@@ -144,6 +163,22 @@ class DeviceTypeViewSet(WritableSerializerMixin, CustomFieldModelViewSet):
     write_serializer_class = serializers.WritableDeviceTypeSerializer
     filter_class = filters.DeviceTypeFilter
 
+    @detail_route(methods=['post'], url_path='sync-components')
+    def sync_components(self, request, pk=None):
+        """
+        Create any components missing from existing instances of a DeviceType per its component templates.
+        """
+        devicetype = get_object_or_404(DeviceType, pk=pk)
+
+        # Verify user permission
+        if not request.user.has_perms(SYNC_COMPONENTS_PERMISSIONS):
+            return HttpResponseForbidden()
+
+        created = devicetype.sync_components()
+        return Response(OrderedDict([
+            (model._meta.model_name, count) for model, count in created.items()
+        ]))
+
 
 #
 # Device type components
@@ -265,25 +300,17 @@ class DeviceViewSet(WritableSerializerMixin, CustomFieldModelViewSet):
             elif not method.startswith('get_'):
                 return HttpResponseBadRequest("Unsupported NAPALM method: {}".format(method))
 
+        # Optionally defer the connection to a background worker; the job's result holds the response
+        if background_requested(request):
+            return enqueue_job(request, 'dcim.napalm', pk=device.pk, methods=napalm_methods)
+
         # Connect to the device and execute the requested methods
         # TODO: Improve error handling
-        response = OrderedDict([(m, None) for m in napalm_methods])
-        ip_address = str(device.primary_ip.address.ip)
-        d = driver(
-            hostname=ip_address,
-            username=settings.NAPALM_USERNAME,
-            password=settings.NAPALM_PASSWORD,
-            timeout=settings.NAPALM_TIMEOUT,
-            optional_args=settings.NAPALM_ARGS
-        )
         try:
-            d.open()
-            for method in napalm_methods:
-                response[method] = getattr(d, method)()
+            response = execute_napalm_methods(device, napalm_methods)
         except Exception as e:
-            raise ServiceUnavailable("Error connecting to the device at {}: {}".format(ip_address, e))
+            raise ServiceUnavailable("Error connecting to the device at {}: {}".format(device.primary_ip.address.ip, e))
 
-        d.close()
         return Response(response)
 
 
@@ -335,6 +362,31 @@ class InterfaceViewSet(WritableSerializerMixin, ModelViewSet):
         serializer = RenderedGraphSerializer(queryset, many=True, context={'graphed_object': interface})
         return Response(serializer.data)
 
+    @list_route(url_path='graphs', url_name='bulk-graphs')
+    def bulk_graphs(self, request):
+        """
+        Render graphs for many interfaces in a single request. Interfaces are filtered and paginated as for the list
+        endpoint, and each is returned along with its rendered graphs.
+        """
+        graphs = list(Graph.objects.filter(type=GRAPH_TYPE_INTERFACE))
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        interfaces = page if page is not None else queryset
+
+        data = []
+        for interface in interfaces:
+            serializer = RenderedGraphSerializer(graphs, many=True, context={'graphed_object': interface})
+            data.append(OrderedDict((
+                ('id', interface.pk),
+                ('device', interface.device_id),
+                ('name', interface.name),
+                ('graphs', serializer.data),
+            )))
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
 
 class DeviceBayViewSet(WritableSerializerMixin, ModelViewSet):
     queryset = DeviceBay.objects.select_related('installed_device')
@@ -358,12 +410,14 @@ class ConsoleConnectionViewSet(ListModelMixin, GenericViewSet):
     queryset = ConsolePort.objects.select_related('device', 'cs_port__device').filter(cs_port__isnull=False)
     serializer_class = serializers.ConsolePortSerializer
     filter_class = filters.ConsoleConnectionFilter
+    pagination_class = KeysetPagination
 
 
 class PowerConnectionViewSet(ListModelMixin, GenericViewSet):
     queryset = PowerPort.objects.select_related('device', 'power_outlet__device').filter(power_outlet__isnull=False)
     serializer_class = serializers.PowerPortSerializer
     filter_class = filters.PowerConnectionFilter
+    pagination_class = KeysetPagination
 
 
 class InterfaceConnectionViewSet(WritableSerializerMixin, ModelViewSet):
@@ -371,6 +425,7 @@ class InterfaceConnectionViewSet(WritableSerializerMixin, ModelViewSet):
     serializer_class = serializers.InterfaceConnectionSerializer
     write_serializer_class = serializers.WritableInterfaceConnectionSerializer
     filter_class = filters.InterfaceConnectionFilter
+    pagination_class = KeysetPagination
 
 
 #
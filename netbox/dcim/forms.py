@@ -5,17 +5,17 @@ import re
 
 from django import forms
 from django.contrib.postgres.forms.array import SimpleArrayField
-from django.db.models import Count, Q
 
+from extras.choicecounts import get_value_counts
 from extras.forms import CustomFieldForm, CustomFieldBulkEditForm, CustomFieldFilterForm
 from ipam.models import IPAddress
 from tenancy.forms import TenancyForm
 from tenancy.models import Tenant
 from utilities.forms import (
-    APISelect, add_blank_choice, ArrayFieldSelectMultiple, BootstrapMixin, BulkEditForm, BulkEditNullBooleanSelect,
-    ChainedFieldsMixin, ChainedModelChoiceField, CommentField, ConfirmationForm, CSVChoiceField, ExpandableNameField,
-    FilterChoiceField, FlexibleModelChoiceField, Livesearch, SelectWithDisabled, SmallTextarea, SlugField,
-    FilterTreeNodeMultipleChoiceField,
+    APISelect, APISelectMultiple, add_blank_choice, ArrayFieldSelectMultiple, BootstrapMixin, BulkEditForm,
+    BulkEditNullBooleanSelect, ChainedFieldsMixin, ChainedModelChoiceField, CommentField, ConfirmationForm,
+    CSVChoiceField, CSVLookupMixin, ExpandableNameField, FilterChoiceField, FlexibleModelChoiceField, Livesearch,
+    SelectWithDisabled, SmallTextarea, SlugField, FilterTreeNodeMultipleChoiceField,
 )
 from .formfields import MACAddressFormField
 from .models import (
@@ -145,12 +145,14 @@ class SiteFilterForm(BootstrapMixin, CustomFieldFilterForm):
     model = Site
     q = forms.CharField(required=False, label='Search')
     region = FilterTreeNodeMultipleChoiceField(
-        queryset=Region.objects.annotate(filter_count=Count('sites')),
+        queryset=Region.objects.all(),
+        filter_count='sites',
         to_field_name='slug',
         required=False,
     )
     tenant = FilterChoiceField(
-        queryset=Tenant.objects.annotate(filter_count=Count('sites')),
+        queryset=Tenant.objects.all(),
+        filter_count='sites',
         to_field_name='slug',
         null_option=(0, 'None')
     )
@@ -169,7 +171,7 @@ class RackGroupForm(BootstrapMixin, forms.ModelForm):
 
 
 class RackGroupFilterForm(BootstrapMixin, forms.Form):
-    site = FilterChoiceField(queryset=Site.objects.annotate(filter_count=Count('rack_groups')), to_field_name='slug')
+    site = FilterChoiceField(queryset=Site.objects.all(), filter_count='rack_groups', to_field_name='slug')
 
 
 #
@@ -307,21 +309,25 @@ class RackFilterForm(BootstrapMixin, CustomFieldFilterForm):
     model = Rack
     q = forms.CharField(required=False, label='Search')
     site = FilterChoiceField(
-        queryset=Site.objects.annotate(filter_count=Count('racks')),
+        queryset=Site.objects.all(),
+        filter_count='racks',
         to_field_name='slug'
     )
     group_id = FilterChoiceField(
-        queryset=RackGroup.objects.select_related('site').annotate(filter_count=Count('racks')),
+        queryset=RackGroup.objects.select_related('site'),
+        filter_count='racks',
         label='Rack group',
         null_option=(0, 'None')
     )
     tenant = FilterChoiceField(
-        queryset=Tenant.objects.annotate(filter_count=Count('racks')),
+        queryset=Tenant.objects.all(),
+        filter_count='racks',
         to_field_name='slug',
         null_option=(0, 'None')
     )
     role = FilterChoiceField(
-        queryset=RackRole.objects.annotate(filter_count=Count('racks')),
+        queryset=RackRole.objects.all(),
+        filter_count='racks',
         to_field_name='slug',
         null_option=(0, 'None')
     )
@@ -358,11 +364,13 @@ class RackReservationForm(BootstrapMixin, forms.ModelForm):
 class RackReservationFilterForm(BootstrapMixin, forms.Form):
     q = forms.CharField(required=False, label='Search')
     site = FilterChoiceField(
-        queryset=Site.objects.annotate(filter_count=Count('racks__reservations')),
+        queryset=Site.objects.all(),
+        filter_count='racks__reservations',
         to_field_name='slug'
     )
     group_id = FilterChoiceField(
-        queryset=RackGroup.objects.select_related('site').annotate(filter_count=Count('racks__reservations')),
+        queryset=RackGroup.objects.select_related('site'),
+        filter_count='racks__reservations',
         label='Rack group',
         null_option=(0, 'None')
     )
@@ -418,7 +426,8 @@ class DeviceTypeFilterForm(BootstrapMixin, CustomFieldFilterForm):
     model = DeviceType
     q = forms.CharField(required=False, label='Search')
     manufacturer = FilterChoiceField(
-        queryset=Manufacturer.objects.annotate(filter_count=Count('device_types')),
+        queryset=Manufacturer.objects.all(),
+        filter_count='device_types',
         to_field_name='slug'
     )
     is_console_server = forms.BooleanField(
@@ -690,8 +699,8 @@ class DeviceForm(BootstrapMixin, TenancyForm, CustomFieldForm):
             self.initial['rack'] = self.instance.parent_bay.device.rack_id
 
 
-class BaseDeviceCSVForm(forms.ModelForm):
-    device_role = forms.ModelChoiceField(
+class BaseDeviceCSVForm(CSVLookupMixin, forms.ModelForm):
+    device_role = FlexibleModelChoiceField(
         queryset=DeviceRole.objects.all(),
         to_field_name='name',
         help_text='Name of assigned role',
@@ -699,7 +708,7 @@ class BaseDeviceCSVForm(forms.ModelForm):
             'invalid_choice': 'Invalid device role.',
         }
     )
-    tenant = forms.ModelChoiceField(
+    tenant = FlexibleModelChoiceField(
         queryset=Tenant.objects.all(),
         required=False,
         to_field_name='name',
@@ -708,7 +717,7 @@ class BaseDeviceCSVForm(forms.ModelForm):
             'invalid_choice': 'Tenant not found.',
         }
     )
-    manufacturer = forms.ModelChoiceField(
+    manufacturer = FlexibleModelChoiceField(
         queryset=Manufacturer.objects.all(),
         to_field_name='name',
         help_text='Device type manufacturer',
@@ -719,7 +728,7 @@ class BaseDeviceCSVForm(forms.ModelForm):
     model_name = forms.CharField(
         help_text='Device type model name'
     )
-    platform = forms.ModelChoiceField(
+    platform = FlexibleModelChoiceField(
         queryset=Platform.objects.all(),
         required=False,
         to_field_name='name',
@@ -740,6 +749,18 @@ class BaseDeviceCSVForm(forms.ModelForm):
             'name': 'Device name',
         }
 
+    @classmethod
+    def load_lookup_cache(cls, records, cache):
+
+        super(BaseDeviceCSVForm, cls).load_lookup_cache(records, cache)
+
+        device_types = []
+        for record in records:
+            manufacturer = cls.get_cached_object(cache, record, 'manufacturer')
+            if manufacturer is not None:
+                device_types.append((manufacturer.pk, record.get('model_name')))
+        cache.load('device_type', DeviceType.objects.all(), ['manufacturer_id', 'model'], device_types)
+
     def clean(self):
 
         super(BaseDeviceCSVForm, self).clean()
@@ -750,13 +771,13 @@ class BaseDeviceCSVForm(forms.ModelForm):
         # Validate device type
         if manufacturer and model_name:
             try:
-                self.instance.device_type = DeviceType.objects.get(manufacturer=manufacturer, model=model_name)
+                self.instance.device_type = self.lookup_cache.get('device_type', (manufacturer.pk, model_name))
             except DeviceType.DoesNotExist:
                 raise forms.ValidationError("Device type {} {} not found".format(manufacturer, model_name))
 
 
 class DeviceCSVForm(BaseDeviceCSVForm):
-    site = forms.ModelChoiceField(
+    site = FlexibleModelChoiceField(
         queryset=Site.objects.all(),
         to_field_name='name',
         help_text='Name of parent site',
@@ -784,6 +805,19 @@ class DeviceCSVForm(BaseDeviceCSVForm):
             'site', 'rack_group', 'rack_name', 'position', 'face',
         ]
 
+    @classmethod
+    def load_lookup_cache(cls, records, cache):
+
+        super(DeviceCSVForm, cls).load_lookup_cache(records, cache)
+
+        # Rack names are unique per site; the group is validated in clean()
+        racks = []
+        for record in records:
+            site = cls.get_cached_object(cache, record, 'site')
+            if site is not None:
+                racks.append((site.pk, record.get('rack_name')))
+        cache.load('rack', Rack.objects.select_related('group'), ['site_id', 'name'], racks)
+
     def clean(self):
 
         super(DeviceCSVForm, self).clean()
@@ -793,21 +827,24 @@ class DeviceCSVForm(BaseDeviceCSVForm):
         rack_name = self.cleaned_data.get('rack_name')
 
         # Validate rack
-        if site and rack_group and rack_name:
+        if site and rack_name:
             try:
-                self.instance.rack = Rack.objects.get(site=site, group__name=rack_group, name=rack_name)
-            except Rack.DoesNotExist:
-                raise forms.ValidationError("Rack {} not found in site {} group {}".format(rack_name, site, rack_group))
-        elif site and rack_name:
-            try:
-                self.instance.rack = Rack.objects.get(site=site, group__isnull=True, name=rack_name)
+                rack = self.lookup_cache.get('rack', (site.pk, rack_name))
             except Rack.DoesNotExist:
+                rack = None
+            if rack_group:
+                if rack is None or rack.group is None or rack.group.name != rack_group:
+                    raise forms.ValidationError(
+                        "Rack {} not found in site {} group {}".format(rack_name, site, rack_group)
+                    )
+            elif rack is None or rack.group is not None:
                 raise forms.ValidationError("Rack {} not found in site {} (no group)".format(rack_name, site))
+            self.instance.rack = rack
 
 
 class ChildDeviceCSVForm(BaseDeviceCSVForm):
     parent = FlexibleModelChoiceField(
-        queryset=Device.objects.all(),
+        queryset=Device.objects.select_related('site', 'rack'),
         to_field_name='name',
         help_text='Name or ID of parent device',
         error_messages={
@@ -824,6 +861,18 @@ class ChildDeviceCSVForm(BaseDeviceCSVForm):
             'parent', 'device_bay_name',
         ]
 
+    @classmethod
+    def load_lookup_cache(cls, records, cache):
+
+        super(ChildDeviceCSVForm, cls).load_lookup_cache(records, cache)
+
+        device_bays = []
+        for record in records:
+            parent = cls.get_cached_object(cache, record, 'parent')
+            if parent is not None:
+                device_bays.append((parent.pk, record.get('device_bay_name')))
+        cache.load('device_bay', DeviceBay.objects.all(), ['device_id', 'name'], device_bays)
+
     def clean(self):
 
         super(ChildDeviceCSVForm, self).clean()
@@ -834,13 +883,25 @@ class ChildDeviceCSVForm(BaseDeviceCSVForm):
         # Validate device bay
         if parent and device_bay_name:
             try:
-                self.instance.parent_bay = DeviceBay.objects.get(device=parent, name=device_bay_name)
+                self.instance.parent_bay = self.lookup_cache.get('device_bay', (parent.pk, device_bay_name))
                 # Inherit site and rack from parent device
                 self.instance.site = parent.site
                 self.instance.rack = parent.rack
             except DeviceBay.DoesNotExist:
                 raise forms.ValidationError("Parent device/bay ({} {}) not found".format(parent, device_bay_name))
 
+    def save(self, commit=True):
+
+        device = super(ChildDeviceCSVForm, self).save(commit)
+
+        # Save the reverse relation to the parent device bay
+        if commit:
+            device_bay = device.parent_bay
+            device_bay.installed_device = device
+            device_bay.save()
+
+        return device
+
 
 class DeviceBulkEditForm(BootstrapMixin, CustomFieldBulkEditForm):
     pk = forms.ModelMultipleChoiceField(queryset=Device.objects.all(), widget=forms.MultipleHiddenInput)
@@ -856,9 +917,7 @@ class DeviceBulkEditForm(BootstrapMixin, CustomFieldBulkEditForm):
 
 
 def device_status_choices():
-    status_counts = {}
-    for status in Device.objects.values('status').annotate(count=Count('status')).order_by('status'):
-        status_counts[status['status']] = status['count']
+    status_counts = get_value_counts(Device, 'status')
     return [(s[0], '{} ({})'.format(s[1], status_counts.get(s[0], 0))) for s in STATUS_CHOICES]
 
 
@@ -866,36 +925,45 @@ class DeviceFilterForm(BootstrapMixin, CustomFieldFilterForm):
     model = Device
     q = forms.CharField(required=False, label='Search')
     site = FilterChoiceField(
-        queryset=Site.objects.annotate(filter_count=Count('devices')),
+        queryset=Site.objects.all(),
+        filter_count='devices',
         to_field_name='slug',
     )
     rack_group_id = FilterChoiceField(
-        queryset=RackGroup.objects.select_related('site').annotate(filter_count=Count('racks__devices')),
+        queryset=RackGroup.objects.select_related('site'),
+        filter_count='racks__devices',
         label='Rack group',
     )
     rack_id = FilterChoiceField(
-        queryset=Rack.objects.annotate(filter_count=Count('devices')),
+        queryset=Rack.objects.all(),
         label='Rack',
         null_option=(0, 'None'),
+        widget=APISelectMultiple(
+            api_url='/api/dcim/racks/?limit=1000',
+            display_field='display_name',
+            attrs={'size': 6},
+        ),
     )
     role = FilterChoiceField(
-        queryset=DeviceRole.objects.annotate(filter_count=Count('devices')),
+        queryset=DeviceRole.objects.all(),
+        filter_count='devices',
         to_field_name='slug',
     )
     tenant = FilterChoiceField(
-        queryset=Tenant.objects.annotate(filter_count=Count('devices')),
+        queryset=Tenant.objects.all(),
+        filter_count='devices',
         to_field_name='slug',
         null_option=(0, 'None'),
     )
     manufacturer_id = FilterChoiceField(queryset=Manufacturer.objects.all(), label='Manufacturer')
     device_type_id = FilterChoiceField(
-        queryset=DeviceType.objects.select_related('manufacturer').order_by('model').annotate(
-            filter_count=Count('instances'),
-        ),
+        queryset=DeviceType.objects.select_related('manufacturer').order_by('model'),
+        filter_count='instances',
         label='Model',
     )
     platform = FilterChoiceField(
-        queryset=Platform.objects.annotate(filter_count=Count('devices')),
+        queryset=Platform.objects.all(),
+        filter_count='devices',
         to_field_name='slug',
         null_option=(0, 'None'),
     )
@@ -937,7 +1005,7 @@ class ConsolePortCreateForm(DeviceComponentForm):
     name_pattern = ExpandableNameField(label='Name')
 
 
-class ConsoleConnectionCSVForm(forms.ModelForm):
+class ConsoleConnectionCSVForm(CSVLookupMixin, forms.ModelForm):
     console_server = FlexibleModelChoiceField(
         queryset=Device.objects.filter(device_type__is_console_server=True),
         to_field_name='name',
@@ -969,6 +1037,25 @@ class ConsoleConnectionCSVForm(forms.ModelForm):
         model = ConsolePort
         fields = ['console_server', 'cs_port', 'device', 'console_port', 'connection_status']
 
+    @classmethod
+    def load_lookup_cache(cls, records, cache):
+
+        super(ConsoleConnectionCSVForm, cls).load_lookup_cache(records, cache)
+
+        cs_ports = []
+        console_ports = []
+        for record in records:
+            console_server = cls.get_cached_object(cache, record, 'console_server')
+            if console_server is not None:
+                cs_ports.append((console_server.pk, record.get('cs_port')))
+            device = cls.get_cached_object(cache, record, 'device')
+            if device is not None:
+                console_ports.append((device.pk, record.get('console_port')))
+        cache.load(
+            'cs_port', ConsoleServerPort.objects.select_related('connected_console'), ['device_id', 'name'], cs_ports
+        )
+        cache.load('console_port', ConsolePort.objects.all(), ['device_id', 'name'], console_ports)
+
     def clean_console_port(self):
 
         console_port_name = self.cleaned_data.get('console_port')
@@ -977,9 +1064,7 @@ class ConsoleConnectionCSVForm(forms.ModelForm):
 
         try:
             # Retrieve console port by name
-            consoleport = ConsolePort.objects.get(
-                device=self.cleaned_data['device'], name=console_port_name
-            )
+            consoleport = self.lookup_cache.get('console_port', (self.cleaned_data['device'].pk, console_port_name))
             # Check if the console port is already connected
             if consoleport.cs_port is not None:
                 raise forms.ValidationError("{} {} is already connected".format(
@@ -1001,11 +1086,9 @@ class ConsoleConnectionCSVForm(forms.ModelForm):
 
         try:
             # Retrieve console server port by name
-            cs_port = ConsoleServerPort.objects.get(
-                device=self.cleaned_data['console_server'], name=cs_port_name
-            )
-            # Check if the console server port is already connected
-            if ConsolePort.objects.filter(cs_port=cs_port).count():
+            cs_port = self.lookup_cache.get('cs_port', (self.cleaned_data['console_server'].pk, cs_port_name))
+            # Check if the console server port is already connected (or claimed by a previous record)
+            if hasattr(cs_port, 'connected_console') or not self.lookup_cache.claim('cs_port', cs_port.pk):
                 raise forms.ValidationError("{} {} is already connected".format(
                     self.cleaned_data['console_server'], cs_port_name
                 ))
@@ -1198,7 +1281,7 @@ class PowerPortCreateForm(DeviceComponentForm):
     name_pattern = ExpandableNameField(label='Name')
 
 
-class PowerConnectionCSVForm(forms.ModelForm):
+class PowerConnectionCSVForm(CSVLookupMixin, forms.ModelForm):
     pdu = FlexibleModelChoiceField(
         queryset=Device.objects.filter(device_type__is_pdu=True),
         to_field_name='name',
@@ -1230,6 +1313,25 @@ class PowerConnectionCSVForm(forms.ModelForm):
         model = PowerPort
         fields = ['pdu', 'power_outlet', 'device', 'power_port', 'connection_status']
 
+    @classmethod
+    def load_lookup_cache(cls, records, cache):
+
+        super(PowerConnectionCSVForm, cls).load_lookup_cache(records, cache)
+
+        power_outlets = []
+        power_ports = []
+        for record in records:
+            pdu = cls.get_cached_object(cache, record, 'pdu')
+            if pdu is not None:
+                power_outlets.append((pdu.pk, record.get('power_outlet')))
+            device = cls.get_cached_object(cache, record, 'device')
+            if device is not None:
+                power_ports.append((device.pk, record.get('power_port')))
+        cache.load(
+            'power_outlet', PowerOutlet.objects.select_related('connected_port'), ['device_id', 'name'], power_outlets
+        )
+        cache.load('power_port', PowerPort.objects.all(), ['device_id', 'name'], power_ports)
+
     def clean_power_port(self):
 
         power_port_name = self.cleaned_data.get('power_port')
@@ -1238,9 +1340,7 @@ class PowerConnectionCSVForm(forms.ModelForm):
 
         try:
             # Retrieve power port by name
-            powerport = PowerPort.objects.get(
-                device=self.cleaned_data['device'], name=power_port_name
-            )
+            powerport = self.lookup_cache.get('power_port', (self.cleaned_data['device'].pk, power_port_name))
             # Check if the power port is already connected
             if powerport.power_outlet is not None:
                 raise forms.ValidationError("{} {} is already connected".format(
@@ -1262,11 +1362,9 @@ class PowerConnectionCSVForm(forms.ModelForm):
 
         try:
             # Retrieve power outlet by name
-            power_outlet = PowerOutlet.objects.get(
-                device=self.cleaned_data['pdu'], name=power_outlet_name
-            )
-            # Check if the power outlet is already connected
-            if PowerPort.objects.filter(power_outlet=power_outlet).count():
+            power_outlet = self.lookup_cache.get('power_outlet', (self.cleaned_data['pdu'].pk, power_outlet_name))
+            # Check if the power outlet is already connected (or claimed by a previous record)
+            if hasattr(power_outlet, 'connected_port') or not self.lookup_cache.claim('power_outlet', power_outlet.pk):
                 raise forms.ValidationError("{} {} is already connected".format(
                     self.cleaned_data['pdu'], power_outlet_name
                 ))
@@ -1621,7 +1719,7 @@ class InterfaceConnectionForm(BootstrapMixin, ChainedFieldsMixin, forms.ModelFor
             ]
 
 
-class InterfaceConnectionCSVForm(forms.ModelForm):
+class InterfaceConnectionCSVForm(CSVLookupMixin, forms.ModelForm):
     device_a = FlexibleModelChoiceField(
         queryset=Device.objects.all(),
         to_field_name='name',
@@ -1649,52 +1747,47 @@ class InterfaceConnectionCSVForm(forms.ModelForm):
         model = InterfaceConnection
         fields = ['device_a', 'interface_a', 'device_b', 'interface_b', 'connection_status']
 
-    def clean_interface_a(self):
+    @classmethod
+    def load_lookup_cache(cls, records, cache):
 
-        interface_name = self.cleaned_data.get('interface_a')
-        if not interface_name:
-            return None
+        super(InterfaceConnectionCSVForm, cls).load_lookup_cache(records, cache)
 
-        try:
-            # Retrieve interface by name
-            interface = Interface.objects.get(
-                device=self.cleaned_data['device_a'], name=interface_name
-            )
-            # Check for an existing connection to this interface
-            if InterfaceConnection.objects.filter(Q(interface_a=interface) | Q(interface_b=interface)).count():
-                raise forms.ValidationError("{} {} is already connected".format(
-                    self.cleaned_data['device_a'], interface_name
-                ))
-        except Interface.DoesNotExist:
-            raise forms.ValidationError("Invalid interface ({} {})".format(
-                self.cleaned_data['device_a'], interface_name
-            ))
-
-        return interface
+        interfaces = []
+        for record in records:
+            for device_field, interface_field in (('device_a', 'interface_a'), ('device_b', 'interface_b')):
+                device = cls.get_cached_object(cache, record, device_field)
+                if device is not None:
+                    interfaces.append((device.pk, record.get(interface_field)))
+        cache.load(
+            'interface', Interface.objects.select_related('connected_as_a', 'connected_as_b'), ['device_id', 'name'],
+            interfaces
+        )
 
-    def clean_interface_b(self):
+    def _clean_interface(self, device_field, interface_field):
 
-        interface_name = self.cleaned_data.get('interface_b')
-        if not interface_name:
+        device = self.cleaned_data.get(device_field)
+        interface_name = self.cleaned_data.get(interface_field)
+        if not device or not interface_name:
             return None
 
         try:
             # Retrieve interface by name
-            interface = Interface.objects.get(
-                device=self.cleaned_data['device_b'], name=interface_name
-            )
-            # Check for an existing connection to this interface
-            if InterfaceConnection.objects.filter(Q(interface_a=interface) | Q(interface_b=interface)).count():
-                raise forms.ValidationError("{} {} is already connected".format(
-                    self.cleaned_data['device_b'], interface_name
-                ))
+            interface = self.lookup_cache.get('interface', (device.pk, interface_name))
+            # Check for an existing connection to this interface (or one claimed by a previous record)
+            if hasattr(interface, 'connected_as_a') or hasattr(interface, 'connected_as_b') or \
+                    not self.lookup_cache.claim('interface', interface.pk):
+                raise forms.ValidationError("{} {} is already connected".format(device, interface_name))
         except Interface.DoesNotExist:
-            raise forms.ValidationError("Invalid interface ({} {})".format(
-                self.cleaned_data['device_b'], interface_name
-            ))
+            raise forms.ValidationError("Invalid interface ({} {})".format(device, interface_name))
 
         return interface
 
+    def clean_interface_a(self):
+        return self._clean_interface('device_a', 'interface_a')
+
+    def clean_interface_b(self):
+        return self._clean_interface('device_b', 'interface_b')
+
 
 class InterfaceConnectionDeletionForm(ConfirmationForm):
     # Used for HTTP redirect upon successful deletion
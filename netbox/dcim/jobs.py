@@ -0,0 +1,38 @@
+from __future__ import unicode_literals
+from collections import OrderedDict
+
+from django.conf import settings
+
+from extras.jobs import register_job
+from .models import Device
+
+
+def execute_napalm_methods(device, methods):
+    """
+    Connect to a Device using the NAPALM driver configured for its platform, and return the results of the given
+    (getter) methods.
+    """
+    import napalm
+
+    driver = napalm.get_network_driver(device.platform.napalm_driver)
+    d = driver(
+        hostname=str(device.primary_ip.address.ip),
+        username=settings.NAPALM_USERNAME,
+        password=settings.NAPALM_PASSWORD,
+        timeout=settings.NAPALM_TIMEOUT,
+        optional_args=settings.NAPALM_ARGS
+    )
+    d.open()
+    try:
+        return OrderedDict([(method, getattr(d, method)()) for method in methods])
+    finally:
+        d.close()
+
+
+@register_job('dcim.napalm')
+def napalm(job, pk, methods):
+    """
+    Execute NAPALM methods on a Device (see DeviceViewSet.napalm()).
+    """
+    device = Device.objects.select_related('platform', 'primary_ip4', 'primary_ip6').get(pk=pk)
+    return execute_napalm_methods(device, methods)
@@ -0,0 +1,46 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dcim.models import DeviceType, Manufacturer
+
+
+class Command(BaseCommand):
+    help = "Create any components missing from existing devices per their device types' component templates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('-m', '--manufacturer', dest='manufacturer', action='append',
+                            help="Filter device types by manufacturer slug (include argument once per manufacturer)")
+        parser.add_argument('-t', '--device-type', dest='device_type', action='append',
+                            help="Filter device types by slug (include argument once per device type)")
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=1000,
+                            help="Number of components to create per query (default: 1000)")
+
+    def handle(self, *args, **options):
+
+        devicetypes = DeviceType.objects.select_related('manufacturer')
+
+        # --manufacturer: Include only device types belonging to the specified manufacturer(s)
+        if options['manufacturer']:
+            manufacturers = Manufacturer.objects.filter(slug__in=options['manufacturer'])
+            if not manufacturers:
+                raise CommandError("One or more manufacturers specified but none found.")
+            devicetypes = devicetypes.filter(manufacturer__in=manufacturers)
+
+        # --device-type: Include only the specified device type(s)
+        if options['device_type']:
+            devicetypes = devicetypes.filter(slug__in=options['device_type'])
+            if not devicetypes:
+                raise CommandError("One or more device types specified but none found.")
+
+        for devicetype in devicetypes:
+            created = devicetype.sync_components(batch_size=options['batch_size'])
+            summary = ', '.join([
+                '{} {}'.format(count, model._meta.verbose_name_plural) for model, count in created.items() if count
+            ])
+            if summary:
+                self.stdout.write("{}: created {}".format(devicetype.full_name, summary))
+            elif options['verbosity'] > 1:
+                self.stdout.write("{}: no missing components".format(devicetype.full_name))
+
+        self.stdout.write("Finished.")
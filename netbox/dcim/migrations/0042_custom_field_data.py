@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2017-08-21 14:02
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0041_napalm_integration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='devicetype',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='rack',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='site',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='dcim_device_cf_data_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='devicetype',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='dcim_devicetype_cf_data_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='rack',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='dcim_rack_cf_data_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='site',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='dcim_site_cf_data_gin'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Trigram indexes supporting case-insensitive substring searches (see utilities.lookups.ILikeContains)
+TRIGRAM_INDEXES_SQL = [
+    'CREATE INDEX dcim_site_name_trgm ON dcim_site USING gin (name gin_trgm_ops)',
+    'CREATE INDEX dcim_site_facility_trgm ON dcim_site USING gin (facility gin_trgm_ops)',
+    'CREATE INDEX dcim_site_physical_address_trgm ON dcim_site USING gin (physical_address gin_trgm_ops)',
+    'CREATE INDEX dcim_site_shipping_address_trgm ON dcim_site USING gin (shipping_address gin_trgm_ops)',
+    'CREATE INDEX dcim_site_contact_name_trgm ON dcim_site USING gin (contact_name gin_trgm_ops)',
+    'CREATE INDEX dcim_site_contact_phone_trgm ON dcim_site USING gin (contact_phone gin_trgm_ops)',
+    'CREATE INDEX dcim_site_contact_email_trgm ON dcim_site USING gin (contact_email gin_trgm_ops)',
+    'CREATE INDEX dcim_site_comments_trgm ON dcim_site USING gin (comments gin_trgm_ops)',
+    'CREATE INDEX dcim_rack_name_trgm ON dcim_rack USING gin (name gin_trgm_ops)',
+    'CREATE INDEX dcim_rack_facility_id_trgm ON dcim_rack USING gin (facility_id gin_trgm_ops)',
+    'CREATE INDEX dcim_rack_comments_trgm ON dcim_rack USING gin (comments gin_trgm_ops)',
+    'CREATE INDEX dcim_rackreservation_description_trgm ON dcim_rackreservation USING gin (description gin_trgm_ops)',
+    'CREATE INDEX dcim_devicetype_model_trgm ON dcim_devicetype USING gin (model gin_trgm_ops)',
+    'CREATE INDEX dcim_devicetype_part_number_trgm ON dcim_devicetype USING gin (part_number gin_trgm_ops)',
+    'CREATE INDEX dcim_devicetype_comments_trgm ON dcim_devicetype USING gin (comments gin_trgm_ops)',
+    'CREATE INDEX dcim_device_name_trgm ON dcim_device USING gin (name gin_trgm_ops)',
+    'CREATE INDEX dcim_device_serial_trgm ON dcim_device USING gin (serial gin_trgm_ops)',
+    'CREATE INDEX dcim_device_comments_trgm ON dcim_device USING gin (comments gin_trgm_ops)',
+    'CREATE INDEX dcim_inventoryitem_serial_trgm ON dcim_inventoryitem USING gin (serial gin_trgm_ops)',
+]
+DROP_TRIGRAM_INDEXES_SQL = [
+    'DROP INDEX dcim_site_name_trgm',
+    'DROP INDEX dcim_site_facility_trgm',
+    'DROP INDEX dcim_site_physical_address_trgm',
+    'DROP INDEX dcim_site_shipping_address_trgm',
+    'DROP INDEX dcim_site_contact_name_trgm',
+    'DROP INDEX dcim_site_contact_phone_trgm',
+    'DROP INDEX dcim_site_contact_email_trgm',
+    'DROP INDEX dcim_site_comments_trgm',
+    'DROP INDEX dcim_rack_name_trgm',
+    'DROP INDEX dcim_rack_facility_id_trgm',
+    'DROP INDEX dcim_rack_comments_trgm',
+    'DROP INDEX dcim_rackreservation_description_trgm',
+    'DROP INDEX dcim_devicetype_model_trgm',
+    'DROP INDEX dcim_devicetype_part_number_trgm',
+    'DROP INDEX dcim_devicetype_comments_trgm',
+    'DROP INDEX dcim_device_name_trgm',
+    'DROP INDEX dcim_device_serial_trgm',
+    'DROP INDEX dcim_device_comments_trgm',
+    'DROP INDEX dcim_inventoryitem_serial_trgm',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0042_custom_field_data'),
+        # Creates the pg_trgm extension
+        ('extras', '0010_searchentry'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=TRIGRAM_INDEXES_SQL, reverse_sql=DROP_TRIGRAM_INDEXES_SQL),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0043_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='component_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -8,11 +8,12 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericRelation
-from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Count, Q, ObjectDoesNotExist
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Q, ObjectDoesNotExist
 from django.urls import reverse
 from django.utils.encoding import python_2_unicode_compatible
 
@@ -82,6 +83,7 @@ class Site(CreatedUpdatedModel, CustomFieldModel):
     contact_email = models.EmailField(blank=True, verbose_name="Contact E-mail")
     comments = models.TextField(blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
     images = GenericRelation(ImageAttachment)
 
     objects = SiteManager()
@@ -89,9 +91,11 @@ class Site(CreatedUpdatedModel, CustomFieldModel):
     csv_headers = [
         'name', 'slug', 'region', 'tenant', 'facility', 'asn', 'contact_name', 'contact_phone', 'contact_email',
     ]
+    csv_related_fields = ['region', 'tenant']
 
     class Meta:
         ordering = ['name']
+        indexes = [GinIndex(fields=['custom_field_data'], name='dcim_site_cf_data_gin')]
 
     def __str__(self):
         return self.name
@@ -208,6 +212,7 @@ class Rack(CreatedUpdatedModel, CustomFieldModel):
                                      help_text='Units are numbered top-to-bottom')
     comments = models.TextField(blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
     images = GenericRelation(ImageAttachment)
 
     objects = RackManager()
@@ -215,6 +220,7 @@ class Rack(CreatedUpdatedModel, CustomFieldModel):
     csv_headers = [
         'site', 'group_name', 'name', 'facility_id', 'tenant', 'role', 'type', 'width', 'u_height', 'desc_units',
     ]
+    csv_related_fields = ['site', 'group', 'tenant', 'role']
 
     class Meta:
         ordering = ['site', 'name']
@@ -222,6 +228,7 @@ class Rack(CreatedUpdatedModel, CustomFieldModel):
             ['site', 'name'],
             ['site', 'facility_id'],
         ]
+        indexes = [GinIndex(fields=['custom_field_data'], name='dcim_rack_cf_data_gin')]
 
     def __str__(self):
         return self.display_name or super(Rack, self).__str__()
@@ -490,6 +497,7 @@ class DeviceType(models.Model, CustomFieldModel):
                                                        "\"None\" if this device type is neither a parent nor a child.")
     comments = models.TextField(blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
 
     class Meta:
         ordering = ['manufacturer', 'model']
@@ -497,6 +505,7 @@ class DeviceType(models.Model, CustomFieldModel):
             ['manufacturer', 'model'],
             ['manufacturer', 'slug'],
         ]
+        indexes = [GinIndex(fields=['custom_field_data'], name='dcim_devicetype_cf_data_gin')]
 
     def __str__(self):
         return self.model
@@ -559,6 +568,49 @@ class DeviceType(models.Model, CustomFieldModel):
     def full_name(self):
         return '{} {}'.format(self.manufacturer.name, self.model)
 
+    def sync_components(self, batch_size=1000):
+        """
+        Create any components defined by this DeviceType's templates which are missing from its existing Devices (for
+        example, after a new template has been added). Missing components are identified by a single anti-join per
+        component type and created in batches of `batch_size`. Returns an OrderedDict mapping each component model to
+        the number of components created.
+        """
+        created = OrderedDict()
+        device_ids = set()
+
+        with transaction.atomic():
+            for template_model, component_model, extra_fields in COMPONENT_TEMPLATES:
+                fields = ['name'] + extra_fields
+                sql = (
+                    "SELECT d.id, {fields} FROM {device_table} d "
+                    "INNER JOIN {template_table} t ON t.device_type_id = d.device_type_id "
+                    "WHERE d.device_type_id = %s AND NOT EXISTS ("
+                    "SELECT 1 FROM {component_table} c WHERE c.device_id = d.id AND c.name = t.name"
+                    ")".format(
+                        fields=', '.join(['t.{}'.format(f) for f in fields]),
+                        device_table=Device._meta.db_table,
+                        template_table=template_model._meta.db_table,
+                        component_table=component_model._meta.db_table,
+                    )
+                )
+                created[component_model] = 0
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, [self.pk])
+                    rows = cursor.fetchmany(batch_size)
+                    while rows:
+                        component_model.objects.bulk_create([
+                            component_model(device_id=row[0], **dict(zip(fields, row[1:]))) for row in rows
+                        ])
+                        created[component_model] += len(rows)
+                        device_ids.update(row[0] for row in rows)
+                        rows = cursor.fetchmany(batch_size)
+
+            # bulk_create() does not send signals, so bump each affected Device's component version manually.
+            if device_ids:
+                Device.objects.filter(pk__in=device_ids).update(component_version=F('component_version') + 1)
+
+        return created
+
     @property
     def is_parent_device(self):
         return bool(self.subdevice_role)
@@ -810,7 +862,9 @@ class Device(CreatedUpdatedModel, CustomFieldModel):
     )
     comments = models.TextField(blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
     images = GenericRelation(ImageAttachment)
+    component_version = models.PositiveIntegerField(default=0, editable=False)
 
     objects = DeviceManager()
 
@@ -818,6 +872,7 @@ class Device(CreatedUpdatedModel, CustomFieldModel):
         'name', 'device_role', 'tenant', 'manufacturer', 'model_name', 'platform', 'serial', 'asset_tag', 'status',
         'site', 'rack_group', 'rack_name', 'position', 'face',
     ]
+    csv_related_fields = ['device_role', 'tenant', 'device_type__manufacturer', 'platform', 'site', 'rack__group']
 
     class Meta:
         ordering = ['name']
@@ -826,6 +881,7 @@ class Device(CreatedUpdatedModel, CustomFieldModel):
             ('napalm_read', 'Read-only access to devices via NAPALM'),
             ('napalm_write', 'Read/write access to devices via NAPALM'),
         )
+        indexes = [GinIndex(fields=['custom_field_data'], name='dcim_device_cf_data_gin')]
 
     def __str__(self):
         return self.display_name or super(Device, self).__str__()
@@ -1006,6 +1062,7 @@ class ConsolePort(models.Model):
     connection_status = models.NullBooleanField(choices=CONNECTION_STATUS_CHOICES, default=CONNECTION_STATUS_CONNECTED)
 
     csv_headers = ['console_server', 'cs_port', 'device', 'console_port', 'connection_status']
+    csv_related_fields = ['device', 'cs_port__device']
 
     class Meta:
         ordering = ['device', 'name']
@@ -1077,6 +1134,7 @@ class PowerPort(models.Model):
     connection_status = models.NullBooleanField(choices=CONNECTION_STATUS_CHOICES, default=CONNECTION_STATUS_CONNECTED)
 
     csv_headers = ['pdu', 'power_outlet', 'device', 'power_port', 'connection_status']
+    csv_related_fields = ['device', 'power_outlet__device']
 
     class Meta:
         ordering = ['device', 'name']
@@ -1255,6 +1313,7 @@ class InterfaceConnection(models.Model):
                                             verbose_name='Status')
 
     csv_headers = ['device_a', 'interface_a', 'device_b', 'interface_b', 'connection_status']
+    csv_related_fields = ['interface_a__device', 'interface_b__device']
 
     def clean(self):
         try:
@@ -1310,6 +1369,23 @@ class DeviceBay(models.Model):
             raise ValidationError("Cannot install a device into itself.")
 
 
+# The component templates of a DeviceType, the component model created from each, and any additional fields copied from
+# the template (see DeviceType.sync_components())
+COMPONENT_TEMPLATES = (
+    (ConsolePortTemplate, ConsolePort, []),
+    (ConsoleServerPortTemplate, ConsoleServerPort, []),
+    (PowerPortTemplate, PowerPort, []),
+    (PowerOutletTemplate, PowerOutlet, []),
+    (InterfaceTemplate, Interface, ['form_factor', 'mgmt_only']),
+    (DeviceBayTemplate, DeviceBay, []),
+)
+
+# The permissions required to create missing components on the existing Devices of a DeviceType
+SYNC_COMPONENTS_PERMISSIONS = ['dcim.change_device'] + [
+    'dcim.add_{}'.format(component_model._meta.model_name) for _, component_model, _ in COMPONENT_TEMPLATES
+]
+
+
 #
 # Inventory items
 #
@@ -0,0 +1,117 @@
+from __future__ import unicode_literals
+
+from django.db.models import F, Q
+from django.db.models.signals import pre_delete, pre_save
+
+from circuits.models import Circuit, CircuitTermination
+from ipam.models import IPAddress, VRF
+from utilities.signals import connect_post_save
+from .models import (
+    ConsolePort, ConsoleServerPort, Device, DeviceBay, DeviceType, Interface, InterfaceConnection, Manufacturer,
+    PowerOutlet, PowerPort, Site,
+)
+
+
+# Lookups (relative to Device) identifying each Device which displays a given object among its components: the parent
+# Device itself, as well as any peer Device on which the object is shown as a connection.
+DEVICE_COMPONENT_LOOKUPS = {
+    ConsolePort: ['console_ports', 'cs_ports__connected_console'],
+    ConsoleServerPort: ['cs_ports', 'console_ports__cs_port'],
+    PowerPort: ['power_ports', 'power_outlets__connected_port'],
+    PowerOutlet: ['power_outlets', 'power_ports__power_outlet'],
+    Interface: ['interfaces', 'interfaces__connected_as_a__interface_b', 'interfaces__connected_as_b__interface_a'],
+    InterfaceConnection: ['interfaces__connected_as_a', 'interfaces__connected_as_b'],
+    DeviceBay: ['device_bays', 'parent_bay'],
+    IPAddress: ['interfaces__ip_addresses'],
+    CircuitTermination: ['interfaces__circuit_termination', 'interfaces__circuit_termination__circuit__terminations'],
+}
+
+# Lookups (relative to Device) identifying each Device whose components display some attribute of another object: the
+# name of a connected or installed Device, the type of an installed Device, or the circuit, far end site or VRF of an
+# interface's circuit termination or IP address.
+DEVICE_RELATED_LOOKUPS = {
+    Device: [
+        'console_ports__cs_port__device',
+        'cs_ports__connected_console__device',
+        'power_ports__power_outlet__device',
+        'power_outlets__connected_port__device',
+        'interfaces__connected_as_a__interface_b__device',
+        'interfaces__connected_as_b__interface_a__device',
+        'interfaces__circuit_termination__circuit__terminations__interface__device',
+        'device_bays__installed_device',
+    ],
+    DeviceType: ['device_bays__installed_device__device_type'],
+    Manufacturer: ['device_bays__installed_device__device_type__manufacturer'],
+    Circuit: ['interfaces__circuit_termination__circuit'],
+    Site: ['interfaces__circuit_termination__circuit__terminations__site'],
+    VRF: ['interfaces__ip_addresses__vrf'],
+}
+
+
+def get_device_query(lookups, pk):
+    """
+    Return a Q object matching each Device related to the given primary key by any of the lookups. Each lookup is
+    evaluated as a separate subquery to avoid joining every relation at once.
+    """
+    query = Q()
+    for lookup in lookups:
+        query |= Q(pk__in=Device.objects.filter(**{lookup: pk}).values('pk'))
+    return query
+
+
+def bump_component_version(query):
+    """
+    Increment the component_version of each Device matching a query. This invalidates any cached rendering of the
+    Devices' components (see DeviceView).
+    """
+    Device.objects.filter(query).update(component_version=F('component_version') + 1)
+
+
+def capture_component_devices(sender, instance, **kwargs):
+    """
+    Before a Device component is saved, record the Devices displaying its previous state (e.g. the former peer of a
+    connection) so that they can be updated along with its current Devices once it has been saved.
+    """
+    if instance.pk is None:
+        instance._component_device_pks = []
+    else:
+        query = get_device_query(DEVICE_COMPONENT_LOOKUPS[sender], instance.pk)
+        instance._component_device_pks = list(Device.objects.filter(query).values_list('pk', flat=True))
+
+
+def update_component_devices(sender, instance, **kwargs):
+    """
+    When a Device component has been saved, bump the component_version of every Device which displayed it before or
+    after the change, using a single UPDATE.
+    """
+    query = get_device_query(DEVICE_COMPONENT_LOOKUPS[sender], instance.pk)
+    previous = getattr(instance, '_component_device_pks', None)
+    if previous:
+        query |= Q(pk__in=previous)
+    bump_component_version(query)
+
+
+def delete_component_devices(sender, instance, **kwargs):
+    """
+    Before a Device component is deleted, bump the component_version of every Device displaying it.
+    """
+    bump_component_version(get_device_query(DEVICE_COMPONENT_LOOKUPS[sender], instance.pk))
+
+
+def update_related_devices(sender, instance, created=False, **kwargs):
+    """
+    When an object displayed among the components of other Devices is modified, bump their component_version. A newly
+    created object cannot be displayed yet.
+    """
+    if not created:
+        bump_component_version(get_device_query(DEVICE_RELATED_LOOKUPS[sender], instance.pk))
+
+
+for model in DEVICE_COMPONENT_LOOKUPS:
+    pre_save.connect(capture_component_devices, sender=model)
+    connect_post_save(update_component_devices, model)
+    pre_delete.connect(delete_component_devices, sender=model)
+
+for model in DEVICE_RELATED_LOOKUPS:
+    connect_post_save(update_related_devices, model, bulk_create_safe=True)
+    pre_delete.connect(update_related_devices, sender=model)
@@ -121,6 +121,12 @@ class RegionTable(BaseTable):
     pk = ToggleColumn()
     name = tables.TemplateColumn(template_code=REGION_LINK, orderable=False)
     site_count = tables.Column(verbose_name='Sites')
+    rack_count = tables.Column(verbose_name='Racks')
+    device_count = tables.Column(verbose_name='Devices')
+    prefix_count = tables.Column(verbose_name='Prefixes')
+    vlan_count = tables.Column(verbose_name='VLANs')
+    ipaddress_count = tables.Column(verbose_name='IP addresses')
+    circuit_count = tables.Column(verbose_name='Circuits')
     slug = tables.Column(verbose_name='Slug')
     actions = tables.TemplateColumn(
         template_code=REGION_ACTIONS,
@@ -130,7 +136,10 @@ class RegionTable(BaseTable):
 
     class Meta(BaseTable.Meta):
         model = Region
-        fields = ('pk', 'name', 'site_count', 'slug', 'actions')
+        fields = (
+            'pk', 'name', 'site_count', 'rack_count', 'device_count', 'prefix_count', 'vlan_count', 'ipaddress_count',
+            'circuit_count', 'slug', 'actions',
+        )
 
 
 #
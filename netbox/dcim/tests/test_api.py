@@ -3,17 +3,19 @@ from __future__ import unicode_literals
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Permission, User
+from django.test import override_settings
 from django.urls import reverse
 
 from dcim.models import (
     ConsolePort, ConsolePortTemplate, ConsoleServerPort, ConsoleServerPortTemplate, Device, DeviceBay,
     DeviceBayTemplate, DeviceRole, DeviceType, IFACE_FF_LAG, Interface, InterfaceConnection, InterfaceTemplate,
     Manufacturer, InventoryItem, Platform, PowerPort, PowerPortTemplate, PowerOutlet, PowerOutletTemplate, Rack, RackGroup,
-    RackReservation, RackRole, Region, Site, SUBDEVICE_ROLE_CHILD, SUBDEVICE_ROLE_PARENT,
+    RackReservation, RackRole, Region, Site, SUBDEVICE_ROLE_CHILD, SUBDEVICE_ROLE_PARENT, SYNC_COMPONENTS_PERMISSIONS,
 )
 from extras.models import Graph, GRAPH_TYPE_INTERFACE, GRAPH_TYPE_SITE
 from users.models import Token
+from utilities.metrics import registry as metrics_registry
 from utilities.tests import HttpStatusMixin
 
 
@@ -133,6 +135,45 @@ class SiteTest(HttpStatusMixin, APITestCase):
 
         self.assertEqual(response.data['count'], 3)
 
+    def test_list_sites_by_cursor(self):
+
+        url = reverse('dcim-api:site-list')
+        response = self.client.get('{}?cursor=&limit=2'.format(url), **self.header)
+
+        self.assertIsNone(response.data['count'])
+        self.assertEqual([s['id'] for s in response.data['results']], [self.site1.pk, self.site2.pk])
+        self.assertIn('cursor={}'.format(self.site2.pk), response.data['next'])
+
+        response = self.client.get(response.data['next'], **self.header)
+
+        self.assertEqual([s['id'] for s in response.data['results']], [self.site3.pk])
+        self.assertIsNone(response.data['next'])
+
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=2)
+    def test_list_sites_with_estimated_count(self):
+
+        url = reverse('dcim-api:site-list')
+        response = self.client.get('{}?limit=2'.format(url), **self.header)
+
+        self.assertGreaterEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIn('offset=2', response.data['next'])
+
+        response = self.client.get(response.data['next'], **self.header)
+
+        self.assertEqual([s['id'] for s in response.data['results']], [self.site3.pk])
+        self.assertIsNone(response.data['next'])
+
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=2, MAX_PAGE_SIZE=0)
+    def test_list_sites_with_estimated_count_unpaginated(self):
+
+        url = reverse('dcim-api:site-list')
+        response = self.client.get('{}?limit=0'.format(url), **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNone(response.data['next'])
+
     def test_create_site(self):
 
         data = {
@@ -643,6 +684,24 @@ class DeviceTypeTest(HttpStatusMixin, APITestCase):
         self.assertHttpStatus(response, status.HTTP_204_NO_CONTENT)
         self.assertEqual(DeviceType.objects.count(), 2)
 
+    def test_sync_components_permissions(self):
+
+        user = User.objects.create(username='testuser2')
+        token = Token.objects.create(user=user)
+        header = {'HTTP_AUTHORIZATION': 'Token {}'.format(token.key)}
+        url = reverse('dcim-api:devicetype-sync-components', kwargs={'pk': self.devicetype1.pk})
+
+        # Changing devices is not sufficient without permission to add each type of component
+        user.user_permissions.add(Permission.objects.get(content_type__app_label='dcim', codename='change_device'))
+        response = self.client.post(url, **header)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        user.user_permissions.add(*Permission.objects.filter(content_type__app_label='dcim', codename__in=[
+            perm.split('.')[1] for perm in SYNC_COMPONENTS_PERMISSIONS
+        ]))
+        response = self.client.post(url, **header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+
 
 class ConsolePortTemplateTest(HttpStatusMixin, APITestCase):
 
@@ -1707,6 +1766,28 @@ class InterfaceTest(HttpStatusMixin, APITestCase):
         self.assertEqual(len(response.data), 3)
         self.assertEqual(response.data[0]['embed_url'], 'http://example.com/graphs.py?interface=Test Interface 1&foo=1')
 
+    def test_get_bulk_interface_graphs(self):
+
+        Graph.objects.create(
+            type=GRAPH_TYPE_INTERFACE, name='Test Graph 1',
+            source='http://example.com/graphs.py?interface={{ obj.name }}&foo=1'
+        )
+        Graph.objects.create(
+            type=GRAPH_TYPE_INTERFACE, name='Test Graph 2',
+            source='http://example.com/graphs.py?interface={{ obj.name }}&foo=2'
+        )
+
+        url = reverse('dcim-api:interface-bulk-graphs')
+        response = self.client.get('{}?device_id={}'.format(url, self.device.pk), **self.header)
+
+        self.assertEqual(response.data['count'], 3)
+        results = {i['id']: i for i in response.data['results']}
+        self.assertEqual(len(results[self.interface2.pk]['graphs']), 2)
+        self.assertEqual(
+            results[self.interface2.pk]['graphs'][0]['embed_url'],
+            'http://example.com/graphs.py?interface=Test Interface 2&foo=1'
+        )
+
     def test_list_interfaces(self):
 
         url = reverse('dcim-api:interface-list')
@@ -2073,6 +2154,25 @@ class InterfaceConnectionTest(HttpStatusMixin, APITestCase):
 
         self.assertEqual(response.data['count'], 3)
 
+    def test_list_interfaceconnections_by_cursor(self):
+
+        url = reverse('dcim-api:interfaceconnection-list')
+        response = self.client.get('{}?limit=2'.format(url), **self.header)
+
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            [ic['id'] for ic in response.data['results']],
+            [self.interfaceconnection1.pk, self.interfaceconnection2.pk]
+        )
+        self.assertIsNone(response.data['previous'])
+        self.assertIn('cursor={}'.format(self.interfaceconnection2.pk), response.data['next'])
+
+        response = self.client.get(response.data['next'], **self.header)
+
+        self.assertEqual([ic['id'] for ic in response.data['results']], [self.interfaceconnection3.pk])
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
     def test_create_interfaceconnection(self):
 
         data = {
@@ -2158,3 +2258,46 @@ class ConnectedDeviceTest(HttpStatusMixin, APITestCase):
 
         self.assertHttpStatus(response, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], self.device1.name)
+
+
+class MetricsTest(HttpStatusMixin, APITestCase):
+
+    def setUp(self):
+
+        user = User.objects.create(username='testuser', is_superuser=True)
+        token = Token.objects.create(user=user)
+        self.header = {'HTTP_AUTHORIZATION': 'Token {}'.format(token.key)}
+
+        Site.objects.create(name='Test Site 1', slug='test-site-1')
+        metrics_registry.clear()
+
+    @override_settings(METRICS_ENABLED=True, METRICS_SAMPLE_RATE=1.0)
+    def test_metrics(self):
+
+        response = self.client.get(reverse('dcim-api:site-list'), **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+
+        metrics = metrics_registry.snapshot()[('dcim-api:site-list', 'GET')]
+        self.assertEqual(sum(metrics.duration_counts), 1)
+        self.assertGreater(metrics.queries, 0)
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            'netbox_request_duration_seconds_count{method="GET",view="dcim-api:site-list"} 1',
+            response.content.decode('utf-8')
+        )
+
+    @override_settings(METRICS_ENABLED=True, LOGIN_REQUIRED=True)
+    def test_metrics_login_required(self):
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.get(reverse('metrics'), **self.header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_metrics_disabled(self):
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,9 +1,16 @@
 from __future__ import unicode_literals
 
+from django.core.cache import cache
+from django.db.models.signals import post_save
 from django.test import TestCase
 
 from dcim.forms import *
 from dcim.models import *
+from dcim.views import validate_new_components
+from extras.models import CacheVersion
+from utilities.csvimport import CSVImporter
+from utilities.forms import CSVLookupCache, csv_records
+from utilities.signals import can_skip_post_save
 
 
 def get_id(model, slug):
@@ -80,3 +87,159 @@ class DeviceTestCase(TestCase):
         })
         self.assertTrue(test.is_valid())
         self.assertTrue(test.save())
+
+
+class ComponentCreateTestCase(TestCase):
+
+    fixtures = ['dcim']
+
+    def test_name_too_long(self):
+
+        # The first expanded name fits the name field, but the last does not
+        device = Device.objects.first()
+        form = ConsolePortCreateForm(device, data={'device': device.pk, 'name_pattern': 'x' * 29 + '[8-10]'})
+        self.assertTrue(form.is_valid())
+
+        new_components = validate_new_components(
+            form, ConsolePort, ConsolePortForm, 'device', [device], form.cleaned_data['name_pattern'],
+            form.cleaned_data
+        )
+        self.assertEqual(new_components, [])
+        self.assertIn('name_pattern', form.errors)
+        self.assertIn('x' * 29 + '10', form.errors['name_pattern'][0])
+
+
+class InterfaceConnectionCSVTestCase(TestCase):
+
+    def setUp(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        manufacturer = Manufacturer.objects.create(name='Test Manufacturer 1', slug='test-manufacturer-1')
+        devicetype = DeviceType.objects.create(
+            manufacturer=manufacturer, model='Test Device Type 1', slug='test-device-type-1'
+        )
+        devicerole = DeviceRole.objects.create(name='Test Device Role 1', slug='test-device-role-1', color='ff0000')
+        for name in ('Device 1', 'Device 2'):
+            device = Device.objects.create(device_type=devicetype, device_role=devicerole, name=name, site=site)
+            for i in range(1, 4):
+                Interface.objects.create(device=device, name='eth{}'.format(i))
+
+    def test_shared_lookup_cache(self):
+
+        records = [
+            {'device_a': 'Device 1', 'interface_a': 'eth1', 'device_b': 'Device 2', 'interface_b': 'eth1',
+             'connection_status': 'Connected'},
+            {'device_a': 'Device 1', 'interface_a': 'eth2', 'device_b': 'Device 2', 'interface_b': 'eth1',
+             'connection_status': 'Connected'},
+        ]
+        cache = CSVLookupCache()
+        InterfaceConnectionCSVForm.load_lookup_cache(records, cache)
+
+        form1 = InterfaceConnectionCSVForm(records[0], lookup_cache=cache)
+        self.assertTrue(form1.is_valid(), form1.errors)
+        self.assertEqual(form1.cleaned_data['interface_a'], Interface.objects.get(device__name='Device 1', name='eth1'))
+
+        # Device 2 eth1 has been claimed by the first record
+        form2 = InterfaceConnectionCSVForm(records[1], lookup_cache=cache)
+        self.assertFalse(form2.is_valid())
+        self.assertIn('interface_b', form2.errors)
+
+    def test_invalid_interface(self):
+
+        form = InterfaceConnectionCSVForm({
+            'device_a': 'Device 1', 'interface_a': 'eth9', 'device_b': '{{{}}}'.format(
+                Device.objects.get(name='Device 2').pk
+            ), 'interface_b': 'eth3', 'connection_status': 'Connected',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('interface_a', form.errors)
+        self.assertNotIn('interface_b', form.errors)
+
+
+class CSVImporterTestCase(TestCase):
+
+    def test_chunked_import(self):
+
+        lines = ['name,slug'] + ['Site {0},site-{0}'.format(i) for i in range(1, 6)]
+        result = CSVImporter(SiteCSVForm, chunk_size=2, keep_objects=3).run(csv_records(lines, ['name', 'slug']))
+
+        self.assertEqual(result.errors, [])
+        self.assertEqual(result.created, 5)
+        self.assertEqual(result.last_row, 5)
+        self.assertEqual(len(result.objects), 3)
+        self.assertEqual(Site.objects.filter(slug__startswith='site-').count(), 5)
+
+    def test_resume_import(self):
+
+        # Row 4 duplicates row 3, so the second chunk is discarded
+        lines = ['name,slug', 'Site 1,site-1', 'Site 2,site-2', 'Site 3,site-3', 'Site 3,site-3', 'Site 5,site-5']
+        importer = CSVImporter(SiteCSVForm, chunk_size=2)
+        result = importer.run(csv_records(lines, ['name', 'slug']))
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.last_row, 2)
+        self.assertTrue(all(error.startswith('Row 4 ') for error in result.errors), result.errors)
+        self.assertFalse(Site.objects.filter(slug='site-3').exists())
+
+        lines[4] = 'Site 4,site-4'
+        result = importer.run(csv_records(lines, ['name', 'slug']), skip=result.last_row)
+
+        self.assertEqual(result.errors, [])
+        self.assertEqual(result.created, 3)
+        self.assertEqual(Site.objects.filter(slug__startswith='site-').count(), 5)
+
+    def test_bulk_create_safe_receivers(self):
+
+        # Sites have only receivers maintaining the search index, counters and statistics, which are safe to skip
+        self.assertTrue(can_skip_post_save(Site))
+        # Interfaces have a receiver updating their Devices for each save
+        self.assertFalse(can_skip_post_save(Interface))
+
+        # A receiver connected other than by connect_post_save() is assumed to be unsafe
+        def receiver(sender, **kwargs):
+            pass
+        post_save.connect(receiver, sender=Site)
+        try:
+            self.assertFalse(can_skip_post_save(Site))
+        finally:
+            post_save.disconnect(receiver, sender=Site)
+        self.assertTrue(can_skip_post_save(Site))
+
+
+class FilterFormTestCase(TestCase):
+
+    def setUp(self):
+
+        cache.clear()
+        self.sites = [Site.objects.create(name='Site {}'.format(i), slug='site-{}'.format(i)) for i in range(1, 3)]
+        self.racks = [
+            Rack.objects.create(name='Rack 1', site=self.sites[0]),
+            Rack.objects.create(name='Rack 2', site=self.sites[0]),
+            Rack.objects.create(name='Rack 3', site=self.sites[1]),
+        ]
+
+    def test_choice_counts(self):
+
+        form = RackFilterForm()
+        choices = [label for value, label in form.fields['site'].choices]
+        self.assertEqual(choices, ['Site 1 (2)', 'Site 2 (1)'])
+
+    def test_choice_counts_invalidation(self):
+
+        RackFilterForm()
+        Rack.objects.create(name='Rack 4', site=self.sites[1])
+
+        # The version is incremented on commit, possibly by another process (changes are not committed within a test)
+        CacheVersion.objects.create(name='choicecounts.dcim.rack', version=1)
+        form = RackFilterForm()
+        choices = [label for value, label in form.fields['site'].choices]
+        self.assertEqual(choices, ['Site 1 (2)', 'Site 2 (2)'])
+
+    def test_lazy_choices(self):
+
+        form = DeviceFilterForm({'rack_id': [self.racks[1].pk]})
+        rendered = str(form['rack_id'])
+        self.assertIn('api-url=', rendered)
+        self.assertIn('value="0"', rendered)
+        self.assertIn('value="{}"'.format(self.racks[1].pk), rendered)
+        self.assertNotIn('value="{}"'.format(self.racks[0].pk), rendered)
@@ -1,8 +1,12 @@
 from __future__ import unicode_literals
 
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 
+from dcim.filters import SiteFilter
 from dcim.models import *
+from utilities.paginator import EnhancedPaginator
+from utilities.utils import delete_in_chunks, update_in_chunks
+from utilities.views import get_bulk_selection
 
 
 class RackTestCase(TestCase):
@@ -98,3 +102,187 @@ class RackTestCase(TestCase):
             face=None,
         )
         self.assertTrue(pdu)
+
+
+class DeviceComponentSignalsTestCase(TestCase):
+
+    def setUp(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        manufacturer = Manufacturer.objects.create(name='Test Manufacturer 1', slug='test-manufacturer-1')
+        devicetype = DeviceType.objects.create(
+            manufacturer=manufacturer, model='Test Device Type 1', slug='test-device-type-1'
+        )
+        devicerole = DeviceRole.objects.create(name='Test Device Role 1', slug='test-device-role-1', color='ff0000')
+        self.device1 = Device.objects.create(
+            device_type=devicetype, device_role=devicerole, name='Test Device 1', site=site
+        )
+        self.device2 = Device.objects.create(
+            device_type=devicetype, device_role=devicerole, name='Test Device 2', site=site
+        )
+        self.interface1 = Interface.objects.create(device=self.device1, name='Test Interface 1')
+        self.interface2 = Interface.objects.create(device=self.device2, name='Test Interface 2')
+
+    def get_component_version(self, device):
+        return Device.objects.get(pk=device.pk).component_version
+
+    def test_interface_change_updates_device(self):
+
+        component_version = self.get_component_version(self.device1)
+        self.interface1.description = 'Uplink'
+        self.interface1.save()
+
+        self.assertEqual(self.get_component_version(self.device1), component_version + 1)
+
+    def test_interface_connection_updates_peer_devices(self):
+
+        device1_version = self.get_component_version(self.device1)
+        device2_version = self.get_component_version(self.device2)
+        InterfaceConnection.objects.create(interface_a=self.interface1, interface_b=self.interface2)
+
+        self.assertGreater(self.get_component_version(self.device1), device1_version)
+        self.assertGreater(self.get_component_version(self.device2), device2_version)
+
+    def test_peer_device_rename_updates_device(self):
+
+        InterfaceConnection.objects.create(interface_a=self.interface1, interface_b=self.interface2)
+        device1_version = self.get_component_version(self.device1)
+        self.device2.name = 'Test Device 3'
+        self.device2.save()
+
+        self.assertGreater(self.get_component_version(self.device1), device1_version)
+
+
+class DeviceTypeSyncComponentsTestCase(TestCase):
+
+    def setUp(self):
+
+        site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        manufacturer = Manufacturer.objects.create(name='Test Manufacturer 1', slug='test-manufacturer-1')
+        self.devicetype = DeviceType.objects.create(
+            manufacturer=manufacturer, model='Test Device Type 1', slug='test-device-type-1'
+        )
+        devicerole = DeviceRole.objects.create(name='Test Device Role 1', slug='test-device-role-1', color='ff0000')
+        InterfaceTemplate.objects.create(device_type=self.devicetype, name='eth0')
+        self.device1 = Device.objects.create(
+            device_type=self.devicetype, device_role=devicerole, name='Test Device 1', site=site
+        )
+        self.device2 = Device.objects.create(
+            device_type=self.devicetype, device_role=devicerole, name='Test Device 2', site=site
+        )
+
+    def test_sync_components(self):
+
+        InterfaceTemplate.objects.create(device_type=self.devicetype, name='eth1', mgmt_only=True)
+        ConsolePortTemplate.objects.create(device_type=self.devicetype, name='Console')
+
+        created = self.devicetype.sync_components()
+
+        self.assertEqual(created[Interface], 2)
+        self.assertEqual(created[ConsolePort], 2)
+        self.assertEqual(created[PowerPort], 0)
+        for device in (self.device1, self.device2):
+            self.assertEqual(
+                sorted(device.interfaces.values_list('name', flat=True)), ['eth0', 'eth1']
+            )
+            self.assertTrue(device.interfaces.get(name='eth1').mgmt_only)
+            self.assertEqual(device.console_ports.count(), 1)
+
+        # A second sync should not create anything
+        created = self.devicetype.sync_components()
+        self.assertFalse(any(created.values()))
+
+
+class BulkSelectionTestCase(TestCase):
+
+    def setUp(self):
+
+        for i in range(1, 6):
+            Site.objects.create(name='Test Site {}'.format(i), slug='test-site-{}'.format(i))
+        Site.objects.create(name='Other', slug='other')
+
+    def test_select_all(self):
+
+        request = RequestFactory().post('/?q=test+site', {'_all': 'true', 'pk': [1]})
+        selection, select_all = get_bulk_selection(request, Site, SiteFilter)
+
+        self.assertTrue(select_all)
+        self.assertEqual(selection.count(), 5)
+
+        progress = []
+        self.assertEqual(delete_in_chunks(selection, chunk_size=2, progress=progress.append), 5)
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual(list(Site.objects.values_list('slug', flat=True)), ['other'])
+
+    def test_update_in_chunks(self):
+
+        request = RequestFactory().post('/?q=test+site', {'_all': 'true'})
+        selection, select_all = get_bulk_selection(request, Site, SiteFilter)
+
+        # Renaming the sites removes them from the selection as they are updated
+        chunks = []
+        updated_count = update_in_chunks(selection, {'name': 'Renamed'}, chunk_size=2, callback=chunks.append)
+        self.assertEqual(updated_count, 5)
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(Site.objects.filter(name='Renamed').count(), 5)
+
+    def test_select_pk_list(self):
+
+        pk_list = list(Site.objects.filter(slug__in=['test-site-1', 'other']).values_list('pk', flat=True))
+        request = RequestFactory().post('/?q=test+site', {'pk': pk_list})
+        selection, select_all = get_bulk_selection(request, Site, SiteFilter)
+
+        self.assertFalse(select_all)
+        self.assertEqual(sorted(obj.pk for obj in selection), sorted(pk_list))
+
+
+class EstimatedPaginationTestCase(TestCase):
+
+    def setUp(self):
+
+        for i in range(1, 6):
+            Site.objects.create(name='Test Site {}'.format(i), slug='test-site-{}'.format(i))
+
+    def test_overestimate(self):
+
+        paginator = EnhancedPaginator(Site.objects.order_by('name'), 2, count=100, count_is_estimate=True)
+
+        page = paginator.page(2)
+        self.assertEqual([site.slug for site in page], ['test-site-3', 'test-site-4'])
+        self.assertTrue(page.has_next())
+        self.assertEqual(page.smart_pages(), [1, 2, 3])
+
+        # The last page is determined by the objects present, not by the estimate
+        page = paginator.page(3)
+        self.assertEqual([site.slug for site in page], ['test-site-5'])
+        self.assertFalse(page.has_next())
+        self.assertEqual((page.start_index(), page.end_index()), (5, 5))
+
+    def test_underestimate(self):
+
+        # Pages beyond those implied by the estimate remain available
+        paginator = EnhancedPaginator(Site.objects.order_by('name'), 2, count=2, count_is_estimate=True)
+
+        self.assertTrue(paginator.page(1).has_next())
+        page = paginator.page(3)
+        self.assertEqual([site.slug for site in page], ['test-site-5'])
+        self.assertEqual(page.smart_pages(), [1, 2, 3])
+
+
+class SiteSearchTestCase(TestCase):
+
+    def setUp(self):
+
+        Site.objects.create(name='Test Site 1', slug='test-site-1', facility='100% Uptime')
+        Site.objects.create(name='Test Site 2', slug='test-site-2', contact_name='J. Smith')
+
+    def test_icontains(self):
+
+        queryset = SiteFilter({'q': 'smith'}, queryset=Site.objects.all()).qs
+        self.assertIn('ILIKE', str(queryset.query))
+        self.assertEqual([site.slug for site in queryset], ['test-site-2'])
+
+        # Wildcard characters are matched literally
+        self.assertEqual(Site.objects.filter(facility__icontains='0%').count(), 1)
+        self.assertEqual(Site.objects.filter(facility__icontains='1%U').count(), 0)
+        self.assertEqual(Site.objects.filter(name__icontains='site_').count(), 0)
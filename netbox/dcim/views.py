@@ -1,24 +1,31 @@
 from __future__ import unicode_literals
 from copy import deepcopy
+import hashlib
 import re
 from natsort import natsorted
 from operator import attrgetter
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.core.paginator import EmptyPage, PageNotAnInteger
-from django.db.models import Count, Q
+from django.db.models import Count, F, Q
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.html import escape
 from django.utils.http import urlencode
 from django.utils.safestring import mark_safe
 from django.views.generic import View
 
-from ipam.models import Prefix, Service, VLAN
-from circuits.models import Circuit
+from ipam.models import Service
+from extras.counters import invalidate_counters
+from extras.rollups import annotate_stats, get_stats
 from extras.models import Graph, TopologyMap, GRAPH_TYPE_INTERFACE, GRAPH_TYPE_SITE, UserAction
 from utilities.forms import ConfirmationForm
 from utilities.paginator import EnhancedPaginator
@@ -30,7 +37,7 @@ from .models import (
     CONNECTION_STATUS_CONNECTED, ConsolePort, ConsolePortTemplate, ConsoleServerPort, ConsoleServerPortTemplate, Device,
     DeviceBay, DeviceBayTemplate, DeviceRole, DeviceType, Interface, InterfaceConnection, InterfaceTemplate,
     Manufacturer, InventoryItem, Platform, PowerOutlet, PowerOutletTemplate, PowerPort, PowerPortTemplate, Rack,
-    RackGroup, RackReservation, RackRole, Region, Site,
+    RackGroup, RackReservation, RackRole, Region, Site, SYNC_COMPONENTS_PERMISSIONS,
 )
 
 
@@ -60,6 +67,134 @@ def expand_pattern(string):
             yield "{0}{1}".format(lead, i)
 
 
+class ComponentFragment(object):
+    """
+    The rendered table rows for a set of Device components, along with the number of components they represent.
+    """
+    def __init__(self, rows, count):
+        self.rows = rows
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+
+def get_component_fragment(request, device, component, get_components, **extra_context):
+    """
+    Return a ComponentFragment for one type of component belonging to a Device. Rendered rows are cached under a key
+    derived from the Device's last_updated time (covering changes to the Device itself), its component_version (which
+    is bumped by signals whenever anything displayed among its components changes), the user's permissions, and any
+    extra context. get_components() is called only on a cache miss.
+    """
+    if request.user.is_superuser:
+        permissions = 'superuser'
+    else:
+        permissions = ','.join(sorted(request.user.get_all_permissions()))
+    fingerprint = hashlib.md5('{}|{}'.format(permissions, sorted(extra_context.items())).encode('utf-8')).hexdigest()
+    cache_key = 'dcim.device.{}.{}.{:%Y%m%d%H%M%S%f}.{}.{}'.format(
+        device.pk, component, device.last_updated, device.component_version, fingerprint
+    )
+
+    cached = cache.get(cache_key)
+    if cached is None:
+        components = get_components()
+        context = {
+            'component': component,
+            'components': components,
+            'device': device,
+        }
+        context.update(extra_context)
+        cached = (render_to_string('dcim/inc/device_component_rows.html', context, request), len(components))
+        cache.set(cache_key, cached, settings.CACHE_TIMEOUT)
+
+    return ComponentFragment(*cached)
+
+
+def validate_new_components(form, model, model_form, parent_field, parents, names, data):
+    """
+    Validate the creation of a component for each combination of parent object and name, and return a list of the new
+    (unsaved) components. Any errors are added to `form`. Rather than validating a ModelForm for every combination, the
+    attributes common to all new components are validated once using `model_form`, each name is validated using the
+    model's name field, each parent is validated using the model's clean() method, and naming conflicts are identified
+    using a single query for existing components.
+    """
+
+    class ComponentForm(model_form):
+
+        def validate_unique(self):
+            # The uniqueness of each (parent, name) pair is validated in bulk below
+            pass
+
+    # Validate the attributes common to all new components, using the first parent and name as stand-ins. Replace
+    # objects with their primary key to keep component_form.clean() happy.
+    component_data = {k: getattr(v, 'pk', v) for k, v in data.items()}
+    component_data.update({
+        parent_field: parents[0].pk,
+        'name': names[0],
+    })
+    component_form = ComponentForm(component_data)
+    if not component_form.is_valid():
+        for field, errors in component_form.errors.as_data().items():
+            # Assign errors on the child form's name field to name_pattern on the parent form
+            if field == 'name':
+                field = 'name_pattern'
+            for e in errors:
+                if field in form.fields:
+                    form.add_error(field, ', '.join(e))
+                else:
+                    form.add_error(None, '{}: {}'.format(parents[0], ', '.join(e)))
+        return []
+
+    # Validate the remaining names (e.g. their length) against the model's name field
+    name_field = model._meta.get_field('name')
+    for name in names[1:]:
+        try:
+            name_field.clean(name, None)
+        except ValidationError as e:
+            form.add_error('name_pattern', '{}: {}'.format(name, ', '.join(e.messages)))
+    if form.errors:
+        return []
+
+    attrs = {
+        f.attname: getattr(component_form.instance, f.attname) for f in model._meta.concrete_fields
+        if not f.primary_key and f.name not in (parent_field, 'name')
+    }
+
+    # Retrieve the names of all existing components belonging to the parent objects
+    existing_names = set(model.objects.filter(**{
+        '{}__in'.format(parent_field): parents,
+        'name__in': names,
+    }).values_list('{}_id'.format(parent_field), 'name'))
+    unique_error = '{} with this {} and name already exists.'.format(
+        model._meta.verbose_name.capitalize(), model._meta.get_field(parent_field).verbose_name
+    )
+
+    new_components = []
+    for parent in parents:
+
+        # Validate the new components against each parent object
+        component = model(**attrs)
+        setattr(component, parent_field, parent)
+        try:
+            component.clean()
+        except ValidationError as e:
+            for message in e.messages:
+                form.add_error(None, '{}: {}'.format(parent, message))
+            continue
+
+        for name in names:
+            label = name if len(parents) == 1 else '{} {}'.format(parent, name)
+            if (parent.pk, name) in existing_names:
+                form.add_error('name_pattern', '{}: {}'.format(label, unique_error))
+                continue
+            existing_names.add((parent.pk, name))
+            component = model(name=name, **attrs)
+            setattr(component, parent_field, parent)
+            new_components.append(component)
+
+    return new_components
+
+
 class ComponentCreateView(View):
     parent_model = None
     parent_field = None
@@ -86,33 +221,16 @@ class ComponentCreateView(View):
         form = self.form(parent, request.POST)
         if form.is_valid():
 
-            new_components = []
-            data = deepcopy(form.cleaned_data)
-
-            for name in form.cleaned_data['name_pattern']:
-                component_data = {
-                    self.parent_field: parent.pk,
-                    'name': name,
-                }
-                # Replace objects with their primary key to keep component_form.clean() happy
-                for k, v in data.items():
-                    if hasattr(v, 'pk'):
-                        component_data[k] = v.pk
-                    else:
-                        component_data[k] = v
-                component_form = self.model_form(component_data)
-                if component_form.is_valid():
-                    new_components.append(component_form.save(commit=False))
-                else:
-                    for field, errors in component_form.errors.as_data().items():
-                        # Assign errors on the child form's name field to name_pattern on the parent form
-                        if field == 'name':
-                            field = 'name_pattern'
-                        for e in errors:
-                            form.add_error(field, '{}: {}'.format(name, ', '.join(e)))
+            new_components = validate_new_components(
+                form, self.model, self.model_form, self.parent_field, [parent], form.cleaned_data['name_pattern'],
+                deepcopy(form.cleaned_data)
+            )
 
             if not form.errors:
                 self.model.objects.bulk_create(new_components)
+                # bulk_create() does not send signals, so bump the parent Device's component version manually.
+                if isinstance(parent, Device):
+                    Device.objects.filter(pk=parent.pk).update(component_version=F('component_version') + 1)
                 messages.success(request, "Added {} {} to {}.".format(
                     len(new_components), self.model._meta.verbose_name_plural, parent
                 ))
@@ -184,7 +302,7 @@ class BulkDisconnectView(View):
 #
 
 class RegionListView(ObjectListView):
-    queryset = Region.objects.annotate(site_count=Count('sites'))
+    queryset = annotate_stats(Region.objects.all())
     table = tables.RegionTable
     template_name = 'dcim/region_list.html'
 
@@ -205,7 +323,7 @@ class RegionEditView(RegionCreateView):
 class RegionBulkDeleteView(PermissionRequiredMixin, BulkDeleteView):
     permission_required = 'dcim.delete_region'
     cls = Region
-    queryset = Region.objects.annotate(site_count=Count('sites'))
+    queryset = annotate_stats(Region.objects.all())
     table = tables.RegionTable
     default_return_url = 'dcim:region_list'
 
@@ -227,13 +345,7 @@ class SiteView(View):
     def get(self, request, slug):
 
         site = get_object_or_404(Site.objects.select_related('region', 'tenant__group'), slug=slug)
-        stats = {
-            'rack_count': Rack.objects.filter(site=site).count(),
-            'device_count': Device.objects.filter(site=site).count(),
-            'prefix_count': Prefix.objects.filter(site=site).count(),
-            'vlan_count': VLAN.objects.filter(site=site).count(),
-            'circuit_count': Circuit.objects.filter(terminations__site=site).count(),
-        }
+        stats = get_stats(site)
         rack_groups = RackGroup.objects.filter(site=site).annotate(rack_count=Count('racks'))
         topology_maps = TopologyMap.objects.filter(site=site)
         show_graphs = Graph.objects.filter(type=GRAPH_TYPE_SITE).exists()
@@ -611,6 +723,7 @@ class DeviceTypeView(View):
             'poweroutlet_table': poweroutlet_table,
             'interface_table': interface_table,
             'devicebay_table': devicebay_table,
+            'can_sync_components': request.user.has_perms(SYNC_COMPONENTS_PERMISSIONS),
         })
 
 
@@ -632,6 +745,51 @@ class DeviceTypeDeleteView(PermissionRequiredMixin, ObjectDeleteView):
     default_return_url = 'dcim:devicetype_list'
 
 
+class DeviceTypeSyncComponentsView(PermissionRequiredMixin, View):
+    """
+    Create any components missing from existing instances of a DeviceType per its component templates.
+    """
+    permission_required = SYNC_COMPONENTS_PERMISSIONS
+
+    def get(self, request, pk):
+
+        devicetype = get_object_or_404(DeviceType, pk=pk)
+
+        return self.render_form(request, devicetype, ConfirmationForm())
+
+    def post(self, request, pk):
+
+        devicetype = get_object_or_404(DeviceType, pk=pk)
+        form = ConfirmationForm(request.POST)
+
+        if form.is_valid():
+            created = devicetype.sync_components()
+            summary = ', '.join([
+                '{} {}'.format(count, model._meta.verbose_name_plural) for model, count in created.items() if count
+            ])
+            if summary:
+                msg = 'Created {} on instances of {}'.format(summary, devicetype.full_name)
+                messages.success(request, msg)
+                UserAction.objects.log_bulk_create(request.user, ContentType.objects.get_for_model(Device), msg)
+            else:
+                messages.info(request, 'All instances of {} already have every component defined by its templates.'
+                              .format(devicetype.full_name))
+            return redirect(devicetype.get_absolute_url())
+
+        return self.render_form(request, devicetype, form)
+
+    def render_form(self, request, devicetype, form):
+
+        return render(request, 'dcim/devicetype_sync_components.html', {
+            'devicetype': devicetype,
+            'instance_count': devicetype.instances.count(),
+            'form': form,
+            'panel_class': 'primary',
+            'button_class': 'primary',
+            'return_url': devicetype.get_absolute_url(),
+        })
+
+
 class DeviceTypeBulkEditView(PermissionRequiredMixin, BulkEditView):
     permission_required = 'dcim.change_devicetype'
     cls = DeviceType
@@ -843,30 +1001,40 @@ class DeviceView(View):
         device = get_object_or_404(Device.objects.select_related(
             'site__region', 'rack__group', 'tenant__group', 'device_role', 'platform'
         ), pk=pk)
-        console_ports = natsorted(
+
+        # Show graph button on interfaces only if at least one graph has been created.
+        show_graphs = Graph.objects.filter(type=GRAPH_TYPE_INTERFACE).exists()
+
+        # Component lists are rendered from cache where possible; each queryset is evaluated only on a cache miss.
+        console_ports = get_component_fragment(request, device, 'consoleport', lambda: natsorted(
             ConsolePort.objects.filter(device=device).select_related('cs_port__device'), key=attrgetter('name')
-        )
-        cs_ports = natsorted(
-            ConsoleServerPort.objects.filter(device=device).select_related('connected_console'), key=attrgetter('name')
-        )
-        power_ports = natsorted(
+        ))
+        cs_ports = get_component_fragment(request, device, 'consoleserverport', lambda: natsorted(
+            ConsoleServerPort.objects.filter(device=device).select_related('connected_console__device'),
+            key=attrgetter('name')
+        ))
+        power_ports = get_component_fragment(request, device, 'powerport', lambda: natsorted(
             PowerPort.objects.filter(device=device).select_related('power_outlet__device'), key=attrgetter('name')
-        )
-        power_outlets = natsorted(
-            PowerOutlet.objects.filter(device=device).select_related('connected_port'), key=attrgetter('name')
-        )
-        interfaces = Interface.objects.order_naturally(
-            device.device_type.interface_ordering
-        ).filter(
-            device=device
-        ).select_related(
-            'connected_as_a__interface_b__device', 'connected_as_b__interface_a__device',
-            'circuit_termination__circuit'
-        ).prefetch_related('ip_addresses')
-        device_bays = natsorted(
+        ))
+        power_outlets = get_component_fragment(request, device, 'poweroutlet', lambda: natsorted(
+            PowerOutlet.objects.filter(device=device).select_related('connected_port__device'), key=attrgetter('name')
+        ))
+        interfaces = get_component_fragment(request, device, 'interface', lambda: list(
+            Interface.objects.order_naturally(
+                device.device_type.interface_ordering
+            ).filter(
+                device=device
+            ).select_related(
+                'lag', 'connected_as_a__interface_b__device', 'connected_as_b__interface_a__device',
+                'circuit_termination__circuit'
+            ).prefetch_related(
+                'ip_addresses__vrf', 'member_interfaces'
+            )
+        ), show_graphs=show_graphs)
+        device_bays = get_component_fragment(request, device, 'devicebay', lambda: natsorted(
             DeviceBay.objects.filter(device=device).select_related('installed_device__device_type__manufacturer'),
             key=attrgetter('name')
-        )
+        ))
         services = Service.objects.filter(device=device)
         secrets = device.secrets.all()
 
@@ -879,9 +1047,6 @@ class DeviceView(View):
             'rack', 'device_type__manufacturer'
         )[:10]
 
-        # Show graph button on interfaces only if at least one graph has been created.
-        show_graphs = Graph.objects.filter(type=GRAPH_TYPE_INTERFACE).exists()
-
         return render(request, 'dcim/device.html', {
             'device': device,
             'console_ports': console_ports,
@@ -993,17 +1158,6 @@ class ChildDeviceBulkImportView(PermissionRequiredMixin, BulkImportView):
     template_name = 'dcim/device_import_child.html'
     default_return_url = 'dcim:device_list'
 
-    def _save_obj(self, obj_form):
-
-        obj = obj_form.save()
-
-        # Save the reverse relation to the parent device bay
-        device_bay = obj.parent_bay
-        device_bay.installed_device = obj
-        device_bay.save()
-
-        return obj
-
 
 class DeviceBulkEditView(PermissionRequiredMixin, BulkEditView):
     permission_required = 'dcim.change_device'
@@ -1247,7 +1401,12 @@ class ConsoleServerPortBulkDisconnectView(PermissionRequiredMixin, BulkDisconnec
     form = forms.ConsoleServerPortBulkDisconnectForm
 
     def disconnect_objects(self, cs_ports):
-        return ConsolePort.objects.filter(cs_port__in=cs_ports).update(cs_port=None, connection_status=None)
+        Device.objects.filter(
+            Q(cs_ports__in=cs_ports) | Q(console_ports__cs_port__in=cs_ports)
+        ).update(component_version=F('component_version') + 1)
+        count = ConsolePort.objects.filter(cs_port__in=cs_ports).update(cs_port=None, connection_status=None)
+        invalidate_counters(ConsolePort, ['cs_port'])
+        return count
 
 
 class ConsoleServerPortBulkDeleteView(PermissionRequiredMixin, BulkDeleteView):
@@ -1480,9 +1639,14 @@ class PowerOutletBulkDisconnectView(PermissionRequiredMixin, BulkDisconnectView)
     form = forms.PowerOutletBulkDisconnectForm
 
     def disconnect_objects(self, power_outlets):
-        return PowerPort.objects.filter(power_outlet__in=power_outlets).update(
+        Device.objects.filter(
+            Q(power_outlets__in=power_outlets) | Q(power_ports__power_outlet__in=power_outlets)
+        ).update(component_version=F('component_version') + 1)
+        count = PowerPort.objects.filter(power_outlet__in=power_outlets).update(
             power_outlet=None, connection_status=None
         )
+        invalidate_counters(PowerPort, ['power_outlet'])
+        return count
 
 
 class PowerOutletBulkDeleteView(PermissionRequiredMixin, BulkDeleteView):
@@ -1535,6 +1699,12 @@ class InterfaceBulkEditView(PermissionRequiredMixin, BulkEditView):
     table = tables.InterfaceTable
     form = forms.InterfaceBulkEditForm
 
+    def post(self, request, **kwargs):
+        response = super(InterfaceBulkEditView, self).post(request, **kwargs)
+        # Interfaces are updated in bulk without sending signals, so bump the parent Device's component version.
+        Device.objects.filter(pk=kwargs['pk']).update(component_version=F('component_version') + 1)
+        return response
+
 
 class InterfaceBulkDeleteView(PermissionRequiredMixin, BulkDeleteView):
     permission_required = 'dcim.delete_interface'
@@ -1651,27 +1821,18 @@ class DeviceBulkAddComponentView(View):
             form = self.form(request.POST)
             if form.is_valid():
 
-                new_components = []
                 data = deepcopy(form.cleaned_data)
-                for device in data['pk']:
-
-                    names = data['name_pattern']
-                    for name in names:
-                        component_data = {
-                            'device': device.pk,
-                            'name': name,
-                        }
-                        component_data.update(data)
-                        component_form = self.model_form(component_data)
-                        if component_form.is_valid():
-                            new_components.append(component_form.save(commit=False))
-                        else:
-                            for field, errors in component_form.errors.as_data().items():
-                                for e in errors:
-                                    form.add_error(field, '{} {}: {}'.format(device, name, ', '.join(e)))
+                devices = list(data['pk'].select_related('device_type'))
+                new_components = validate_new_components(
+                    form, self.model, self.model_form, 'device', devices, data['name_pattern'], data
+                )
 
                 if not form.errors:
                     self.model.objects.bulk_create(new_components)
+                    # bulk_create() does not send signals, so bump each Device's component version manually.
+                    Device.objects.filter(pk__in=[device.pk for device in devices]).update(
+                        component_version=F('component_version') + 1
+                    )
                     messages.success(request, "Added {} {} to {} devices.".format(
                         len(new_components), self.model._meta.verbose_name_plural, len(form.cleaned_data['pk'])
                     ))
@@ -1844,6 +2005,7 @@ class ConsoleConnectionsListView(ObjectListView):
     filter_form = forms.ConsoleConnectionFilterForm
     table = tables.ConsoleConnectionTable
     template_name = 'dcim/console_connections_list.html'
+    keyset_pagination = True
 
 
 class PowerConnectionsListView(ObjectListView):
@@ -1853,6 +2015,7 @@ class PowerConnectionsListView(ObjectListView):
     filter_form = forms.PowerConnectionFilterForm
     table = tables.PowerConnectionTable
     template_name = 'dcim/power_connections_list.html'
+    keyset_pagination = True
 
 
 class InterfaceConnectionsListView(ObjectListView):
@@ -1862,6 +2025,7 @@ class InterfaceConnectionsListView(ObjectListView):
     filter_form = forms.InterfaceConnectionFilterForm
     table = tables.InterfaceConnectionTable
     template_name = 'dcim/interface_connections_list.html'
+    keyset_pagination = True
 
 
 #
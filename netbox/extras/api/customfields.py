@@ -24,7 +24,7 @@ class CustomFieldsSerializer(serializers.BaseSerializer):
     def to_internal_value(self, data):
 
         content_type = ContentType.objects.get_for_model(self.parent.Meta.model)
-        custom_fields = {field.name: field for field in CustomField.objects.filter(obj_type=content_type)}
+        custom_fields = {field.name: field for field in CustomField.objects.get_for_content_type(content_type)}
 
         for field_name, value in data.items():
 
@@ -77,12 +77,12 @@ class CustomFieldModelSerializer(serializers.ModelSerializer):
     def __init__(self, *args, **kwargs):
 
         def _populate_custom_fields(instance, fields):
-            custom_fields = {f.name: None for f in fields}
-            for cfv in instance.custom_field_values.all():
-                if cfv.field.type == CF_TYPE_SELECT:
-                    custom_fields[cfv.field.name] = CustomFieldChoiceSerializer(cfv.value).data
-                else:
-                    custom_fields[cfv.field.name] = cfv.value
+            custom_fields = {}
+            for field in fields:
+                value = field.value_from_data(instance.custom_field_data)
+                if field.type == CF_TYPE_SELECT and value is not None:
+                    value = CustomFieldChoiceSerializer(value).data
+                custom_fields[field.name] = value
             instance.custom_fields = custom_fields
 
         super(CustomFieldModelSerializer, self).__init__(*args, **kwargs)
@@ -90,8 +90,7 @@ class CustomFieldModelSerializer(serializers.ModelSerializer):
         if self.instance is not None:
 
             # Retrieve the set of CustomFields which apply to this type of object
-            content_type = ContentType.objects.get_for_model(self.Meta.model)
-            fields = CustomField.objects.filter(obj_type=content_type)
+            fields = CustomField.objects.get_for_model(self.Meta.model)
 
             # Populate CustomFieldValues for each instance from database
             try:
@@ -101,15 +100,11 @@ class CustomFieldModelSerializer(serializers.ModelSerializer):
                 _populate_custom_fields(self.instance, fields)
 
     def _save_custom_fields(self, instance, custom_fields):
-        content_type = ContentType.objects.get_for_model(self.Meta.model)
-        for field_name, value in custom_fields.items():
-            custom_field = CustomField.objects.get(name=field_name)
-            CustomFieldValue.objects.update_or_create(
-                field=custom_field,
-                obj_type=content_type,
-                obj_id=instance.pk,
-                defaults={'serialized_value': custom_field.serialize_value(value)},
-            )
+        fields = {field.name: field for field in CustomField.objects.get_for_model(self.Meta.model)}
+        custom_field_data = CustomFieldValue.objects.save_values(self.Meta.model, [
+            (fields[field_name], instance.pk, value) for field_name, value in custom_fields.items()
+        ])
+        instance.custom_field_data = custom_field_data.get(instance.pk, instance.custom_field_data)
 
     def validate(self, data):
         """
@@ -7,7 +7,8 @@ from rest_framework import serializers
 from dcim.api.serializers import NestedDeviceSerializer, NestedRackSerializer, NestedSiteSerializer
 from dcim.models import Device, Rack, Site
 from extras.models import (
-    ACTION_CHOICES, ExportTemplate, Graph, GRAPH_TYPE_CHOICES, ImageAttachment, TopologyMap, UserAction,
+    ACTION_CHOICES, ExportTemplate, Graph, GRAPH_TYPE_CHOICES, ImageAttachment, Job, JOB_STATUS_CHOICES, TopologyMap,
+    UserAction,
 )
 from users.api.serializers import NestedUserSerializer
 from utilities.api import ChoiceFieldSerializer, ContentTypeFieldSerializer, ModelValidationMixin
@@ -138,3 +139,18 @@ class UserActionSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserAction
         fields = ['id', 'time', 'user', 'action', 'message']
+
+
+#
+# Background jobs
+#
+
+class JobSerializer(serializers.ModelSerializer):
+    user = NestedUserSerializer()
+    status = ChoiceFieldSerializer(choices=JOB_STATUS_CHOICES)
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'name', 'user', 'created', 'started', 'completed', 'status', 'progress', 'total', 'result', 'error',
+        ]
@@ -31,5 +31,8 @@ router.register(r'image-attachments', views.ImageAttachmentViewSet)
 # Recent activity
 router.register(r'recent-activity', views.RecentActivityViewSet)
 
+# Background jobs
+router.register(r'jobs', views.JobViewSet)
+
 app_name = 'extras-api'
 urlpatterns = router.urls
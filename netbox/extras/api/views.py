@@ -1,18 +1,43 @@
 from __future__ import unicode_literals
 
+from rest_framework import status
 from rest_framework.decorators import detail_route
+from rest_framework.exceptions import NotAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from django.contrib.contenttypes.models import ContentType
+from django.conf import settings
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 
 from extras import filters
-from extras.models import ExportTemplate, Graph, ImageAttachment, TopologyMap, UserAction
-from utilities.api import WritableSerializerMixin
+from extras.models import CustomField, ExportTemplate, Graph, ImageAttachment, Job, TopologyMap, UserAction
+from utilities.api import ServiceUnavailable, WritableSerializerMixin
 from . import serializers
 
 
+def background_requested(request):
+    """
+    Return True if the client has requested that an operation be run as a background job (by passing
+    `?background=true`).
+    """
+    return request.query_params.get('background', '').lower() in ('true', '1')
+
+
+def enqueue_job(request, name, **kwargs):
+    """
+    Enqueue a background job on behalf of the requesting user, and return a 202 (Accepted) response representing it.
+    The job's progress and result may be retrieved from the jobs endpoint.
+    """
+    if not settings.BACKGROUND_JOBS:
+        raise ServiceUnavailable("Background jobs are not enabled.")
+    if not request.user.is_authenticated:
+        raise NotAuthenticated()
+    job = Job.objects.enqueue(name, user=request.user, **kwargs)
+    serializer = serializers.JobSerializer(job, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
 class CustomFieldModelViewSet(ModelViewSet):
     """
     Include the applicable set of CustomFields in the ModelViewSet context.
@@ -21,8 +46,7 @@ class CustomFieldModelViewSet(ModelViewSet):
     def get_serializer_context(self):
 
         # Gather all custom fields for the model
-        content_type = ContentType.objects.get_for_model(self.queryset.model)
-        custom_fields = content_type.custom_fields.prefetch_related('choices')
+        custom_fields = CustomField.objects.get_for_model(self.queryset.model)
 
         # Cache all relevant CustomFieldChoices. This saves us from having to do a lookup per select field per object.
         custom_field_choices = {}
@@ -38,10 +62,6 @@ class CustomFieldModelViewSet(ModelViewSet):
         })
         return context
 
-    def get_queryset(self):
-        # Prefetch custom field values
-        return super(CustomFieldModelViewSet, self).get_queryset().prefetch_related('custom_field_values__field')
-
 
 class GraphViewSet(WritableSerializerMixin, ModelViewSet):
     queryset = Graph.objects.all()
@@ -68,6 +88,10 @@ class TopologyMapViewSet(WritableSerializerMixin, ModelViewSet):
         tmap = get_object_or_404(TopologyMap, pk=pk)
         img_format = 'png'
 
+        # The rendered image is returned base64-encoded as the job's result
+        if background_requested(request):
+            return enqueue_job(request, 'extras.render_topology_map', pk=tmap.pk, img_format=img_format)
+
         try:
             data = tmap.render(img_format=img_format)
         except:
@@ -95,3 +119,20 @@ class RecentActivityViewSet(ReadOnlyModelViewSet):
     queryset = UserAction.objects.all()
     serializer_class = serializers.UserActionSerializer
     filter_class = filters.UserActionFilter
+
+
+class JobViewSet(ReadOnlyModelViewSet):
+    """
+    List background jobs. Users may view only their own jobs.
+    """
+    queryset = Job.objects.select_related('user')
+    serializer_class = serializers.JobSerializer
+    filter_class = filters.JobFilter
+
+    def get_queryset(self):
+        queryset = super(JobViewSet, self).get_queryset()
+        if not self.request.user.is_authenticated:
+            return queryset.none()
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
@@ -0,0 +1,15 @@
+from __future__ import unicode_literals
+
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class ExtrasConfig(AppConfig):
+    name = "extras"
+    verbose_name = "Extras"
+
+    def ready(self):
+        import extras.signals
+
+        # Register the job functions provided by each app
+        autodiscover_modules('jobs')
@@ -0,0 +1,96 @@
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.signals import post_delete
+
+from utilities.signals import connect_post_save
+from .models import CacheVersion
+
+
+# The models whose modification invalidates any cached choice counts
+CHOICE_COUNT_MODELS = set()
+
+
+def _get_version_name(model):
+    return 'choicecounts.{}'.format(model._meta.label_lower)
+
+
+def _resolve_lookup(model, lookup):
+    """
+    Resolve a lookup spanning reverse foreign key relations from a model (e.g. 'racks__devices' from Site) into the
+    model counted (Device), the lookup of the original model relative to it ('rack__site') and the models traversed.
+    """
+    path = []
+    models = []
+    for name in lookup.split('__'):
+        field = model._meta.get_field(name)
+        if not (field.one_to_many and field.auto_created):
+            raise ValueError("{} is not a reverse foreign key relation of {}.".format(name, model._meta.object_name))
+        model = field.related_model
+        path.insert(0, field.field.name)
+        models.append(model)
+    return model, '__'.join(path), models
+
+
+def counted_object_changed(sender, **kwargs):
+    """
+    Signal receiver connected to each registered model (see utilities.csvimport for objects created in bulk).
+    """
+    invalidate_choice_counts(sender)
+
+
+def _register_models(models):
+    for model in models:
+        if model not in CHOICE_COUNT_MODELS:
+            CHOICE_COUNT_MODELS.add(model)
+            connect_post_save(counted_object_changed, model, bulk_create_safe=True)
+            post_delete.connect(counted_object_changed, sender=model)
+
+
+def _get_counts(counted_model, lookup, models):
+    versions = CacheVersion.objects.get_versions([_get_version_name(model) for model in models])
+    cache_key = 'extras.choicecounts.{}.{}.{}'.format(
+        counted_model._meta.label_lower, lookup, '.'.join(str(version) for version in versions)
+    )
+    counts = cache.get(cache_key)
+    if counts is None:
+        queryset = counted_model.objects.filter(**{'{}__isnull'.format(lookup): False})
+        counts = dict(queryset.order_by().values_list(lookup).annotate(count=Count('pk')))
+        cache.set(cache_key, counts, settings.CACHE_TIMEOUT)
+    return counts
+
+
+def register_related_count(model, lookup):
+    """
+    Register the count of objects related to each instance of a model by a lookup spanning reverse foreign key
+    relations (e.g. Site and 'racks'). Counts are invalidated whenever any of the models traversed is modified.
+    """
+    _register_models(_resolve_lookup(model, lookup)[2])
+
+
+def get_related_counts(model, lookup):
+    """
+    Return a dictionary mapping the primary key of each instance of a model to the number of objects related to it by
+    a lookup spanning reverse foreign key relations. Instances with no related objects are omitted.
+    """
+    counted_model, path, models = _resolve_lookup(model, lookup)
+    _register_models(models)
+    return _get_counts(counted_model, path, models)
+
+
+def get_value_counts(model, field):
+    """
+    Return a dictionary mapping each value of a field to the number of instances of a model having that value.
+    """
+    _register_models([model])
+    return _get_counts(model, field, [model])
+
+
+def invalidate_choice_counts(model):
+    """
+    Invalidate all cached counts involving a model once the current transaction (if any) has been committed.
+    """
+    if model in CHOICE_COUNT_MODELS:
+        CacheVersion.objects.increment(_get_version_name(model))
@@ -60,3 +60,23 @@ ACTION_CHOICES = (
     (ACTION_DELETE, 'deleted'),
     (ACTION_BULK_DELETE, 'bulk deleted'),
 )
+
+# Background job statuses
+JOB_PENDING = 1
+JOB_RUNNING = 2
+JOB_COMPLETED = 3
+JOB_FAILED = 4
+JOB_STATUS_CHOICES = (
+    (JOB_PENDING, 'Pending'),
+    (JOB_RUNNING, 'Running'),
+    (JOB_COMPLETED, 'Completed'),
+    (JOB_FAILED, 'Failed'),
+)
+
+# Bootstrap CSS classes for job statuses
+JOB_STATUS_CLASSES = {
+    JOB_PENDING: 'default',
+    JOB_RUNNING: 'info',
+    JOB_COMPLETED: 'success',
+    JOB_FAILED: 'danger',
+}
@@ -0,0 +1,111 @@
+from __future__ import unicode_literals
+from collections import OrderedDict, defaultdict
+
+from circuits.models import Circuit, Provider
+from dcim.models import ConsolePort, Device, InterfaceConnection, PowerPort, Rack, Site
+from ipam.models import Aggregate, IPAddress, Prefix, VLAN, VRF
+from secrets.models import Secret
+from tenancy.models import Tenant
+from .models import ObjectCounter
+
+
+# The object counters displayed on the home page. Each counter is mapped to the model it counts and, optionally, a
+# field which an object must have set in order to be counted (e.g. a ConsolePort counts as a console connection only if
+# it is connected to a console server port).
+#
+# Counters of all objects are adjusted as objects are created and deleted. Counters of objects having a field set are
+# adjusted when such an object is created; as the previous state of a modified object is not known, they are otherwise
+# invalidated (and recounted when next read) whenever an object which may have been counted is modified or deleted.
+COUNTERS = OrderedDict((
+    ('site_count', (Site, None)),
+    ('tenant_count', (Tenant, None)),
+    ('rack_count', (Rack, None)),
+    ('device_count', (Device, None)),
+    ('interface_connections_count', (InterfaceConnection, None)),
+    ('console_connections_count', (ConsolePort, 'cs_port')),
+    ('power_connections_count', (PowerPort, 'power_outlet')),
+    ('vrf_count', (VRF, None)),
+    ('aggregate_count', (Aggregate, None)),
+    ('prefix_count', (Prefix, None)),
+    ('ipaddress_count', (IPAddress, None)),
+    ('vlan_count', (VLAN, None)),
+    ('provider_count', (Provider, None)),
+    ('circuit_count', (Circuit, None)),
+    ('secret_count', (Secret, None)),
+))
+
+# The (counter name, field) pairs of each counted model
+MODEL_COUNTERS = defaultdict(list)
+for name, (model, field) in COUNTERS.items():
+    MODEL_COUNTERS[model].append((name, field))
+
+
+def count_objects(name):
+    """
+    Count the objects counted by the named counter.
+    """
+    model, field = COUNTERS[name]
+    queryset = model.objects.all()
+    if field is not None:
+        queryset = queryset.filter(**{'{}__isnull'.format(field): False})
+    return queryset.count()
+
+
+def is_counted(obj, field):
+    return field is None or getattr(obj, obj._meta.get_field(field).attname) is not None
+
+
+def get_counters():
+    """
+    Return a dictionary mapping each counter to its value. Any counter which has been invalidated (or does not yet
+    exist) is recounted.
+    """
+    values = {}
+    for name, value, version in ObjectCounter.objects.filter(name__in=COUNTERS).values_list('name', 'value', 'version'):
+        if value is None:
+            value = count_objects(name)
+            ObjectCounter.objects.set_value(name, value, version=version)
+        values[name] = value
+    for name in COUNTERS:
+        if name not in values:
+            values[name] = count_objects(name)
+            ObjectCounter.objects.get_or_create(name=name, defaults={'value': values[name]})
+    return values
+
+
+def reconcile_counters():
+    """
+    Recount the objects counted by every counter, correcting any counter whose value is wrong. Returns a list of
+    (name, previous value, correct value) tuples for each counter which has been corrected.
+    """
+    previous_values = dict(ObjectCounter.objects.values_list('name', 'value'))
+    corrections = []
+    for name in COUNTERS:
+        value = count_objects(name)
+        if previous_values.get(name) != value:
+            ObjectCounter.objects.set_value(name, value)
+            corrections.append((name, previous_values.get(name), value))
+    return corrections
+
+
+def count_created_objects(model, objects):
+    """
+    Adjust the counters of a model following the creation of the given objects.
+    """
+    for name, field in MODEL_COUNTERS.get(model, []):
+        delta = len([obj for obj in objects if is_counted(obj, field)])
+        if delta:
+            ObjectCounter.objects.adjust([name], delta)
+
+
+def invalidate_counters(model, fields=None):
+    """
+    Invalidate the counters of a model which depend on any of the given fields (or on any field, if none are given),
+    e.g. following a bulk update of its objects.
+    """
+    names = [
+        name for name, field in MODEL_COUNTERS.get(model, [])
+        if field is not None and (fields is None or field in fields)
+    ]
+    if names:
+        ObjectCounter.objects.invalidate(names)
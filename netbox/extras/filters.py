@@ -1,53 +1,112 @@
 from __future__ import unicode_literals
 
+from datetime import datetime
 import django_filters
 
 from django.contrib.auth.models import User
-from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.fields.jsonb import KeyTextTransform
+from django.db.models import BigIntegerField, DateField
+from django.db.models.functions import Cast
 
 from dcim.models import Site
-from .models import CF_TYPE_SELECT, CustomField, Graph, ExportTemplate, TopologyMap, UserAction
+from .models import (
+    CF_TYPE_BOOLEAN, CF_TYPE_DATE, CF_TYPE_INTEGER, CF_TYPE_SELECT, CF_TYPE_TEXT, CF_TYPE_URL, CustomField, Graph,
+    ExportTemplate, Job, JOB_STATUS_CHOICES, TopologyMap, UserAction,
+)
 
 
 class CustomFieldFilter(django_filters.Filter):
     """
-    Filter objects by the presence of a CustomFieldValue. The filter's name is used as the CustomField name.
+    Filter objects by the value of a CustomField, as recorded in their custom_field_data. Exact matches are evaluated
+    using JSONB containment, which is supported by the GIN index on custom_field_data. Range and text lookups are
+    evaluated against the typed value, limited to objects having a value for the field (which is also indexed).
     """
 
-    def __init__(self, cf_type, *args, **kwargs):
-        self.cf_type = cf_type
+    def __init__(self, custom_field, *args, **kwargs):
+        self.custom_field = custom_field
         super(CustomFieldFilter, self).__init__(*args, **kwargs)
 
     def filter(self, queryset, value):
         # Skip filter on empty value
-        if not value.strip():
+        value = value.strip()
+        if not value:
             return queryset
+        cf = self.custom_field
+        key = str(cf.pk)
+
         # Treat 0 as None for Select fields
+        if cf.type == CF_TYPE_SELECT and value == '0':
+            return queryset.exclude(custom_field_data__has_key=key)
+
+        # Convert the value to its representation in custom_field_data. Invalid values match nothing.
         try:
-            if self.cf_type == CF_TYPE_SELECT and int(value) == 0:
-                return queryset.exclude(
-                    custom_field_values__field__name=self.name,
-                )
+            value = self.to_data_value(value)
         except ValueError:
-            pass
-        return queryset.filter(
-            custom_field_values__field__name=self.name,
-            custom_field_values__serialized_value__icontains=value,
-        )
+            return queryset.none()
+
+        if self.lookup_expr == 'exact':
+            return queryset.filter(custom_field_data__contains={key: value})
+
+        # Cast the value to the field's type for comparison. The alias is derived from the field's primary key rather
+        # than its name, which could form an invalid lookup.
+        expression = KeyTextTransform(key, 'custom_field_data')
+        if cf.type == CF_TYPE_INTEGER:
+            expression = Cast(expression, BigIntegerField())
+        elif cf.type == CF_TYPE_DATE:
+            expression = Cast(expression, DateField())
+        alias = 'cf_{}_{}'.format(key, self.lookup_expr)
+        return queryset.filter(custom_field_data__has_key=key).annotate(**{alias: expression}).filter(**{
+            '{}__{}'.format(alias, self.lookup_expr): value
+        })
+
+    def to_data_value(self, value):
+        """
+        Convert a filter value to the form in which the CustomField's values are recorded in custom_field_data. Raise
+        ValueError if the value is not valid for the field's type.
+        """
+        cf_type = self.custom_field.type
+        if cf_type in (CF_TYPE_INTEGER, CF_TYPE_SELECT):
+            return int(value)
+        if cf_type == CF_TYPE_BOOLEAN:
+            if value.lower() in ('true', 'yes', '1'):
+                return True
+            if value.lower() in ('false', 'no', '0'):
+                return False
+            raise ValueError("Invalid boolean value: {}".format(value))
+        if cf_type == CF_TYPE_DATE:
+            # Validate and normalize the date (YYYY-MM-DD)
+            return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+        return value
 
 
 class CustomFieldFilterSet(django_filters.FilterSet):
     """
-    Dynamically add a Filter for each CustomField applicable to the parent model.
+    Dynamically add Filters for each CustomField applicable to the parent model. Each field can be filtered by its
+    exact value (cf_<name>), except for text and URL fields, which match any value containing the given string. Integer
+    and date fields may also be filtered by range (cf_<name>__gte and cf_<name>__lte), and text and URL fields by exact
+    value (cf_<name>__exact) or prefix (cf_<name>__startswith).
     """
 
     def __init__(self, *args, **kwargs):
         super(CustomFieldFilterSet, self).__init__(*args, **kwargs)
 
-        obj_type = ContentType.objects.get_for_model(self._meta.model)
-        custom_fields = CustomField.objects.filter(obj_type=obj_type, is_filterable=True)
-        for cf in custom_fields:
-            self.filters['cf_{}'.format(cf.name)] = CustomFieldFilter(name=cf.name, cf_type=cf.type)
+        for cf in CustomField.objects.get_for_model(self._meta.model):
+            if not cf.is_filterable:
+                continue
+            name = 'cf_{}'.format(cf.name)
+            if cf.type in (CF_TYPE_TEXT, CF_TYPE_URL):
+                self.filters[name] = CustomFieldFilter(name=cf.name, custom_field=cf, lookup_expr='icontains')
+                for lookup_expr in ('exact', 'startswith'):
+                    self.filters['{}__{}'.format(name, lookup_expr)] = CustomFieldFilter(
+                        name=cf.name, custom_field=cf, lookup_expr=lookup_expr
+                    )
+            else:
+                self.filters[name] = CustomFieldFilter(name=cf.name, custom_field=cf)
+                if cf.type in (CF_TYPE_INTEGER, CF_TYPE_DATE):
+                    for lookup_expr in ('gte', 'lte'):
+                        self.filters['{}__{}'.format(name, lookup_expr)] = CustomFieldFilter(
+                            name=cf.name, custom_field=cf, lookup_expr=lookup_expr
+                        )
 
 
 class GraphFilter(django_filters.FilterSet):
@@ -92,3 +151,13 @@ class UserActionFilter(django_filters.FilterSet):
     class Meta:
         model = UserAction
         fields = ['user']
+
+
+class JobFilter(django_filters.FilterSet):
+    status = django_filters.MultipleChoiceFilter(
+        choices=JOB_STATUS_CHOICES
+    )
+
+    class Meta:
+        model = Job
+        fields = ['name', 'status']
@@ -16,10 +16,9 @@ def get_custom_fields_for_model(content_type, filterable_only=False, bulk_edit=F
     Retrieve all CustomFields applicable to the given ContentType
     """
     field_dict = OrderedDict()
-    kwargs = {'obj_type': content_type}
+    custom_fields = CustomField.objects.get_for_content_type(content_type)
     if filterable_only:
-        kwargs['is_filterable'] = True
-    custom_fields = CustomField.objects.filter(**kwargs)
+        custom_fields = [cf for cf in custom_fields if cf.is_filterable]
 
     for cf in custom_fields:
         field_name = 'cf_{}'.format(str(cf.name))
@@ -98,22 +97,11 @@ class CustomFieldForm(forms.ModelForm):
 
     def _save_custom_fields(self):
 
-        for field_name in self.custom_fields:
-            try:
-                cfv = CustomFieldValue.objects.select_related('field').get(field=self.fields[field_name].model,
-                                                                           obj_type=self.obj_type,
-                                                                           obj_id=self.instance.pk)
-            except CustomFieldValue.DoesNotExist:
-                # Skip this field if none exists already and its value is empty
-                if self.cleaned_data[field_name] in [None, '']:
-                    continue
-                cfv = CustomFieldValue(
-                    field=self.fields[field_name].model,
-                    obj_type=self.obj_type,
-                    obj_id=self.instance.pk
-                )
-            cfv.value = self.cleaned_data[field_name]
-            cfv.save()
+        custom_field_data = CustomFieldValue.objects.save_values(self._meta.model, [
+            (self.fields[field_name].model, self.instance.pk, self.cleaned_data[field_name])
+            for field_name in self.custom_fields
+        ])
+        self.instance.custom_field_data = custom_field_data.get(self.instance.pk, self.instance.custom_field_data)
 
     def save(self, commit=True):
         obj = super(CustomFieldForm, self).save(commit)
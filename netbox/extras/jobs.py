@@ -0,0 +1,55 @@
+from __future__ import unicode_literals
+import base64
+
+from django.core.management import call_command
+from django.utils.six import StringIO
+
+from .models import TopologyMap
+
+
+# Job functions, keyed by name
+JOB_FUNCTIONS = {}
+
+
+def register_job(name):
+    """
+    Register a function to be called by a background worker when a Job of the given name is run. The function is
+    called with the Job followed by the keyword arguments with which it was enqueued, and its return value (which must
+    be JSON-serializable) is saved as the Job's result. Job functions are registered in a `jobs` module within each
+    app, which is loaded when NetBox starts.
+    """
+    def _register(func):
+        JOB_FUNCTIONS[name] = func
+        return func
+    return _register
+
+
+def get_job_function(name):
+    try:
+        return JOB_FUNCTIONS[name]
+    except KeyError:
+        raise ValueError("Unknown job: {}".format(name))
+
+
+@register_job('extras.render_topology_map')
+def render_topology_map(job, pk, img_format='png'):
+    """
+    Render a TopologyMap. The image is returned base64-encoded.
+    """
+    tmap = TopologyMap.objects.get(pk=pk)
+    return {
+        'filename': '{}.{}'.format(tmap.slug, img_format),
+        'content_type': 'image/{}'.format(img_format),
+        'data': base64.b64encode(tmap.render(img_format=img_format)).decode('ascii'),
+    }
+
+
+@register_job('extras.run_inventory')
+def run_inventory(job, **options):
+    """
+    Run the run_inventory management command with the given options, using the configured NAPALM credentials. The
+    command's output is returned.
+    """
+    output = StringIO()
+    call_command('run_inventory', stdout=output, **options)
+    return {'output': output.getvalue()}
@@ -0,0 +1,40 @@
+from __future__ import unicode_literals
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from extras.models import Job, JOB_COMPLETED
+
+
+class Command(BaseCommand):
+    help = "Run pending background jobs. Any number of workers may be run concurrently."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', default=False,
+                            help="Exit once there are no pending jobs")
+        parser.add_argument('--interval', dest='interval', type=float, default=1,
+                            help="Number of seconds to wait before checking again for pending jobs (default: 1)")
+
+    def handle(self, *args, **options):
+
+        while True:
+
+            # Discard any database connection which has become unusable (e.g. following a failed job)
+            close_old_connections()
+
+            job = Job.objects.claim()
+            if job is None:
+                if options['burst']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write("Running {}...".format(job), ending='')
+            self.stdout.flush()
+            job.run()
+            self.stdout.write(" {}".format(job.get_status_display()))
+            if job.status != JOB_COMPLETED and options['verbosity'] > 1:
+                self.stdout.write(job.error)
+
+        self.stdout.write("Finished.")
@@ -0,0 +1,18 @@
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from extras.models import UserAction
+
+
+class Command(BaseCommand):
+    help = "Delete user actions older than USER_ACTION_RETENTION days"
+
+    def handle(self, *args, **options):
+
+        if not settings.USER_ACTION_RETENTION:
+            self.stdout.write("USER_ACTION_RETENTION is disabled; no actions were deleted.")
+            return
+        deleted = UserAction.objects.prune()
+        self.stdout.write("Finished ({} actions deleted).".format(deleted))
@@ -0,0 +1,37 @@
+from __future__ import unicode_literals
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from extras.search import SEARCH_INDEX, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search index for all (or the specified) types of object"
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', metavar='app_label.ModelName',
+                            help="The models to be indexed (default: all indexed models)")
+
+    def handle(self, *args, **options):
+
+        if options['models']:
+            models = []
+            for label in options['models']:
+                try:
+                    model = apps.get_model(label)
+                except (LookupError, ValueError):
+                    raise CommandError("Unknown model: {}".format(label))
+                if model not in SEARCH_INDEX:
+                    raise CommandError("{} objects are not indexed for search.".format(label))
+                models.append(model)
+        else:
+            models = sorted(SEARCH_INDEX, key=lambda model: model._meta.label)
+
+        for model in models:
+            self.stdout.write("Indexing {}...".format(model._meta.verbose_name_plural), ending='')
+            self.stdout.flush()
+            count = rebuild_search_index(model)
+            self.stdout.write(" {} indexed".format(count))
+
+        self.stdout.write("Finished.")
@@ -0,0 +1,16 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from extras.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Recount the objects counted by each object counter, correcting any counter which has drifted"
+
+    def handle(self, *args, **options):
+
+        corrections = reconcile_counters()
+        for name, previous_value, value in corrections:
+            self.stdout.write("{}: {} -> {}".format(name, previous_value, value))
+        self.stdout.write("Finished ({} counters corrected).".format(len(corrections)))
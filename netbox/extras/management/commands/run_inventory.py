@@ -9,6 +9,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
 from dcim.models import Device, InventoryItem, Site, STATUS_ACTIVE
+from extras.models import Job
 
 
 class Command(BaseCommand):
@@ -24,9 +25,22 @@ class Command(BaseCommand):
         parser.add_argument('-n', '--name', dest='name', help="Filter devices by name (regular expression)")
         parser.add_argument('--full', action='store_true', default=False, help="For inventory update for all devices")
         parser.add_argument('--fake', action='store_true', default=False, help="Do not actually update database")
+        parser.add_argument('--background', action='store_true', default=False,
+                            help="Enqueue the inventory as a background job (using the configured NAPALM credentials)")
 
     def handle(self, *args, **options):
 
+        # --background: Defer the inventory to a background worker
+        if options['background']:
+            if options['username'] or options['password']:
+                raise CommandError("Background jobs use the configured NAPALM_USERNAME and NAPALM_PASSWORD.")
+            job = Job.objects.enqueue(
+                'extras.run_inventory', site=options['site'], name=options['name'], full=options['full'],
+                fake=options['fake']
+            )
+            self.stdout.write("Enqueued job {}.".format(job.pk))
+            return
+
         def create_inventory_items(inventory_items, parent=None):
             for item in inventory_items:
                 i = InventoryItem(device=device, parent=parent, name=item['name'], part_id=item['part_id'],
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+CUSTOMFIELD_MODELS = [
+    ('circuits', 'circuit'),
+    ('circuits', 'provider'),
+    ('dcim', 'device'),
+    ('dcim', 'devicetype'),
+    ('dcim', 'rack'),
+    ('dcim', 'site'),
+    ('ipam', 'aggregate'),
+    ('ipam', 'ipaddress'),
+    ('ipam', 'prefix'),
+    ('ipam', 'vlan'),
+    ('ipam', 'vrf'),
+    ('tenancy', 'tenant'),
+]
+
+# Populate custom_field_data from the existing CustomFieldValues. Integer (200), boolean (300) and selection (600)
+# values are stored natively; all others as strings.
+POPULATE_SQL = """
+UPDATE {app_label}_{model} SET custom_field_data = (
+    SELECT json_object_agg(cfv.field_id, CASE
+        WHEN cfv.serialized_value = '' THEN NULL
+        WHEN cf.type IN (200, 600) THEN to_json(cfv.serialized_value::bigint)
+        WHEN cf.type = 300 THEN to_json(cfv.serialized_value = '1')
+        ELSE to_json(cfv.serialized_value)
+    END)::jsonb
+    FROM extras_customfieldvalue cfv
+    INNER JOIN extras_customfield cf ON cf.id = cfv.field_id
+    WHERE cfv.obj_type_id = ct.id AND cfv.obj_id = {app_label}_{model}.id
+)
+FROM django_content_type ct
+WHERE ct.app_label = '{app_label}' AND ct.model = '{model}' AND {app_label}_{model}.id IN (
+    SELECT obj_id FROM extras_customfieldvalue WHERE obj_type_id = ct.id
+)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circuits', '0010_custom_field_data'),
+        ('dcim', '0042_custom_field_data'),
+        ('extras', '0007_unicode_literals'),
+        ('ipam', '0019_custom_field_data'),
+        ('tenancy', '0004_custom_field_data'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [POPULATE_SQL.format(app_label=app_label, model=model) for app_label, model in CUSTOMFIELD_MODELS],
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
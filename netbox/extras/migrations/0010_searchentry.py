@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('extras', '0009_job'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('vector', django.contrib.postgres.search.SearchVectorField()),
+                ('text', models.TextField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name_plural': 'search entries',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='searchentry',
+            unique_together=set([('content_type', 'object_id')]),
+        ),
+        migrations.AddIndex(
+            model_name='searchentry',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['vector'], name='extras_searchentry_vector_gin'),
+        ),
+        # Supports substring (ILIKE) matching of the text
+        migrations.RunSQL(
+            sql='CREATE INDEX extras_searchentry_text_trgm ON extras_searchentry USING gin (text gin_trgm_ops)',
+            reverse_sql='DROP INDEX extras_searchentry_text_trgm',
+        ),
+    ]
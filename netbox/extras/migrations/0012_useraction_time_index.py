@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extras', '0011_objectcounter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='useraction',
+            name='time',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='useraction',
+            index=models.Index(fields=['-time'], name='extras_useraction_time_desc'),
+        ),
+    ]
@@ -1,20 +1,30 @@
 from __future__ import unicode_literals
-from collections import OrderedDict
-from datetime import date
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
 import graphviz
+import threading
+import time
+import traceback
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.cache import cache
 from django.core.validators import ValidationError
-from django.db import models
-from django.db.models import Q
-from django.http import HttpResponse
+from django.db import connection, models, transaction
+from django.db.models import F, Q
+from django.http import StreamingHttpResponse
 from django.template import Template, Context
+from django.urls import reverse
+from django.utils import timezone
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.safestring import mark_safe
 
-from utilities.utils import foreground_color
+from utilities.utils import foreground_color, render_stream
 from .constants import *
 
 
@@ -22,6 +32,25 @@ from .constants import *
 # Custom fields
 #
 
+# Rebuilds the custom_field_data of a set of objects from their CustomFieldValues (see
+# CustomFieldModel.update_custom_field_data())
+CUSTOMFIELD_DATA_SQL = """
+UPDATE {table} SET custom_field_data = COALESCE((
+    SELECT json_object_agg(cfv.field_id, CASE
+        WHEN cfv.serialized_value = '' THEN NULL
+        WHEN cf.type IN (%s, %s) THEN to_json(cfv.serialized_value::bigint)
+        WHEN cf.type = %s THEN to_json(cfv.serialized_value = '1')
+        ELSE to_json(cfv.serialized_value)
+    END)::jsonb
+    FROM {values_table} cfv
+    INNER JOIN {fields_table} cf ON cf.id = cfv.field_id
+    WHERE cfv.obj_type_id = %s AND cfv.obj_id = {table}.{pk}
+), '{{}}'::jsonb)
+WHERE {table}.{pk} = ANY(%s)
+RETURNING {table}.{pk}, {table}.custom_field_data
+"""
+
+
 class CustomFieldModel(object):
 
     def cf(self):
@@ -38,16 +67,117 @@ class CustomFieldModel(object):
         """
 
         # Find all custom fields applicable to this type of object
-        content_type = ContentType.objects.get_for_model(self)
-        fields = CustomField.objects.filter(obj_type=content_type)
-
-        # If the object exists, populate its custom fields with values
-        if hasattr(self, 'pk'):
-            values = CustomFieldValue.objects.filter(obj_type=content_type, obj_id=self.pk).select_related('field')
-            values_dict = {cfv.field_id: cfv.value for cfv in values}
-            return OrderedDict([(field, values_dict.get(field.pk)) for field in fields])
-        else:
-            return OrderedDict([(field, None) for field in fields])
+        fields = CustomField.objects.get_for_model(self)
+
+        # Populate the custom fields with any values recorded for the object
+        return OrderedDict([(field, field.value_from_data(self.custom_field_data)) for field in fields])
+
+    @classmethod
+    def update_custom_field_data(cls, pk_list):
+        """
+        Rebuild the custom_field_data of the given objects from their CustomFieldValues. custom_field_data mirrors the
+        CustomFieldValues assigned to an object, mapping the ID of each CustomField to its value in JSON form (see
+        CustomField.value_from_data()). Returns a dictionary mapping each object's ID to its new custom_field_data.
+        """
+        pk_list = list(pk_list)
+        if not pk_list:
+            return {}
+        sql = CUSTOMFIELD_DATA_SQL.format(
+            table=connection.ops.quote_name(cls._meta.db_table),
+            pk=connection.ops.quote_name(cls._meta.pk.column),
+            values_table=connection.ops.quote_name(CustomFieldValue._meta.db_table),
+            fields_table=connection.ops.quote_name(CustomField._meta.db_table),
+        )
+        params = [
+            CF_TYPE_INTEGER, CF_TYPE_SELECT, CF_TYPE_BOOLEAN, ContentType.objects.get_for_model(cls).pk, pk_list,
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return dict(cursor.fetchall())
+
+
+def get_custom_field_objects(values):
+    """
+    Return a dictionary mapping each ContentType ID to the IDs of all objects to which the given CustomFieldValues
+    belong.
+    """
+    objects = defaultdict(set)
+    for obj_type_id, obj_id in values.values_list('obj_type_id', 'obj_id'):
+        objects[obj_type_id].add(obj_id)
+    return objects
+
+
+def update_custom_field_objects(objects):
+    """
+    Rebuild the custom_field_data of the objects returned by get_custom_field_objects().
+    """
+    for obj_type_id, pk_list in objects.items():
+        model = ContentType.objects.get_for_id(obj_type_id).model_class()
+        if hasattr(model, 'update_custom_field_data'):
+            model.update_custom_field_data(pk_list)
+
+
+# The name of the CacheVersion of all CustomField definitions (see CustomFieldManager)
+CUSTOMFIELD_CACHE_VERSION = 'extras.customfields'
+
+# The interval (in seconds) at which each process checks whether its cached CustomField definitions are current
+CUSTOMFIELD_CACHE_CHECK_INTERVAL = 1
+
+
+class CustomFieldManager(models.Manager):
+    """
+    Caches the CustomFields (and their choices) which apply to each ContentType, in the manner of ContentTypeManager.
+    Cached definitions are held in each process and tagged with a CacheVersion. Changing a CustomField or
+    CustomFieldChoice increments the version (see extras.signals); each process compares its definitions against the
+    version at most once every CUSTOMFIELD_CACHE_CHECK_INTERVAL seconds, and discards them if they are out of date.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CustomFieldManager, self).__init__(*args, **kwargs)
+        self._cache = {}
+        self._cache_version = None
+        self._cache_checked = 0
+
+    def get_for_content_type(self, content_type):
+        """
+        Return a list of the CustomFields which apply to the given ContentType, with their choices prefetched. The
+        returned CustomFields may be shared with other callers and must not be modified.
+        """
+        # Definitions read within a transaction (which may include uncommitted changes) are not cached
+        if connection.in_atomic_block:
+            return list(self.filter(obj_type=content_type).prefetch_related('choices'))
+
+        self._check_cache_version()
+        try:
+            return self._cache[content_type.pk]
+        except KeyError:
+            fields = list(self.filter(obj_type=content_type).prefetch_related('choices'))
+            self._cache[content_type.pk] = fields
+            return fields
+
+    def get_for_model(self, model):
+        """
+        Return a list of the CustomFields which apply to the given model or instance (see get_for_content_type()).
+        """
+        return self.get_for_content_type(ContentType.objects.get_for_model(model))
+
+    def _check_cache_version(self):
+        now = time.time()
+        if now < self._cache_checked + CUSTOMFIELD_CACHE_CHECK_INTERVAL:
+            return
+        version = CacheVersion.objects.get_versions([CUSTOMFIELD_CACHE_VERSION])[0]
+        if version != self._cache_version:
+            self._cache = {}
+            self._cache_version = version
+        self._cache_checked = now
+
+    def clear_cache(self):
+        """
+        Invalidate the CustomFields cached by all processes once the current transaction (if any) has been committed.
+        """
+        self._cache = {}
+        self._cache_checked = 0
+        CacheVersion.objects.increment(CUSTOMFIELD_CACHE_VERSION)
 
 
 @python_2_unicode_compatible
@@ -69,12 +199,21 @@ class CustomField(models.Model):
     weight = models.PositiveSmallIntegerField(default=100, help_text="Fields with higher weights appear lower in a "
                                                                      "form")
 
+    objects = CustomFieldManager()
+
     class Meta:
         ordering = ['weight', 'name']
 
     def __str__(self):
         return self.label or self.name.replace('_', ' ').capitalize()
 
+    def save(self, *args, **kwargs):
+        type_changed = self.pk and CustomField.objects.filter(pk=self.pk).exclude(type=self.type).exists()
+        super(CustomField, self).save(*args, **kwargs)
+        # Values are recorded in custom_field_data according to the field's type
+        if type_changed:
+            update_custom_field_objects(get_custom_field_objects(self.values.all()))
+
     def serialize_value(self, value):
         """
         Serialize the given value to a string suitable for storage as a CustomFieldValue
@@ -111,6 +250,81 @@ class CustomField(models.Model):
             return self.choices.get(pk=int(serialized_value))
         return serialized_value
 
+    def value_from_data(self, data):
+        """
+        Return the value of this field recorded in an object's custom_field_data. Integers, booleans and the IDs of
+        selected choices are stored natively; dates are stored as YYYY-MM-DD strings.
+        """
+        value = data.get(str(self.pk))
+        if value is None:
+            return None
+        if self.type == CF_TYPE_DATE:
+            return date(*[int(n) for n in value.split('-')])
+        if self.type == CF_TYPE_SELECT:
+            # Search the field's choices (which may have been prefetched) rather than querying for the selected one
+            for choice in self.choices.all():
+                if choice.pk == value:
+                    return choice
+            return None
+        return value
+
+
+# Upserts CustomFieldValues (see CustomFieldValueManager.save_values())
+CUSTOMFIELDVALUE_UPSERT_SQL = """
+INSERT INTO {table} (field_id, obj_type_id, obj_id, serialized_value) VALUES {values}
+ON CONFLICT (field_id, obj_type_id, obj_id) DO UPDATE SET serialized_value = EXCLUDED.serialized_value
+"""
+
+# The maximum number of CustomFieldValues written by a single statement
+CUSTOMFIELDVALUE_UPSERT_CHUNK_SIZE = 1000
+
+
+class CustomFieldValueManager(models.Manager):
+
+    def save_values(self, model, values):
+        """
+        Save custom field values for any number of objects of the given model. `values` is an iterable of (CustomField,
+        object ID, value) tuples; an empty value deletes any existing value for that field and object. Values are saved
+        using a set-based upsert (INSERT ... ON CONFLICT ... DO UPDATE), after which the custom_field_data of each
+        affected object is rebuilt. Returns a dictionary mapping the ID of each object to its new custom_field_data.
+        """
+        content_type = ContentType.objects.get_for_model(model)
+
+        # Serialize all values, keeping only the last value given for each field of an object
+        serialized_values = OrderedDict()
+        for field, obj_id, value in values:
+            serialized_values[(field.pk, obj_id)] = field.serialize_value(value)
+        if not serialized_values:
+            return {}
+
+        # Delete any values which have been cleared
+        deletions = defaultdict(list)
+        for (field_id, obj_id), serialized_value in serialized_values.items():
+            if serialized_value in (None, ''):
+                deletions[field_id].append(obj_id)
+        if deletions:
+            query = Q()
+            for field_id, pk_list in deletions.items():
+                query |= Q(field_id=field_id, obj_id__in=pk_list)
+            self.filter(query, obj_type=content_type).delete()
+
+        # Insert or update all others
+        rows = [
+            (field_id, content_type.pk, obj_id, serialized_value)
+            for (field_id, obj_id), serialized_value in serialized_values.items()
+            if serialized_value not in (None, '')
+        ]
+        with connection.cursor() as cursor:
+            for i in range(0, len(rows), CUSTOMFIELDVALUE_UPSERT_CHUNK_SIZE):
+                chunk = rows[i:i + CUSTOMFIELDVALUE_UPSERT_CHUNK_SIZE]
+                sql = CUSTOMFIELDVALUE_UPSERT_SQL.format(
+                    table=connection.ops.quote_name(self.model._meta.db_table),
+                    values=', '.join(['(%s, %s, %s, %s)'] * len(chunk)),
+                )
+                cursor.execute(sql, [param for row in chunk for param in row])
+
+        return model.update_custom_field_data({obj_id for _, obj_id in serialized_values})
+
 
 @python_2_unicode_compatible
 class CustomFieldValue(models.Model):
@@ -120,6 +334,8 @@ class CustomFieldValue(models.Model):
     obj = GenericForeignKey('obj_type', 'obj_id')
     serialized_value = models.CharField(max_length=255)
 
+    objects = CustomFieldValueManager()
+
     class Meta:
         ordering = ['obj_type', 'obj_id']
         unique_together = ['field', 'obj_type', 'obj_id']
@@ -141,6 +357,18 @@ class CustomFieldValue(models.Model):
             self.delete()
         else:
             super(CustomFieldValue, self).save(*args, **kwargs)
+            self.update_object_data()
+
+    def delete(self, *args, **kwargs):
+        super(CustomFieldValue, self).delete(*args, **kwargs)
+        self.update_object_data()
+
+    def update_object_data(self):
+        """
+        Update the custom_field_data of the object to which this value belongs.
+        """
+        model = ContentType.objects.get_for_id(self.obj_type_id).model_class()
+        model.update_custom_field_data([self.obj_id])
 
 
 @python_2_unicode_compatible
@@ -165,7 +393,32 @@ class CustomFieldChoice(models.Model):
         # When deleting a CustomFieldChoice, delete all CustomFieldValues which point to it
         pk = self.pk
         super(CustomFieldChoice, self).delete(using, keep_parents)
-        CustomFieldValue.objects.filter(field__type=CF_TYPE_SELECT, serialized_value=str(pk)).delete()
+        values = CustomFieldValue.objects.filter(field__type=CF_TYPE_SELECT, serialized_value=str(pk))
+        objects = get_custom_field_objects(values)
+        values.delete()
+        update_custom_field_objects(objects)
+
+
+#
+# Compiled templates
+#
+
+# Compiled Graph and ExportTemplate templates, mapping each key to a tuple of (template code, compiled template)
+_compiled_templates = {}
+
+
+def get_compiled_template(key, code):
+    """
+    Return the compiled template for the given code. Compiled templates are cached per process under the given key
+    (identifying the object and field from which the code was taken), and recompiled only when the code has changed.
+    Templates for which no key is given (e.g. those of unsaved objects) are not cached.
+    """
+    cached = _compiled_templates.get(key)
+    if cached is None or cached[0] != code:
+        cached = (code, Template(code))
+        if key is not None:
+            _compiled_templates[key] = cached
+    return cached[1]
 
 
 #
@@ -186,21 +439,30 @@ class Graph(models.Model):
     def __str__(self):
         return self.name
 
+    def get_template(self, field_name):
+        """
+        Return the compiled template for the named field (source or link); see get_compiled_template().
+        """
+        key = ('graph', self.pk, field_name) if self.pk else None
+        return get_compiled_template(key, getattr(self, field_name))
+
     def embed_url(self, obj):
-        template = Template(self.source)
-        return template.render(Context({'obj': obj}))
+        return self.get_template('source').render(Context({'obj': obj}))
 
     def embed_link(self, obj):
         if self.link is None:
             return ''
-        template = Template(self.link)
-        return template.render(Context({'obj': obj}))
+        return self.get_template('link').render(Context({'obj': obj}))
 
 
 #
 # Export templates
 #
 
+# The minimum number of characters written to a streamed export at a time
+EXPORTTEMPLATE_CHUNK_SIZE = 65536
+
+
 @python_2_unicode_compatible
 class ExportTemplate(models.Model):
     content_type = models.ForeignKey(
@@ -221,16 +483,37 @@ class ExportTemplate(models.Model):
     def __str__(self):
         return '{}: {}'.format(self.content_type, self.name)
 
+    def get_template(self):
+        """
+        Return the compiled template; see get_compiled_template().
+        """
+        key = ('exporttemplate', self.pk) if self.pk else None
+        return get_compiled_template(key, self.template_code)
+
+    def render_stream(self, context_dict):
+        """
+        Render the template, returning an iterator over its output in chunks (see utilities.utils.render_stream). The
+        template is compiled immediately, so that a TemplateSyntaxError is raised before any output is produced.
+        """
+        return self._render_chunks(self.get_template(), Context(context_dict))
+
+    def _render_chunks(self, template, context):
+        buffer = ''
+        for output in render_stream(template, context):
+            buffer += output
+            if len(buffer) >= EXPORTTEMPLATE_CHUNK_SIZE:
+                # Hold back a trailing carriage return in case the next chunk begins with a line feed
+                output, buffer = (buffer[:-1], '\r') if buffer.endswith('\r') else (buffer, '')
+                # Replace CRLF-style line terminators
+                yield output.replace('\r\n', '\n')
+        yield buffer.replace('\r\n', '\n')
+
     def to_response(self, context_dict, filename):
         """
-        Render the template to an HTTP response, delivered as a named file attachment
+        Render the template to a streaming HTTP response, delivered as a named file attachment
         """
-        template = Template(self.template_code)
         mime_type = 'text/plain' if not self.mime_type else self.mime_type
-        output = template.render(Context(context_dict))
-        # Replace CRLF-style line terminators
-        output = output.replace('\r\n', '\n')
-        response = HttpResponse(output, content_type=mime_type)
+        response = StreamingHttpResponse(self.render_stream(context_dict), content_type=mime_type)
         if self.file_extension:
             filename += '.{}'.format(self.file_extension)
         response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
@@ -392,17 +675,57 @@ class ImageAttachment(models.Model):
 # User actions
 #
 
+# The actions buffered for the request being handled by the current thread (see UserActionMiddleware)
+_user_action_buffer = threading.local()
+
+
 class UserActionManager(models.Manager):
 
+    def start_buffering(self):
+        """
+        Buffer the actions logged by the current thread until flush() is called, so that they are written using a
+        single query.
+        """
+        _user_action_buffer.actions = []
+
+    def flush(self):
+        """
+        Write any buffered actions and stop buffering. Actions older than USER_ACTION_RETENTION days are then pruned,
+        at most once an hour.
+        """
+        actions = getattr(_user_action_buffer, 'actions', None)
+        _user_action_buffer.actions = None
+        if actions:
+            self.bulk_create(actions)
+            if cache.add('extras.useraction.pruned', True, 3600):
+                self.prune()
+
+    def prune(self):
+        """
+        Delete all actions older than USER_ACTION_RETENTION days, returning the number deleted.
+        """
+        if not settings.USER_ACTION_RETENTION:
+            return 0
+        cutoff = timezone.now() - timedelta(days=settings.USER_ACTION_RETENTION)
+        return self.filter(time__lt=cutoff).delete()[0]
+
+    def _log(self, action):
+        actions = getattr(_user_action_buffer, 'actions', None)
+        if actions is None:
+            action.save()
+        else:
+            # Discard the action if the transaction within which it was logged is rolled back
+            transaction.on_commit(lambda: actions.append(action))
+
     # Actions affecting a single object
     def log_action(self, user, obj, action, message):
-        self.model.objects.create(
+        self._log(self.model(
             content_type=ContentType.objects.get_for_model(obj),
             object_id=obj.pk,
             user=user,
             action=action,
             message=message,
-        )
+        ))
 
     def log_create(self, user, obj, message=''):
         self.log_action(user, obj, ACTION_CREATE, message)
@@ -415,12 +738,12 @@ class UserActionManager(models.Manager):
 
     # Actions affecting multiple objects
     def log_bulk_action(self, user, content_type, action, message):
-        self.model.objects.create(
+        self._log(self.model(
             content_type=content_type,
             user=user,
             action=action,
             message=message,
-        )
+        ))
 
     def log_import(self, user, content_type, message=''):
         self.log_bulk_action(user, content_type, ACTION_IMPORT, message)
@@ -440,7 +763,7 @@ class UserAction(models.Model):
     """
     A record of an action (add, edit, or delete) performed on an object by a User.
     """
-    time = models.DateTimeField(auto_now_add=True, editable=False)
+    time = models.DateTimeField(default=timezone.now, editable=False)
     user = models.ForeignKey(User, related_name='actions', on_delete=models.CASCADE)
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField(blank=True, null=True)
@@ -451,6 +774,9 @@ class UserAction(models.Model):
 
     class Meta:
         ordering = ['-time']
+        indexes = [
+            models.Index(fields=['-time'], name='extras_useraction_time_desc'),
+        ]
 
     def __str__(self):
         if self.message:
@@ -466,3 +792,309 @@ class UserAction(models.Model):
             return mark_safe('<i class="glyphicon glyphicon-remove text-danger"></i>')
         else:
             return ''
+
+
+#
+# Object counters
+#
+
+class ObjectCounterManager(models.Manager):
+
+    def adjust(self, names, delta):
+        """
+        Add `delta` to each of the named counters. Invalidated counters remain so.
+        """
+        self.filter(name__in=names).update(value=F('value') + delta, version=F('version') + 1)
+
+    def invalidate(self, names):
+        """
+        Mark each of the named counters as needing to be recounted.
+        """
+        self.filter(name__in=names).update(value=None, version=F('version') + 1)
+
+    def set_value(self, name, value, version=None):
+        """
+        Set the value of a counter, creating it if necessary. If a version is given, the value is set only if the
+        counter has not been modified since that version was read; this prevents a recount from overwriting a
+        concurrent change.
+        """
+        counters = self.filter(name=name)
+        if version is not None:
+            return bool(counters.filter(version=version).update(value=value))
+        if not counters.update(value=value, version=F('version') + 1):
+            self.create(name=name, value=value)
+        return True
+
+
+@python_2_unicode_compatible
+class ObjectCounter(models.Model):
+    """
+    A count of objects (e.g. the number of Devices), maintained as objects are created and deleted so that it can be
+    read without counting the objects themselves (see extras.counters). A counter with no value is recounted when next
+    read. Each change increments the version of the counter.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(blank=True, null=True)
+    version = models.BigIntegerField(default=0)
+
+    objects = ObjectCounterManager()
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return '{}: {}'.format(self.name, self.value)
+
+
+#
+# Cache versions
+#
+
+class CacheVersionManager(models.Manager):
+
+    def get_versions(self, names):
+        """
+        Return a list of the current version of each of the named caches.
+        """
+        versions = dict(self.filter(name__in=names).values_list('name', 'version'))
+        return [versions.get(name, 0) for name in names]
+
+    def increment(self, name):
+        """
+        Increment the version of the named cache once the current transaction (if any) has been committed.
+        """
+        def increment():
+            if not self.filter(name=name).update(version=F('version') + 1):
+                cache_version, created = self.get_or_create(name=name, defaults={'version': 1})
+                if not created:
+                    self.filter(name=name).update(version=F('version') + 1)
+        transaction.on_commit(increment)
+
+
+@python_2_unicode_compatible
+class CacheVersion(models.Model):
+    """
+    The version of a set of cached data (e.g. CustomField definitions). Data is cached under the version current when
+    it was read, and incrementing the version invalidates it. Versions are kept in the database rather than the cache
+    so that invalidation reaches every worker process, whatever the cache backend.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    objects = CacheVersionManager()
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return '{}: {}'.format(self.name, self.version)
+
+
+#
+# Background jobs
+#
+
+class JobManager(models.Manager):
+
+    def enqueue(self, name, user=None, **kwargs):
+        """
+        Create a pending Job which calls the job function registered under the given name with the given keyword
+        arguments (see extras.jobs.register_job()). The arguments must be JSON-serializable.
+        """
+        return self.create(name=name, user=user, kwargs=kwargs)
+
+    def claim(self):
+        """
+        Mark the oldest pending Job as running and return it, or return None if there are no pending Jobs. Jobs which
+        have been locked by another worker in the meantime are skipped, so that each Job is claimed only once.
+        """
+        with transaction.atomic():
+            job = self.select_for_update(skip_locked=True).filter(status=JOB_PENDING).order_by('pk').first()
+            if job is not None:
+                job.status = JOB_RUNNING
+                job.started = timezone.now()
+                job.save(update_fields=['status', 'started'])
+        return job
+
+
+@python_2_unicode_compatible
+class Job(models.Model):
+    """
+    A long-running operation (such as a bulk import) deferred to a background worker process (see the jobworker
+    management command). A Job records the function to be called and its arguments, the progress made by the function,
+    and its result or error.
+    """
+    name = models.CharField(max_length=100)
+    kwargs = JSONField(default=dict)
+    user = models.ForeignKey(User, related_name='jobs', blank=True, null=True, on_delete=models.SET_NULL)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(blank=True, null=True)
+    completed = models.DateTimeField(blank=True, null=True)
+    status = models.PositiveSmallIntegerField(choices=JOB_STATUS_CHOICES, default=JOB_PENDING, db_index=True)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(blank=True, null=True)
+    result = JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    objects = JobManager()
+
+    class Meta:
+        ordering = ['-pk']
+
+    def __str__(self):
+        return '{} #{}'.format(self.name, self.pk)
+
+    def get_absolute_url(self):
+        return reverse('extras:job', args=[self.pk])
+
+    def get_status_class(self):
+        return JOB_STATUS_CLASSES[self.status]
+
+    @property
+    def is_finished(self):
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def set_progress(self, progress, total=None):
+        """
+        Record the progress of a running Job (e.g. the number of objects processed so far, out of `total`). This is
+        saved immediately, outside of any transaction in which the job function is operating.
+        """
+        self.progress = progress
+        if total is not None:
+            self.total = total
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, total=self.total)
+
+    def run(self):
+        """
+        Call the job function and record its result, or the error raised by it.
+        """
+        from extras.jobs import get_job_function
+
+        try:
+            self.result = get_job_function(self.name)(self, **self.kwargs)
+            self.status = JOB_COMPLETED
+        except Exception:
+            self.error = traceback.format_exc()
+            self.status = JOB_FAILED
+        self.completed = timezone.now()
+        self.save(update_fields=['result', 'error', 'status', 'completed'])
+
+
+#
+# Search
+#
+
+# Upserts SearchEntries (see SearchEntryManager.save_entries()). The vector of each entry combines the text of its
+# object in order of decreasing weight.
+SEARCHENTRY_UPSERT_SQL = """
+INSERT INTO {table} (content_type_id, object_id, vector, text) VALUES {values}
+ON CONFLICT (content_type_id, object_id) DO UPDATE SET vector = EXCLUDED.vector, text = EXCLUDED.text
+"""
+SEARCHENTRY_UPSERT_VALUES = """(%s, %s, setweight(to_tsvector('simple', %s), 'A') ||
+    setweight(to_tsvector('simple', %s), 'B') || setweight(to_tsvector('simple', %s), 'C'), %s)"""
+
+# Retrieves the highest-ranked matches for each content type, along with the total number of matches for each, in a
+# single query (see SearchEntryManager.search())
+SEARCHENTRY_SEARCH_SQL = """
+SELECT content_type_id, object_id, total FROM (
+    SELECT content_type_id, object_id, count(*) OVER w AS total, row_number() OVER (
+        w ORDER BY ts_rank(vector, query) + similarity(text, %s) DESC, object_id
+    ) AS position
+    FROM {table}, plainto_tsquery('simple', %s) query
+    WHERE content_type_id IN ({content_types}) AND (vector @@ query OR text ILIKE %s{lookups})
+    WINDOW w AS (PARTITION BY content_type_id)
+) matches
+WHERE position <= %s
+ORDER BY content_type_id, position
+"""
+
+# The maximum number of SearchEntries written by a single statement
+SEARCHENTRY_UPSERT_CHUNK_SIZE = 500
+
+
+class SearchEntryManager(models.Manager):
+
+    def save_entries(self, model, entries):
+        """
+        Create or update the SearchEntries for any number of objects of the given model. `entries` is an iterable of
+        (object ID, A text, B text, C text) tuples, the texts being listed in order of decreasing weight.
+        """
+        content_type = ContentType.objects.get_for_model(model)
+        rows = [
+            (content_type.pk, obj_id, a, b, c, '\n'.join(t for t in (a, b, c) if t))
+            for obj_id, a, b, c in entries
+        ]
+        with connection.cursor() as cursor:
+            for i in range(0, len(rows), SEARCHENTRY_UPSERT_CHUNK_SIZE):
+                chunk = rows[i:i + SEARCHENTRY_UPSERT_CHUNK_SIZE]
+                sql = SEARCHENTRY_UPSERT_SQL.format(
+                    table=connection.ops.quote_name(self.model._meta.db_table),
+                    values=', '.join([SEARCHENTRY_UPSERT_VALUES] * len(chunk)),
+                )
+                cursor.execute(sql, [param for row in chunk for param in row])
+
+    def delete_entries(self, model, pk_list):
+        self.filter(content_type=ContentType.objects.get_for_model(model), object_id__in=pk_list).delete()
+
+    def search(self, value, model_list, limit, lookups=None):
+        """
+        Search the entries of the given models for a value. An entry matches if its text contains all the words in the
+        value, or contains the value as a substring; `lookups` may map a model to a Q object identifying further objects
+        to be matched (e.g. prefixes containing an IP address). Matches are ranked by relevance.
+
+        Returns an OrderedDict mapping each model having matches to a tuple of its total number of matches and a list
+        of the IDs of its `limit` highest-ranked matches, in order of rank.
+        """
+        content_types = ContentType.objects.get_for_models(*model_list)
+        if not content_types:
+            return OrderedDict()
+
+        lookup_sql = []
+        lookup_params = []
+        for model, query in (lookups or {}).items():
+            if query is None or model not in content_types:
+                continue
+            subquery, subquery_params = model.objects.filter(query).values('pk').query.sql_with_params()
+            lookup_sql.append(' OR (content_type_id = %s AND object_id IN ({}))'.format(subquery))
+            lookup_params += [content_types[model].pk] + list(subquery_params)
+
+        sql = SEARCHENTRY_SEARCH_SQL.format(
+            table=connection.ops.quote_name(self.model._meta.db_table),
+            content_types=', '.join(str(ct.pk) for ct in content_types.values()),
+            lookups=''.join(lookup_sql),
+        )
+        pattern = '%{}%'.format(value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [value, value, pattern] + lookup_params + [limit])
+            rows = cursor.fetchall()
+
+        # Order results according to the models given
+        models_by_content_type = {ct.pk: model for model, ct in content_types.items()}
+        matches = {}
+        for content_type_id, obj_id, total in rows:
+            model = models_by_content_type[content_type_id]
+            matches.setdefault(model, (total, []))[1].append(obj_id)
+        return OrderedDict((model, matches[model]) for model in model_list if model in matches)
+
+
+@python_2_unicode_compatible
+class SearchEntry(models.Model):
+    """
+    An object's entry in the global search index. The weighted text vector is used for full-text matching and ranking,
+    while the plain text (indexed for trigram matching) supports substring searches. SearchEntries are maintained
+    automatically as objects are saved and deleted (see extras.search).
+    """
+    content_type = models.ForeignKey(ContentType, related_name='+', on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    vector = SearchVectorField()
+    text = models.TextField()
+
+    objects = SearchEntryManager()
+
+    class Meta:
+        unique_together = ['content_type', 'object_id']
+        indexes = [GinIndex(fields=['vector'], name='extras_searchentry_vector_gin')]
+        verbose_name_plural = 'search entries'
+
+    def __str__(self):
+        return '{} {}'.format(self.content_type, self.object_id)
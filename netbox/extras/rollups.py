@@ -0,0 +1,120 @@
+from __future__ import unicode_literals
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Q
+
+from circuits.models import Circuit, CircuitTermination
+from dcim.models import Device, Rack, Region, Site
+from extras.models import CacheVersion
+from ipam.models import IPAddress, Prefix, VLAN, VRF
+from tenancy.models import Tenant
+from utilities.sql import SubqueryCount
+
+
+# The statistics reported for a Site, each mapped to the model counted and the lookup (relative to that model) of its
+# Site
+SITE_STATS = OrderedDict((
+    ('rack_count', (Rack, 'site')),
+    ('device_count', (Device, 'site')),
+    ('prefix_count', (Prefix, 'site')),
+    ('vlan_count', (VLAN, 'site')),
+    ('ipaddress_count', (IPAddress, 'interface__device__site')),
+    ('circuit_count', (Circuit, 'terminations__site')),
+))
+
+# The statistics reported for a Region, which include the Sites (and their objects) within all of its child Regions
+REGION_STATS = OrderedDict([('site_count', (Site, None))] + list(SITE_STATS.items()))
+
+# The statistics reported for a Tenant, each mapped to the model counted and the lookups of its Tenant. An object is
+# counted if it is assigned to the Tenant, or if it has no Tenant and its VRF is assigned to the Tenant.
+TENANT_STATS = OrderedDict((
+    ('site_count', (Site, ['tenant'])),
+    ('rack_count', (Rack, ['tenant'])),
+    ('device_count', (Device, ['tenant'])),
+    ('vrf_count', (VRF, ['tenant'])),
+    ('prefix_count', (Prefix, ['tenant', 'vrf__tenant'])),
+    ('ipaddress_count', (IPAddress, ['tenant', 'vrf__tenant'])),
+    ('vlan_count', (VLAN, ['tenant'])),
+    ('circuit_count', (Circuit, ['tenant'])),
+))
+
+# The models whose modification may alter any statistic
+ROLLUP_MODELS = [Circuit, CircuitTermination, Device, IPAddress, Prefix, Rack, Region, Site, Tenant, VLAN, VRF]
+
+# The name of the CacheVersion of all cached statistics
+ROLLUP_CACHE_VERSION = 'extras.rollups'
+
+
+def _site_filter(lookup):
+    return {lookup: OuterRef('pk')}
+
+
+def _region_filter(lookup):
+    # Match objects within the Region's subtree, using its MPTT tree ID and left/right bounds
+    region = '{}__region'.format(lookup) if lookup else 'region'
+    return {
+        '{}__tree_id'.format(region): OuterRef('tree_id'),
+        '{}__lft__gte'.format(region): OuterRef('lft'),
+        '{}__rght__lte'.format(region): OuterRef('rght'),
+    }
+
+
+def _tenant_filter(lookups):
+    query = Q()
+    unassigned = {}
+    for lookup in lookups:
+        query |= Q(**dict(unassigned, **{lookup: OuterRef('pk')}))
+        unassigned['{}__isnull'.format(lookup)] = True
+    return query
+
+
+def annotate_stats(queryset):
+    """
+    Annotate each Site, Region or Tenant in a queryset with its statistics. All statistics are computed by a single
+    query, using a counting subquery for each.
+    """
+    model = queryset.model
+    if model is Site:
+        subqueries = [
+            (name, counted_model.objects.filter(**_site_filter(lookup)).values('pk').distinct())
+            for name, (counted_model, lookup) in SITE_STATS.items()
+        ]
+    elif model is Region:
+        subqueries = [
+            (name, counted_model.objects.filter(**_region_filter(lookup)).values('pk').distinct())
+            for name, (counted_model, lookup) in REGION_STATS.items()
+        ]
+    elif model is Tenant:
+        subqueries = [
+            (name, counted_model.objects.filter(_tenant_filter(lookups)).values('pk'))
+            for name, (counted_model, lookups) in TENANT_STATS.items()
+        ]
+    else:
+        raise ValueError("No statistics are defined for {}.".format(model._meta.verbose_name_plural))
+    annotations = {name: SubqueryCount(subquery) for name, subquery in subqueries}
+    return queryset.annotate(**annotations)
+
+
+def get_stats(obj):
+    """
+    Return an OrderedDict of the statistics of a Site, Region or Tenant. Statistics are cached for CACHE_TIMEOUT
+    seconds, or until any object which may alter them is modified.
+    """
+    names = {Site: SITE_STATS, Region: REGION_STATS, Tenant: TENANT_STATS}[type(obj)].keys()
+    version = CacheVersion.objects.get_versions([ROLLUP_CACHE_VERSION])[0]
+    cache_key = 'extras.rollups.{}.{}.{}'.format(version, obj._meta.label_lower, obj.pk)
+    stats = cache.get(cache_key)
+    if stats is None:
+        values = annotate_stats(type(obj).objects.filter(pk=obj.pk)).values(*names).first() or {}
+        stats = OrderedDict((name, values.get(name, 0)) for name in names)
+        cache.set(cache_key, stats, settings.CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_stats():
+    """
+    Invalidate all cached statistics once the current transaction (if any) has been committed.
+    """
+    CacheVersion.objects.increment(ROLLUP_CACHE_VERSION)
@@ -0,0 +1,137 @@
+from __future__ import unicode_literals
+
+import six
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+from circuits.models import Circuit, CircuitTermination, Provider
+from dcim.models import Device, DeviceType, InventoryItem, Manufacturer, Rack, Site
+from ipam.models import Aggregate, IPAddress, Prefix, VLAN, VRF
+from secrets.models import Secret
+from tenancy.models import Tenant
+from .models import SearchEntry
+
+
+# The fields included in the search index for each model, listed in order of decreasing weight: the fields which best
+# identify an object, fields of secondary importance, and descriptive text. Related fields are referenced by lookup
+# (e.g. "manufacturer__name").
+SEARCH_INDEX = {
+    # Circuits
+    Provider: (['name'], ['account'], ['noc_contact', 'admin_contact', 'comments']),
+    Circuit: (['cid'], ['description', 'terminations__xconnect_id', 'terminations__pp_info'], ['comments']),
+    # DCIM
+    Site: (
+        ['name', 'facility'],
+        ['asn', 'contact_name', 'contact_phone', 'contact_email'],
+        ['physical_address', 'shipping_address', 'comments'],
+    ),
+    Rack: (['name', 'facility_id'], [], ['comments']),
+    DeviceType: (['model', 'part_number'], ['manufacturer__name'], ['comments']),
+    Device: (['name', 'serial', 'asset_tag'], ['inventory_items__serial'], ['comments']),
+    # IPAM
+    VRF: (['name', 'rd'], ['description'], []),
+    Aggregate: (['prefix'], ['description'], []),
+    Prefix: (['prefix'], ['description'], []),
+    IPAddress: (['address'], ['description'], []),
+    VLAN: (['name', 'vid'], ['description'], []),
+    # Secrets
+    Secret: (['name'], ['device__name'], []),
+    # Tenancy
+    Tenant: (['name'], ['description'], ['comments']),
+}
+
+# Models whose fields are included in the search index entries of other objects. Each is mapped to a list of (indexed
+# model, lookup, attribute) tuples: when an object is modified, the indexed objects matching the lookup for its value of
+# the given attribute are updated.
+SEARCH_INDEX_DEPENDENCIES = {
+    CircuitTermination: [(Circuit, 'pk', 'circuit_id')],
+    InventoryItem: [(Device, 'pk', 'device_id')],
+    Manufacturer: [(DeviceType, 'manufacturer', 'pk')],
+    Device: [(Secret, 'device', 'pk')],
+}
+
+# The number of objects loaded at a time while updating the search index
+SEARCH_INDEX_CHUNK_SIZE = 1000
+
+
+def _get_values(obj, lookup):
+    """
+    Return the text of each value of an object's field, following any number of (single or multiple) relations.
+    """
+    objects = [obj]
+    for attr in lookup.split('__'):
+        values = []
+        for o in objects:
+            value = getattr(o, attr)
+            if isinstance(value, models.Manager):
+                values.extend(value.all())
+            elif value not in (None, ''):
+                values.append(value)
+        objects = values
+    return [six.text_type(value) for value in objects]
+
+
+def _get_related_lookups(model, lookups):
+    """
+    Return the lists of relations to be followed using select_related() and prefetch_related() respectively in order
+    to retrieve the given field lookups.
+    """
+    select_related = set()
+    prefetch_related = set()
+    for lookup in lookups:
+        relations = lookup.split('__')[:-1]
+        if not relations:
+            continue
+        related_model = model
+        many = False
+        for name in relations:
+            field = related_model._meta.get_field(name)
+            many = many or field.many_to_many or field.one_to_many
+            related_model = field.related_model
+        (prefetch_related if many else select_related).add('__'.join(relations))
+    return sorted(select_related), sorted(prefetch_related)
+
+
+def get_search_texts(obj):
+    """
+    Return the text of an object to be indexed, in order of decreasing weight (see SEARCH_INDEX).
+    """
+    return ['\n'.join(v for lookup in lookups for v in _get_values(obj, lookup)) for lookups in SEARCH_INDEX[type(obj)]]
+
+
+def update_search_index(queryset):
+    """
+    Create or update the search index entries of all objects in a queryset, a chunk of objects at a time. Returns the
+    number of objects indexed.
+    """
+    model = queryset.model
+    if model not in SEARCH_INDEX:
+        return 0
+
+    select_related, prefetch_related = _get_related_lookups(
+        model, [lookup for lookups in SEARCH_INDEX[model] for lookup in lookups]
+    )
+    queryset = queryset.select_related(*select_related).prefetch_related(*prefetch_related).order_by('pk')
+
+    count = 0
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:SEARCH_INDEX_CHUNK_SIZE])
+        if not chunk:
+            return count
+        SearchEntry.objects.save_entries(model, [[obj.pk] + get_search_texts(obj) for obj in chunk])
+        count += len(chunk)
+        last_pk = chunk[-1].pk
+
+
+def rebuild_search_index(model):
+    """
+    Index all objects of a model and delete any stale entries (e.g. for objects deleted without sending signals).
+    Returns the number of objects indexed.
+    """
+    count = update_search_index(model.objects.all())
+    SearchEntry.objects.filter(content_type=ContentType.objects.get_for_model(model)).exclude(
+        object_id__in=model.objects.values('pk')
+    ).delete()
+    return count
@@ -0,0 +1,125 @@
+from __future__ import unicode_literals
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from utilities.signals import connect_post_save
+from .choicecounts import invalidate_choice_counts
+from .counters import MODEL_COUNTERS, count_created_objects, invalidate_counters, is_counted
+from .models import CustomField, CustomFieldChoice, ObjectCounter, SearchEntry
+from .rollups import ROLLUP_MODELS, invalidate_stats
+from .search import SEARCH_INDEX, SEARCH_INDEX_DEPENDENCIES, update_search_index
+
+
+@receiver((post_save, post_delete), sender=CustomField)
+@receiver((post_save, post_delete), sender=CustomFieldChoice)
+@receiver(m2m_changed, sender=CustomField.obj_type.through)
+def clear_custom_field_cache(**kwargs):
+    """
+    When a CustomField, its choices or its assigned object types have been modified, invalidate all cached CustomFields.
+    """
+    CustomField.objects.clear_cache()
+
+
+def update_search_entry(sender, instance, **kwargs):
+    """
+    When an indexed object has been saved, update its search index entry.
+    """
+    update_search_index(sender.objects.filter(pk=instance.pk))
+
+
+def delete_search_entry(sender, instance, **kwargs):
+    """
+    When an indexed object has been deleted, delete its search index entry.
+    """
+    SearchEntry.objects.delete_entries(sender, [instance.pk])
+
+
+def update_dependent_search_entries(sender, instance, **kwargs):
+    """
+    When an object whose fields are included in the search index entries of other objects has been modified, update
+    the entries of those objects.
+    """
+    for model, lookup, attr in SEARCH_INDEX_DEPENDENCIES[sender]:
+        update_search_index(model.objects.filter(**{lookup: getattr(instance, attr)}))
+
+
+for model in SEARCH_INDEX:
+    connect_post_save(update_search_entry, model, bulk_create_safe=True)
+    post_delete.connect(delete_search_entry, sender=model)
+
+for model in SEARCH_INDEX_DEPENDENCIES:
+    connect_post_save(update_dependent_search_entries, model)
+    post_delete.connect(update_dependent_search_entries, sender=model)
+
+
+def count_saved_object(sender, instance, created, **kwargs):
+    """
+    When a counted object has been created, increment its counters. When one has been modified, invalidate any counter
+    which depends on one of its fields.
+    """
+    if created:
+        count_created_objects(sender, [instance])
+    else:
+        invalidate_counters(sender)
+
+
+def count_deleted_object(sender, instance, **kwargs):
+    """
+    When a counted object has been deleted, decrement its counters (or invalidate any counter which depends on one of
+    its fields, as the field may have been cleared during the deletion of a related object).
+    """
+    for name, field in MODEL_COUNTERS[sender]:
+        if field is None:
+            ObjectCounter.objects.adjust([name], -1)
+        elif is_counted(instance, field):
+            ObjectCounter.objects.invalidate([name])
+
+
+def invalidate_related_counters(sender, instance, **kwargs):
+    """
+    When an object referenced by a field on which a counter depends is deleted, the field is cleared on any referencing
+    objects without sending signals, so invalidate the counter.
+    """
+    for model, fields in COUNTER_RELATIONS[sender]:
+        invalidate_counters(model, fields)
+
+
+for model in MODEL_COUNTERS:
+    connect_post_save(count_saved_object, model, bulk_create_safe=True)
+    post_delete.connect(count_deleted_object, sender=model)
+
+# The (counted model, fields) referencing each model
+COUNTER_RELATIONS = {}
+for model, counters in MODEL_COUNTERS.items():
+    for name, field in counters:
+        if field is not None:
+            related_model = model._meta.get_field(field).related_model
+            COUNTER_RELATIONS.setdefault(related_model, []).append((model, [field]))
+for model in COUNTER_RELATIONS:
+    pre_delete.connect(invalidate_related_counters, sender=model)
+
+
+def invalidate_rollup_stats(**kwargs):
+    """
+    When an object which may be counted by the statistics of a Site, Region or Tenant has been modified, invalidate
+    all cached statistics.
+    """
+    invalidate_stats()
+
+
+for model in ROLLUP_MODELS:
+    connect_post_save(invalidate_rollup_stats, model, bulk_create_safe=True)
+    post_delete.connect(invalidate_rollup_stats, sender=model)
+
+
+def bulk_created(model, objects):
+    """
+    Update the search index, object counters, statistics and choice counts following the creation of objects using
+    bulk_create(), which does not send signals.
+    """
+    update_search_index(model.objects.filter(pk__in=[obj.pk for obj in objects]))
+    count_created_objects(model, objects)
+    if model in ROLLUP_MODELS:
+        invalidate_stats()
+    invalidate_choice_counts(model)
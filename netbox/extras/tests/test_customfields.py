@@ -9,7 +9,8 @@ from django.contrib.contenttypes.models import ContentType
 from django.test import TestCase
 from django.urls import reverse
 
-from dcim.models import Site
+from dcim.filters import SiteFilter
+from dcim.models import Rack, Site
 from extras.models import (
     CustomField, CustomFieldValue, CustomFieldChoice, CF_TYPE_TEXT, CF_TYPE_INTEGER, CF_TYPE_BOOLEAN, CF_TYPE_DATE,
     CF_TYPE_SELECT, CF_TYPE_URL,
@@ -103,6 +104,155 @@ class CustomFieldTest(TestCase):
         # Delete the custom field
         cf.delete()
 
+    def test_custom_field_data(self):
+
+        obj_type = ContentType.objects.get_for_model(Site)
+        site = Site.objects.first()
+
+        # Create a field of each type and assign a value to the first Site
+        DATA = (
+            (CF_TYPE_TEXT, 'Foobar!', 'Foobar!'),
+            (CF_TYPE_INTEGER, 42, 42),
+            (CF_TYPE_BOOLEAN, False, False),
+            (CF_TYPE_DATE, date(2016, 6, 23), '2016-06-23'),
+        )
+        fields = []
+        for i, (field_type, value, data_value) in enumerate(DATA):
+            cf = CustomField.objects.create(type=field_type, name='field_{}'.format(i), required=False)
+            cf.obj_type = [obj_type]
+            cfv = CustomFieldValue(field=cf, obj_type=obj_type, obj_id=site.pk)
+            cfv.value = value
+            cfv.save()
+            fields.append(cf)
+
+        # The values are mirrored in the Site's custom_field_data
+        site = Site.objects.get(pk=site.pk)
+        self.assertEqual(site.custom_field_data, {str(cf.pk): d[2] for cf, d in zip(fields, DATA)})
+        self.assertEqual(site.cf(), {cf.name: d[1] for cf, d in zip(fields, DATA)})
+
+        # Deleting a value removes it from custom_field_data
+        CustomFieldValue.objects.get(field=fields[0]).delete()
+        site = Site.objects.get(pk=site.pk)
+        self.assertNotIn(str(fields[0].pk), site.custom_field_data)
+        self.assertIsNone(site.cf()['field_0'])
+
+    def test_save_values(self):
+
+        obj_type = ContentType.objects.get_for_model(Site)
+        cf_integer = CustomField.objects.create(type=CF_TYPE_INTEGER, name='field_1')
+        cf_integer.obj_type = [obj_type]
+        cf_text = CustomField.objects.create(type=CF_TYPE_TEXT, name='field_2')
+        cf_text.obj_type = [obj_type]
+        site_a, site_b, site_c = Site.objects.order_by('name')
+
+        # Create values
+        data = CustomFieldValue.objects.save_values(Site, [
+            (cf_integer, site_a.pk, 1),
+            (cf_integer, site_b.pk, 2),
+            (cf_text, site_a.pk, 'Foo'),
+        ])
+        self.assertEqual(CustomFieldValue.objects.count(), 3)
+        self.assertEqual(data[site_a.pk], {str(cf_integer.pk): 1, str(cf_text.pk): 'Foo'})
+
+        # Update, create and delete values together
+        data = CustomFieldValue.objects.save_values(Site, [
+            (cf_integer, site_a.pk, 10),
+            (cf_integer, site_c.pk, 3),
+            (cf_text, site_a.pk, ''),
+            (cf_integer, site_b.pk, None),
+        ])
+        self.assertEqual(
+            sorted(CustomFieldValue.objects.values_list('obj_id', 'serialized_value')),
+            sorted([(site_a.pk, '10'), (site_c.pk, '3')])
+        )
+        self.assertEqual(data[site_a.pk], {str(cf_integer.pk): 10})
+        self.assertEqual(Site.objects.get(pk=site_b.pk).custom_field_data, {})
+
+
+class CustomFieldFilterTest(TestCase):
+
+    def setUp(self):
+
+        obj_type = ContentType.objects.get_for_model(Site)
+
+        self.cf_integer = CustomField.objects.create(type=CF_TYPE_INTEGER, name='vlan')
+        self.cf_integer.obj_type = [obj_type]
+        self.cf_date = CustomField.objects.create(type=CF_TYPE_DATE, name='installed')
+        self.cf_date.obj_type = [obj_type]
+        self.cf_text = CustomField.objects.create(type=CF_TYPE_TEXT, name='notes')
+        self.cf_text.obj_type = [obj_type]
+
+        VALUES = (
+            (1, date(2016, 1, 1), 'Foo'),
+            (10, date(2016, 6, 1), 'Foobar'),
+            (100, date(2017, 1, 1), 'Bar'),
+        )
+        for i, values in enumerate(VALUES, start=1):
+            site = Site.objects.create(name='Site {}'.format(i), slug='site-{}'.format(i))
+            for cf, value in zip((self.cf_integer, self.cf_date, self.cf_text), values):
+                cfv = CustomFieldValue(field=cf, obj=site)
+                cfv.value = value
+                cfv.save()
+
+    def filter_sites(self, **params):
+        return sorted(SiteFilter(params, Site.objects.all()).qs.values_list('name', flat=True))
+
+    def test_filter_integer(self):
+
+        self.assertEqual(self.filter_sites(cf_vlan='1'), ['Site 1'])
+        self.assertEqual(self.filter_sites(cf_vlan__gte='10'), ['Site 2', 'Site 3'])
+        self.assertEqual(self.filter_sites(cf_vlan__gte='5', cf_vlan__lte='50'), ['Site 2'])
+        self.assertEqual(self.filter_sites(cf_vlan='foo'), [])
+
+    def test_filter_date(self):
+
+        self.assertEqual(self.filter_sites(cf_installed='2016-06-01'), ['Site 2'])
+        self.assertEqual(self.filter_sites(cf_installed__lte='2016-12-31'), ['Site 1', 'Site 2'])
+
+    def test_filter_subquery(self):
+
+        # Filters remain valid when the filtered queryset is used as a subquery
+        for site in Site.objects.all():
+            Rack.objects.create(name='Rack', site=site)
+        sites = SiteFilter({'cf_vlan__gte': '10', 'cf_installed__lte': '2016-12-31'}, Site.objects.all()).qs
+        self.assertEqual(list(Rack.objects.filter(site__in=sites).values_list('site__name', flat=True)), ['Site 2'])
+
+    def test_filter_text(self):
+
+        self.assertEqual(self.filter_sites(cf_notes='foo'), ['Site 1', 'Site 2'])
+        self.assertEqual(self.filter_sites(cf_notes__exact='Foo'), ['Site 1'])
+        self.assertEqual(self.filter_sites(cf_notes__startswith='Bar'), ['Site 3'])
+
+
+class CustomFieldBulkEditTest(TestCase):
+
+    def setUp(self):
+
+        obj_type = ContentType.objects.get_for_model(Site)
+        self.cf_text = CustomField.objects.create(type=CF_TYPE_TEXT, name='notes')
+        self.cf_text.obj_type = [obj_type]
+
+        for i in range(1, 4):
+            Site.objects.create(name='Site {}'.format(i), slug='site-{}'.format(i), asn=65000)
+        Site.objects.create(name='Other', slug='other', asn=65100)
+
+        user = User.objects.create_superuser(username='testuser', email='testuser@example.com', password='testuser')
+        self.client.force_login(user)
+
+    def test_bulk_edit_all_filtered(self):
+
+        # Changing the ASN removes every site from the filtered selection
+        url = '{}?asn=65000'.format(reverse('dcim:site_bulk_edit'))
+        self.client.post(url, {'_all': 'true', '_apply': '', 'asn': 65001, 'cf_notes': 'Moved'})
+
+        sites = Site.objects.filter(slug__startswith='site-')
+        self.assertEqual(sites.filter(asn=65001).count(), 3)
+        self.assertEqual(
+            sorted(CustomFieldValue.objects.filter(field=self.cf_text).values_list('obj_id', flat=True)),
+            sorted(sites.values_list('pk', flat=True))
+        )
+        self.assertEqual(Site.objects.get(slug='other').custom_field_data, {})
+
 
 class CustomFieldAPITest(HttpStatusMixin, APITestCase):
 
@@ -0,0 +1,419 @@
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.template import Context, Template, TemplateSyntaxError
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from dcim.models import DeviceType, Manufacturer, Rack, Region, Site
+from extras.constants import (
+    ACTION_CREATE, ACTION_EDIT, CF_TYPE_SELECT, GRAPH_TYPE_SITE, JOB_COMPLETED, JOB_FAILED, JOB_PENDING, JOB_RUNNING,
+)
+from extras.counters import get_counters, reconcile_counters
+from extras.jobs import register_job
+from extras.models import (
+    CUSTOMFIELD_CACHE_VERSION, CacheVersion, CustomField, CustomFieldChoice, CustomFieldManager, ExportTemplate, Graph,
+    Job, ObjectCounter, SearchEntry, UserAction,
+)
+from extras.rollups import ROLLUP_CACHE_VERSION, annotate_stats, get_stats
+from netbox.views import SEARCH_TYPES, get_search_results
+from tenancy.models import Tenant
+from utilities.jobs import job_file_storage, save_job_file
+from utilities.views import CustomFieldQueryset
+
+
+class ExportTemplateTestCase(TestCase):
+
+    def setUp(self):
+
+        for i in range(1, 4):
+            Site.objects.create(name='Test Site {}'.format(i), slug='test-site-{}'.format(i))
+
+        self.export_template = ExportTemplate.objects.create(
+            content_type=ContentType.objects.get_for_model(Site),
+            name='Test Export Template',
+            template_code='Sites\r\n{% for site in queryset %}{{ forloop.counter }}/{{ forloop.revcounter }} '
+                          '{{ site.name }}{% if not forloop.last %}\r\n{% endif %}{% empty %}None{% endfor %}\r\n'
+        )
+
+    def test_render_stream(self):
+
+        queryset = CustomFieldQueryset(Site.objects.order_by('name'), [])
+        output = ''.join(self.export_template.render_stream({'queryset': queryset}))
+        expected = Template(self.export_template.template_code).render(
+            Context({'queryset': list(Site.objects.order_by('name'))})
+        ).replace('\r\n', '\n')
+
+        self.assertEqual(output, expected)
+        self.assertEqual(output, 'Sites\n1/3 Test Site 1\n2/2 Test Site 2\n3/1 Test Site 3\n')
+
+    def test_render_stream_queryset(self):
+
+        # Neither a plain QuerySet nor a CustomFieldQueryset is evaluated in full
+        for queryset in (Site.objects.order_by('name'), CustomFieldQueryset(Site.objects.order_by('name'), [])):
+            output = ''.join(self.export_template.render_stream({'queryset': queryset}))
+            self.assertEqual(output, 'Sites\n1/3 Test Site 1\n2/2 Test Site 2\n3/1 Test Site 3\n')
+            self.assertIsNone(getattr(queryset, 'queryset', queryset)._result_cache)
+
+    def test_render_stream_empty(self):
+
+        queryset = CustomFieldQueryset(Site.objects.none(), [])
+        output = ''.join(self.export_template.render_stream({'queryset': queryset}))
+
+        self.assertEqual(output, 'Sites\nNone\n')
+
+    def test_queryset_methods(self):
+
+        queryset = CustomFieldQueryset(Site.objects.order_by('name'), [])
+        self.export_template.template_code = '{{ queryset.first.name }}/{{ queryset.all|length }}/{{ queryset.1.name }}'
+        output = ''.join(self.export_template.render_stream({'queryset': queryset}))
+
+        self.assertEqual(output, 'Test Site 1/3/Test Site 2')
+
+    def test_syntax_error(self):
+
+        self.export_template.template_code = '{% for site in queryset %}'
+        with self.assertRaises(TemplateSyntaxError):
+            self.export_template.to_response({'queryset': Site.objects.all()}, 'sites')
+
+    def test_compiled_template_cache(self):
+
+        template = self.export_template.get_template()
+        self.assertIs(ExportTemplate.objects.get(pk=self.export_template.pk).get_template(), template)
+
+        self.export_template.template_code = '{{ queryset|length }}'
+        self.export_template.save()
+        template2 = ExportTemplate.objects.get(pk=self.export_template.pk).get_template()
+
+        self.assertIsNot(template2, template)
+        self.assertEqual(template2.render(Context({'queryset': [1, 2]})), '2')
+
+
+class CustomFieldManagerTestCase(TransactionTestCase):
+
+    def test_get_for_model(self):
+
+        cf = CustomField.objects.create(type=CF_TYPE_SELECT, name='my_field')
+        cf.obj_type = [ContentType.objects.get_for_model(Site)]
+
+        fields = CustomField.objects.get_for_model(Site)
+        self.assertEqual(fields, [cf])
+        self.assertIs(CustomField.objects.get_for_model(Site), fields)
+
+        # Adding a choice invalidates the cache
+        CustomFieldChoice.objects.create(field=cf, value='Option A')
+        fields = CustomField.objects.get_for_model(Site)
+        self.assertEqual([c.value for c in fields[0].choices.all()], ['Option A'])
+
+        # As does unassigning the field
+        cf.obj_type = []
+        self.assertEqual(CustomField.objects.get_for_model(Site), [])
+
+    def test_invalidation_across_processes(self):
+
+        # A separate manager stands in for the cache of another process
+        other = CustomFieldManager()
+        other.model = CustomField
+        self.assertEqual(other.get_for_model(Site), [])
+
+        cf = CustomField.objects.create(type=CF_TYPE_SELECT, name='my_field')
+        cf.obj_type = [ContentType.objects.get_for_model(Site)]
+        self.assertGreater(CacheVersion.objects.get_versions([CUSTOMFIELD_CACHE_VERSION])[0], 0)
+
+        # The other process picks up the change once it next checks the version
+        other._cache_checked = 0
+        self.assertEqual(other.get_for_model(Site), [cf])
+
+
+class GraphTestCase(TestCase):
+
+    def setUp(self):
+
+        self.site = Site.objects.create(name='Test Site 1', slug='test-site-1')
+        self.graph = Graph.objects.create(
+            type=GRAPH_TYPE_SITE, name='Test Graph 1', source='http://example.com/graphs.py?site={{ obj.slug }}',
+            link='http://example.com/sites/{{ obj.slug }}/'
+        )
+
+    def test_embed_url(self):
+
+        self.assertEqual(self.graph.embed_url(self.site), 'http://example.com/graphs.py?site=test-site-1')
+        self.assertEqual(self.graph.embed_link(self.site), 'http://example.com/sites/test-site-1/')
+
+    def test_compiled_template_cache(self):
+
+        template = self.graph.get_template('source')
+        self.assertIs(Graph.objects.get(pk=self.graph.pk).get_template('source'), template)
+
+        self.graph.source = 'http://example.com/graphs.py?id={{ obj.pk }}'
+        self.graph.save()
+        graph = Graph.objects.get(pk=self.graph.pk)
+
+        self.assertIsNot(graph.get_template('source'), template)
+        self.assertEqual(graph.embed_url(self.site), 'http://example.com/graphs.py?id={}'.format(self.site.pk))
+
+
+@register_job('tests.create_sites')
+def create_sites(job, count):
+    for i in range(1, count + 1):
+        Site.objects.create(name='Job Site {}'.format(i), slug='job-site-{}'.format(i))
+        job.set_progress(i, count)
+    return {'created': count}
+
+
+class JobTestCase(TestCase):
+
+    def test_run_job(self):
+
+        job = Job.objects.enqueue('tests.create_sites', count=3)
+        self.assertEqual(job.status, JOB_PENDING)
+
+        claimed = Job.objects.claim()
+        self.assertEqual(claimed, job)
+        self.assertEqual(claimed.status, JOB_RUNNING)
+        self.assertIsNone(Job.objects.claim())
+
+        claimed.run()
+        job.refresh_from_db()
+        self.assertEqual(job.status, JOB_COMPLETED)
+        self.assertEqual(job.result, {'created': 3})
+        self.assertEqual((job.progress, job.total), (3, 3))
+        self.assertEqual(Site.objects.filter(slug__startswith='job-site-').count(), 3)
+
+    def test_failed_job(self):
+
+        Job.objects.enqueue('tests.create_sites', count='three')
+        job = Job.objects.claim()
+        job.run()
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, JOB_FAILED)
+        self.assertIn('TypeError', job.error)
+        self.assertIsNotNone(job.completed)
+
+    def test_import_csv_job(self):
+
+        upload = ContentFile(b'name,slug\nCSV Site 1,csv-site-1\nCSV Site 2,csv-site-2\n', name='../../media/sites.csv')
+        path = save_job_file(upload)
+
+        # Uploaded files are saved under a random name, outside of the (unauthenticated) media directory
+        self.assertNotIn('sites', path)
+        self.assertFalse(job_file_storage.path(path).startswith(settings.MEDIA_ROOT))
+
+        Job.objects.enqueue('utilities.import_csv', model_form='dcim.forms.SiteCSVForm', path=path)
+        job = Job.objects.claim()
+        job.run()
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, JOB_COMPLETED)
+        self.assertEqual(job.result['created'], 2)
+        self.assertFalse(job_file_storage.exists(path))
+
+
+class SearchEntryTestCase(TestCase):
+
+    def setUp(self):
+
+        manufacturer = Manufacturer.objects.create(name='Acme', slug='acme')
+        self.device_type = DeviceType.objects.create(manufacturer=manufacturer, model='Router 9000', slug='router-9000')
+        self.sites = [
+            Site.objects.create(name='Test Site {}'.format(i), slug='test-site-{}'.format(i), facility='DC{}'.format(i))
+            for i in range(1, 4)
+        ]
+
+    def test_search(self):
+
+        matches = SearchEntry.objects.search('test site', [Site, DeviceType], 2)
+        self.assertEqual(list(matches), [Site])
+        self.assertEqual(matches[Site][0], 3)
+        self.assertEqual(len(matches[Site][1]), 2)
+
+        # Substring matching
+        matches = SearchEntry.objects.search('C2', [Site], 10)
+        self.assertEqual(matches[Site], (1, [self.sites[1].pk]))
+
+        # The highest-weighted match ranks first
+        self.sites[2].comments = 'Test Site 2 is next door'
+        self.sites[2].save()
+        matches = SearchEntry.objects.search('test site 2', [Site], 10)
+        self.assertEqual(matches[Site][1], [self.sites[1].pk, self.sites[2].pk])
+
+    def test_related_objects(self):
+
+        manufacturer = self.device_type.manufacturer
+        manufacturer.name = 'Initech'
+        manufacturer.save()
+        matches = SearchEntry.objects.search('initech', [DeviceType], 10)
+        self.assertEqual(matches[DeviceType], (1, [self.device_type.pk]))
+
+    def test_delete(self):
+
+        self.sites[0].delete()
+        matches = SearchEntry.objects.search('test site', [Site], 10)
+        self.assertEqual(matches[Site][0], 2)
+        self.assertNotIn(self.sites[0].pk, matches[Site][1])
+
+
+class SearchResultsTestCase(TransactionTestCase):
+
+    def setUp(self):
+
+        Site.objects.create(name='Test Site 1', slug='test-site-1')
+        manufacturer = Manufacturer.objects.create(name='Acme', slug='acme')
+        DeviceType.objects.create(manufacturer=manufacturer, model='Test Router', slug='test-router')
+
+    @override_settings(SEARCH_TIMEOUT=10)
+    def test_search_timeout(self):
+
+        # Match sites using a subquery which runs for longer than the timeout
+        site_type = SEARCH_TYPES['site']
+        sql = 'SELECT id FROM {}, pg_sleep(1)'.format(Site._meta.db_table)
+        SEARCH_TYPES['site'] = dict(site_type, lookup=lambda value: Q(pk__in=RawSQL(sql, [])))
+        try:
+            results = get_search_results('test', ['site', 'devicetype'])
+        finally:
+            SEARCH_TYPES['site'] = site_type
+
+        self.assertEqual(results, [
+            {'name': 'sites', 'timed_out': True},
+            {'name': 'device types', 'timed_out': True},
+        ])
+
+        # The timeout applies only to the search transaction
+        results = get_search_results('test', ['site', 'devicetype'])
+        self.assertEqual([(result['name'], result['count']) for result in results], [('sites', 1), ('device types', 1)])
+
+    @override_settings(SEARCH_THREADS=2)
+    def test_search_threads(self):
+
+        response = self.client.get('{}?q=test'.format(reverse('search')))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(result['name'], result['count']) for result in response.context['results']],
+            [('sites', 1), ('device types', 1)]
+        )
+
+
+class ObjectCounterTestCase(TestCase):
+
+    def setUp(self):
+
+        self.sites = [Site.objects.create(name='Site {}'.format(i), slug='site-{}'.format(i)) for i in range(1, 4)]
+
+    def test_counters(self):
+
+        self.assertEqual(get_counters()['site_count'], 3)
+
+        Site.objects.create(name='Site 4', slug='site-4')
+        self.sites[0].delete()
+        self.assertEqual(ObjectCounter.objects.get(name='site_count').value, 3)
+        self.assertEqual(get_counters()['site_count'], 3)
+
+    def test_invalidated_counter(self):
+
+        get_counters()
+        ObjectCounter.objects.invalidate(['site_count'])
+        self.assertIsNone(ObjectCounter.objects.get(name='site_count').value)
+        self.assertEqual(get_counters()['site_count'], 3)
+        self.assertEqual(ObjectCounter.objects.get(name='site_count').value, 3)
+
+    def test_reconcile_counters(self):
+
+        get_counters()
+        ObjectCounter.objects.adjust(['site_count'], 5)
+        self.assertEqual(reconcile_counters(), [('site_count', 8, 3)])
+        self.assertEqual(reconcile_counters(), [])
+
+
+class RollupStatsTestCase(TestCase):
+
+    def setUp(self):
+
+        self.tenant = Tenant.objects.create(name='Tenant 1', slug='tenant-1')
+        self.parent_region = Region.objects.create(name='Region 1', slug='region-1')
+        self.child_region = Region.objects.create(name='Region 2', slug='region-2', parent=self.parent_region)
+        self.sites = [
+            Site.objects.create(name='Site 1', slug='site-1', region=self.parent_region, tenant=self.tenant),
+            Site.objects.create(name='Site 2', slug='site-2', region=self.child_region),
+        ]
+        Rack.objects.create(name='Rack 1', site=self.sites[0], tenant=self.tenant)
+        Rack.objects.create(name='Rack 2', site=self.sites[1])
+        Rack.objects.create(name='Rack 3', site=self.sites[1])
+
+    def test_site_stats(self):
+
+        stats = get_stats(self.sites[1])
+        self.assertEqual(stats['rack_count'], 2)
+        self.assertEqual(stats['device_count'], 0)
+
+    def test_site_stats_invalidation(self):
+
+        self.assertEqual(get_stats(self.sites[1])['rack_count'], 2)
+        Rack.objects.create(name='Rack 4', site=self.sites[1])
+
+        # The version is incremented on commit, possibly by another process (changes are not committed within a test)
+        CacheVersion.objects.create(name=ROLLUP_CACHE_VERSION, version=1)
+        self.assertEqual(get_stats(self.sites[1])['rack_count'], 3)
+
+    def test_region_stats(self):
+
+        regions = {region.pk: region for region in annotate_stats(Region.objects.all())}
+        self.assertEqual(regions[self.parent_region.pk].site_count, 2)
+        self.assertEqual(regions[self.parent_region.pk].rack_count, 3)
+        self.assertEqual(regions[self.child_region.pk].site_count, 1)
+        self.assertEqual(regions[self.child_region.pk].rack_count, 2)
+
+    def test_tenant_stats(self):
+
+        stats = get_stats(self.tenant)
+        self.assertEqual(stats['site_count'], 1)
+        self.assertEqual(stats['rack_count'], 1)
+
+
+class UserActionTestCase(TransactionTestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(username='testuser')
+        self.site = Site.objects.create(name='Test Site', slug='test-site')
+
+    def test_buffered_actions(self):
+
+        UserAction.objects.start_buffering()
+        UserAction.objects.log_create(self.user, self.site)
+        UserAction.objects.log_edit(self.user, self.site)
+        try:
+            with transaction.atomic():
+                UserAction.objects.log_delete(self.user, self.site)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(UserAction.objects.exists())
+
+        # The action logged within the rolled back transaction is discarded
+        UserAction.objects.flush()
+        self.assertEqual(UserAction.objects.count(), 2)
+
+        # Actions are no longer buffered
+        UserAction.objects.log_delete(self.user, self.site)
+        self.assertEqual(UserAction.objects.count(), 3)
+
+    @override_settings(USER_ACTION_RETENTION=30)
+    def test_prune(self):
+
+        UserAction.objects.log_create(self.user, self.site)
+        UserAction.objects.log_edit(self.user, self.site)
+        UserAction.objects.filter(action=ACTION_CREATE).update(time=timezone.now() - timedelta(days=31))
+
+        self.assertEqual(UserAction.objects.prune(), 1)
+        self.assertEqual(list(UserAction.objects.values_list('action', flat=True)), [ACTION_EDIT])
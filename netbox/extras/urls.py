@@ -12,4 +12,7 @@ urlpatterns = [
     url(r'^image-attachments/(?P<pk>\d+)/edit/$', views.ImageAttachmentEditView.as_view(), name='imageattachment_edit'),
     url(r'^image-attachments/(?P<pk>\d+)/delete/$', views.ImageAttachmentDeleteView.as_view(), name='imageattachment_delete'),
 
+    # Background jobs
+    url(r'^jobs/(?P<pk>\d+)/$', views.JobView.as_view(), name='job'),
+
 ]
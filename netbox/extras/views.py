@@ -1,11 +1,12 @@
 from __future__ import unicode_literals
 
-from django.contrib.auth.mixins import PermissionRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.shortcuts import get_object_or_404, render
+from django.views.generic import View
 
 from utilities.views import ObjectDeleteView, ObjectEditView
 from .forms import ImageAttachmentForm
-from .models import ImageAttachment
+from .models import ImageAttachment, Job
 
 
 class ImageAttachmentEditView(PermissionRequiredMixin, ObjectEditView):
@@ -30,3 +31,22 @@ class ImageAttachmentDeleteView(PermissionRequiredMixin, ObjectDeleteView):
 
     def get_return_url(self, request, imageattachment):
         return imageattachment.parent.get_absolute_url()
+
+
+#
+# Background jobs
+#
+
+class JobView(LoginRequiredMixin, View):
+
+    def get(self, request, pk):
+
+        # Users may view only their own jobs
+        jobs = Job.objects.select_related('user')
+        if not request.user.is_superuser:
+            jobs = jobs.filter(user=request.user)
+        job = get_object_or_404(jobs, pk=pk)
+
+        return render(request, 'extras/job.html', {
+            'job': job,
+        })
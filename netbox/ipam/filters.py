@@ -226,6 +226,17 @@ class IPAddressFilter(CustomFieldFilterSet, django_filters.FilterSet):
         to_field_name='slug',
         label='Tenant (slug)',
     )
+    site_id = django_filters.ModelMultipleChoiceFilter(
+        name='interface__device__site',
+        queryset=Site.objects.all(),
+        label='Site (ID)',
+    )
+    site = django_filters.ModelMultipleChoiceFilter(
+        name='interface__device__site__slug',
+        queryset=Site.objects.all(),
+        to_field_name='slug',
+        label='Site (slug)',
+    )
     device_id = django_filters.ModelMultipleChoiceFilter(
         name='interface__device',
         queryset=Device.objects.all(),
@@ -2,9 +2,9 @@ from __future__ import unicode_literals
 
 from django import forms
 from django.core.exceptions import MultipleObjectsReturned
-from django.db.models import Count
 
 from dcim.models import Site, Rack, Device, Interface
+from extras.choicecounts import get_value_counts
 from extras.forms import CustomFieldForm, CustomFieldBulkEditForm, CustomFieldFilterForm
 from tenancy.forms import TenancyForm
 from tenancy.models import Tenant
@@ -83,7 +83,7 @@ class VRFBulkEditForm(BootstrapMixin, CustomFieldBulkEditForm):
 class VRFFilterForm(BootstrapMixin, CustomFieldFilterForm):
     model = VRF
     q = forms.CharField(required=False, label='Search')
-    tenant = FilterChoiceField(queryset=Tenant.objects.annotate(filter_count=Count('vrfs')), to_field_name='slug',
+    tenant = FilterChoiceField(queryset=Tenant.objects.all(), filter_count='vrfs', to_field_name='slug',
                                null_option=(0, None))
 
 
@@ -153,7 +153,8 @@ class AggregateFilterForm(BootstrapMixin, CustomFieldFilterForm):
     q = forms.CharField(required=False, label='Search')
     family = forms.ChoiceField(required=False, choices=IP_FAMILY_CHOICES, label='Address Family')
     rir = FilterChoiceField(
-        queryset=RIR.objects.annotate(filter_count=Count('aggregates')),
+        queryset=RIR.objects.all(),
+        filter_count='aggregates',
         to_field_name='slug',
         label='RIR'
     )
@@ -333,9 +334,7 @@ class PrefixBulkEditForm(BootstrapMixin, CustomFieldBulkEditForm):
 
 
 def prefix_status_choices():
-    status_counts = {}
-    for status in Prefix.objects.values('status').annotate(count=Count('status')).order_by('status'):
-        status_counts[status['status']] = status['count']
+    status_counts = get_value_counts(Prefix, 'status')
     return [(s[0], '{} ({})'.format(s[1], status_counts.get(s[0], 0))) for s in PREFIX_STATUS_CHOICES]
 
 
@@ -348,24 +347,28 @@ class PrefixFilterForm(BootstrapMixin, CustomFieldFilterForm):
     family = forms.ChoiceField(required=False, choices=IP_FAMILY_CHOICES, label='Address family')
     mask_length = forms.ChoiceField(required=False, choices=PREFIX_MASK_LENGTH_CHOICES, label='Mask length')
     vrf = FilterChoiceField(
-        queryset=VRF.objects.annotate(filter_count=Count('prefixes')),
+        queryset=VRF.objects.all(),
+        filter_count='prefixes',
         to_field_name='rd',
         label='VRF',
         null_option=(0, 'Global')
     )
     tenant = FilterChoiceField(
-        queryset=Tenant.objects.annotate(filter_count=Count('prefixes')),
+        queryset=Tenant.objects.all(),
+        filter_count='prefixes',
         to_field_name='slug',
         null_option=(0, 'None')
     )
     status = forms.MultipleChoiceField(choices=prefix_status_choices, required=False)
     site = FilterChoiceField(
-        queryset=Site.objects.annotate(filter_count=Count('prefixes')),
+        queryset=Site.objects.all(),
+        filter_count='prefixes',
         to_field_name='slug',
         null_option=(0, 'None')
     )
     role = FilterChoiceField(
-        queryset=Role.objects.annotate(filter_count=Count('prefixes')),
+        queryset=Role.objects.all(),
+        filter_count='prefixes',
         to_field_name='slug',
         null_option=(0, 'None')
     )
@@ -678,16 +681,12 @@ class IPAddressBulkEditForm(BootstrapMixin, CustomFieldBulkEditForm):
 
 
 def ipaddress_status_choices():
-    status_counts = {}
-    for status in IPAddress.objects.values('status').annotate(count=Count('status')).order_by('status'):
-        status_counts[status['status']] = status['count']
+    status_counts = get_value_counts(IPAddress, 'status')
     return [(s[0], '{} ({})'.format(s[1], status_counts.get(s[0], 0))) for s in IPADDRESS_STATUS_CHOICES]
 
 
 def ipaddress_role_choices():
-    role_counts = {}
-    for role in IPAddress.objects.values('role').annotate(count=Count('role')).order_by('role'):
-        role_counts[role['role']] = role['count']
+    role_counts = get_value_counts(IPAddress, 'role')
     return [(r[0], '{} ({})'.format(r[1], role_counts.get(r[0], 0))) for r in IPADDRESS_ROLE_CHOICES]
 
 
@@ -700,13 +699,15 @@ class IPAddressFilterForm(BootstrapMixin, CustomFieldFilterForm):
     family = forms.ChoiceField(required=False, choices=IP_FAMILY_CHOICES, label='Address family')
     mask_length = forms.ChoiceField(required=False, choices=IPADDRESS_MASK_LENGTH_CHOICES, label='Mask length')
     vrf = FilterChoiceField(
-        queryset=VRF.objects.annotate(filter_count=Count('ip_addresses')),
+        queryset=VRF.objects.all(),
+        filter_count='ip_addresses',
         to_field_name='rd',
         label='VRF',
         null_option=(0, 'Global')
     )
     tenant = FilterChoiceField(
-        queryset=Tenant.objects.annotate(filter_count=Count('ip_addresses')),
+        queryset=Tenant.objects.all(),
+        filter_count='ip_addresses',
         to_field_name='slug',
         null_option=(0, 'None')
     )
@@ -728,7 +729,8 @@ class VLANGroupForm(BootstrapMixin, forms.ModelForm):
 
 class VLANGroupFilterForm(BootstrapMixin, forms.Form):
     site = FilterChoiceField(
-        queryset=Site.objects.annotate(filter_count=Count('vlan_groups')),
+        queryset=Site.objects.all(),
+        filter_count='vlan_groups',
         to_field_name='slug',
         null_option=(0, 'Global')
     )
@@ -848,9 +850,7 @@ class VLANBulkEditForm(BootstrapMixin, CustomFieldBulkEditForm):
 
 
 def vlan_status_choices():
-    status_counts = {}
-    for status in VLAN.objects.values('status').annotate(count=Count('status')).order_by('status'):
-        status_counts[status['status']] = status['count']
+    status_counts = get_value_counts(VLAN, 'status')
     return [(s[0], '{} ({})'.format(s[1], status_counts.get(s[0], 0))) for s in VLAN_STATUS_CHOICES]
 
 
@@ -858,23 +858,27 @@ class VLANFilterForm(BootstrapMixin, CustomFieldFilterForm):
     model = VLAN
     q = forms.CharField(required=False, label='Search')
     site = FilterChoiceField(
-        queryset=Site.objects.annotate(filter_count=Count('vlans')),
+        queryset=Site.objects.all(),
+        filter_count='vlans',
         to_field_name='slug',
         null_option=(0, 'Global')
     )
     group_id = FilterChoiceField(
-        queryset=VLANGroup.objects.annotate(filter_count=Count('vlans')),
+        queryset=VLANGroup.objects.all(),
+        filter_count='vlans',
         label='VLAN group',
         null_option=(0, 'None')
     )
     tenant = FilterChoiceField(
-        queryset=Tenant.objects.annotate(filter_count=Count('vlans')),
+        queryset=Tenant.objects.all(),
+        filter_count='vlans',
         to_field_name='slug',
         null_option=(0, 'None')
     )
     status = forms.MultipleChoiceField(choices=vlan_status_choices, required=False)
     role = FilterChoiceField(
-        queryset=Role.objects.annotate(filter_count=Count('vlans')),
+        queryset=Role.objects.all(),
+        filter_count='vlans',
         to_field_name='slug',
         null_option=(0, 'None')
     )
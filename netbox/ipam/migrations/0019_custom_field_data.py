@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2017-08-21 14:02
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipam', '0018_remove_service_uniqueness_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aggregate',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ipaddress',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='prefix',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vlan',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vrf',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='aggregate',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='ipam_aggregate_cf_data_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='ipaddress',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='ipam_ipaddress_cf_data_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='prefix',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='ipam_prefix_cf_data_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='vlan',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='ipam_vlan_cf_data_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='vrf',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='ipam_vrf_cf_data_gin'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Trigram indexes supporting case-insensitive substring searches (see utilities.lookups.ILikeContains)
+TRIGRAM_INDEXES_SQL = [
+    'CREATE INDEX ipam_vrf_name_trgm ON ipam_vrf USING gin (name gin_trgm_ops)',
+    'CREATE INDEX ipam_vrf_rd_trgm ON ipam_vrf USING gin (rd gin_trgm_ops)',
+    'CREATE INDEX ipam_vrf_description_trgm ON ipam_vrf USING gin (description gin_trgm_ops)',
+    'CREATE INDEX ipam_aggregate_description_trgm ON ipam_aggregate USING gin (description gin_trgm_ops)',
+    'CREATE INDEX ipam_prefix_description_trgm ON ipam_prefix USING gin (description gin_trgm_ops)',
+    'CREATE INDEX ipam_ipaddress_description_trgm ON ipam_ipaddress USING gin (description gin_trgm_ops)',
+    'CREATE INDEX ipam_vlan_name_trgm ON ipam_vlan USING gin (name gin_trgm_ops)',
+    'CREATE INDEX ipam_vlan_description_trgm ON ipam_vlan USING gin (description gin_trgm_ops)',
+]
+DROP_TRIGRAM_INDEXES_SQL = [
+    'DROP INDEX ipam_vrf_name_trgm',
+    'DROP INDEX ipam_vrf_rd_trgm',
+    'DROP INDEX ipam_vrf_description_trgm',
+    'DROP INDEX ipam_aggregate_description_trgm',
+    'DROP INDEX ipam_prefix_description_trgm',
+    'DROP INDEX ipam_ipaddress_description_trgm',
+    'DROP INDEX ipam_vlan_name_trgm',
+    'DROP INDEX ipam_vlan_description_trgm',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ipam', '0019_custom_field_data'),
+        # Creates the pg_trgm extension
+        ('extras', '0010_searchentry'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=TRIGRAM_INDEXES_SQL, reverse_sql=DROP_TRIGRAM_INDEXES_SQL),
+    ]
@@ -3,6 +3,8 @@ import netaddr
 
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
@@ -34,13 +36,16 @@ class VRF(CreatedUpdatedModel, CustomFieldModel):
                                          help_text="Prevent duplicate prefixes/IP addresses within this VRF")
     description = models.CharField(max_length=100, blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
 
     csv_headers = ['name', 'rd', 'tenant', 'enforce_unique', 'description']
+    csv_related_fields = ['tenant']
 
     class Meta:
         ordering = ['name']
         verbose_name = 'VRF'
         verbose_name_plural = 'VRFs'
+        indexes = [GinIndex(fields=['custom_field_data'], name='ipam_vrf_cf_data_gin')]
 
     def __str__(self):
         return self.display_name or super(VRF, self).__str__()
@@ -99,11 +104,14 @@ class Aggregate(CreatedUpdatedModel, CustomFieldModel):
     date_added = models.DateField(blank=True, null=True)
     description = models.CharField(max_length=100, blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
 
     csv_headers = ['prefix', 'rir', 'date_added', 'description']
+    csv_related_fields = ['rir']
 
     class Meta:
         ordering = ['family', 'prefix']
+        indexes = [GinIndex(fields=['custom_field_data'], name='ipam_aggregate_cf_data_gin')]
 
     def __str__(self):
         return str(self.prefix)
@@ -246,16 +254,19 @@ class Prefix(CreatedUpdatedModel, CustomFieldModel):
                                   help_text="All IP addresses within this prefix are considered usable")
     description = models.CharField(max_length=100, blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
 
     objects = PrefixQuerySet.as_manager()
 
     csv_headers = [
         'prefix', 'vrf', 'tenant', 'site', 'vlan_group', 'vlan_vid', 'status', 'role', 'is_pool', 'description',
     ]
+    csv_related_fields = ['vrf', 'tenant', 'site', 'vlan__group', 'role']
 
     class Meta:
         ordering = ['vrf', 'family', 'prefix']
         verbose_name_plural = 'prefixes'
+        indexes = [GinIndex(fields=['custom_field_data'], name='ipam_prefix_cf_data_gin')]
 
     def __str__(self):
         return str(self.prefix)
@@ -414,17 +425,20 @@ class IPAddress(CreatedUpdatedModel, CustomFieldModel):
                                       help_text="The IP for which this address is the \"outside\" IP")
     description = models.CharField(max_length=100, blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
 
     objects = IPAddressManager()
 
     csv_headers = [
         'address', 'vrf', 'tenant', 'status', 'role', 'device', 'interface_name', 'is_primary', 'description',
     ]
+    csv_related_fields = ['vrf', 'tenant', 'interface__device', 'primary_ip4_for', 'primary_ip6_for']
 
     class Meta:
         ordering = ['family', 'address']
         verbose_name = 'IP address'
         verbose_name_plural = 'IP addresses'
+        indexes = [GinIndex(fields=['custom_field_data'], name='ipam_ipaddress_cf_data_gin')]
 
     def __str__(self):
         return str(self.address)
@@ -535,8 +549,10 @@ class VLAN(CreatedUpdatedModel, CustomFieldModel):
     role = models.ForeignKey('Role', related_name='vlans', on_delete=models.SET_NULL, blank=True, null=True)
     description = models.CharField(max_length=100, blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
 
     csv_headers = ['site', 'group_name', 'vid', 'name', 'tenant', 'status', 'role', 'description']
+    csv_related_fields = ['site', 'group', 'tenant', 'role']
 
     class Meta:
         ordering = ['site', 'group', 'vid']
@@ -546,6 +562,7 @@ class VLAN(CreatedUpdatedModel, CustomFieldModel):
         ]
         verbose_name = 'VLAN'
         verbose_name_plural = 'VLANs'
+        indexes = [GinIndex(fields=['custom_field_data'], name='ipam_vlan_cf_data_gin')]
 
     def __str__(self):
         return self.display_name or super(VLAN, self).__str__()
@@ -38,6 +38,10 @@ ADMINS = [
     # ['John Doe', 'jdoe@example.com'],
 ]
 
+# Run long-running operations (such as imports of uploaded CSV files and deletions of all objects matching a filter) as
+# background jobs. This requires at least one job worker to be running (manage.py jobworker).
+BACKGROUND_JOBS = False
+
 # Optionally display a persistent banner at the top and/or bottom of every page. To display the same content in both
 # banners, define BANNER_TOP and set BANNER_BOTTOM = BANNER_TOP.
 BANNER_TOP = ''
@@ -47,6 +51,9 @@ BANNER_BOTTOM = ''
 # BASE_PATH = 'netbox/'
 BASE_PATH = ''
 
+# The amount of time (in seconds) for which rendered page fragments (such as a device's component lists) are cached.
+CACHE_TIMEOUT = 900
+
 # API Cross-Origin Resource Sharing (CORS) settings. If CORS_ORIGIN_ALLOW_ALL is set to True, all origins will be
 # allowed. Otherwise, define a list of allowed origins using either CORS_ORIGIN_WHITELIST or
 # CORS_ORIGIN_REGEX_WHITELIST. For more information, see https://github.com/ottoyiu/django-cors-headers
@@ -58,6 +65,14 @@ CORS_ORIGIN_REGEX_WHITELIST = [
     # r'^(https?://)?(\w+\.)?example\.com$',
 ]
 
+# Lists of objects larger than this are counted using an estimate provided by the database, rather than exactly. Set
+# this to 0 or None to always count objects exactly. (Default: 10000)
+COUNT_ESTIMATE_THRESHOLD = 10000
+
+# Objects imported from CSV data are validated and saved in chunks of this many rows, each in its own transaction. If
+# an error is encountered, the rows in preceding chunks remain imported. (Default: 1000)
+CSV_IMPORT_CHUNK_SIZE = 1000
+
 # Set to True to enable server debugging. WARNING: Debugging introduces a substantial performance penalty and may reveal
 # sensitive information about your installation. Only enable debugging while performing testing. Never enable debugging
 # on a production system.
@@ -77,6 +92,10 @@ EMAIL = {
 # (all prefixes and IP addresses not assigned to a VRF), set ENFORCE_GLOBAL_UNIQUE to True.
 ENFORCE_GLOBAL_UNIQUE = False
 
+# The directory in which files uploaded for processing by background jobs are held. This must not be within the media
+# directory, which is served without authentication. Defaults to job-files/ within the NetBox installation directory.
+# JOB_FILES_ROOT = '/opt/netbox/netbox/job-files'
+
 # Enable custom logging. Please see the Django documentation for detailed guidance on configuring custom logs:
 #   https://docs.djangoproject.com/en/1.11/topics/logging/
 LOGGING = {}
@@ -93,6 +112,13 @@ MAINTENANCE_MODE = False
 # all objects by specifying "?limit=0".
 MAX_PAGE_SIZE = 1000
 
+# Record the duration and database queries of requests for each view, exposing them at /metrics in the Prometheus
+# text format. Each NetBox process reports the requests it has handled. (Default: False)
+METRICS_ENABLED = False
+
+# The fraction of requests (between 0 and 1) whose metrics are recorded when METRICS_ENABLED is True. (Default: 1.0)
+METRICS_SAMPLE_RATE = 1.0
+
 # Credentials that NetBox will uses to authenticate to devices when connecting via NAPALM.
 NAPALM_USERNAME = ''
 NAPALM_PASSWORD = ''
@@ -111,9 +137,21 @@ PAGINATE_COUNT = 50
 # prefer IPv4 instead.
 PREFER_IPV4 = False
 
+# The global search can retrieve the results for each type of object concurrently, using a pool of this many threads
+# (each with its own database connection). Set to 0 to retrieve all results using a single query. (Default: 0)
+SEARCH_THREADS = 0
+
+# The maximum time (in milliseconds) allowed for a global search query. Types of object whose results cannot be
+# retrieved in time are reported as having timed out. Set to 0 for no limit. (Default: 0)
+SEARCH_TIMEOUT = 0
+
 # Time zone (default: UTC)
 TIME_ZONE = 'UTC'
 
+# The number of days for which the log of user actions (recent activity) is retained. Older actions are deleted
+# automatically. Set to 0 to retain all actions indefinitely. (Default: 90)
+USER_ACTION_RETENTION = 90
+
 # Date/time formatting. See the following link for supported formats:
 # https://docs.djangoproject.com/en/dev/ref/templates/builtins/#date
 DATE_FORMAT = 'N j, Y'
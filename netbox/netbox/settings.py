@@ -27,14 +27,18 @@ for setting in ['ALLOWED_HOSTS', 'DATABASE', 'SECRET_KEY']:
 
 # Import optional configuration parameters
 ADMINS = getattr(configuration, 'ADMINS', [])
+BACKGROUND_JOBS = getattr(configuration, 'BACKGROUND_JOBS', False)
 BANNER_BOTTOM = getattr(configuration, 'BANNER_BOTTOM', False)
 BANNER_TOP = getattr(configuration, 'BANNER_TOP', False)
 BASE_PATH = getattr(configuration, 'BASE_PATH', '')
 if BASE_PATH:
     BASE_PATH = BASE_PATH.strip('/') + '/'  # Enforce trailing slash only
+CACHE_TIMEOUT = getattr(configuration, 'CACHE_TIMEOUT', 900)
 CORS_ORIGIN_ALLOW_ALL = getattr(configuration, 'CORS_ORIGIN_ALLOW_ALL', False)
 CORS_ORIGIN_REGEX_WHITELIST = getattr(configuration, 'CORS_ORIGIN_REGEX_WHITELIST', [])
 CORS_ORIGIN_WHITELIST = getattr(configuration, 'CORS_ORIGIN_WHITELIST', [])
+COUNT_ESTIMATE_THRESHOLD = getattr(configuration, 'COUNT_ESTIMATE_THRESHOLD', 10000)
+CSV_IMPORT_CHUNK_SIZE = getattr(configuration, 'CSV_IMPORT_CHUNK_SIZE', 1000)
 DATE_FORMAT = getattr(configuration, 'DATE_FORMAT', 'N j, Y')
 DATETIME_FORMAT = getattr(configuration, 'DATETIME_FORMAT', 'N j, Y g:i a')
 DEBUG = getattr(configuration, 'DEBUG', False)
@@ -44,6 +48,8 @@ LOGGING = getattr(configuration, 'LOGGING', {})
 LOGIN_REQUIRED = getattr(configuration, 'LOGIN_REQUIRED', False)
 MAINTENANCE_MODE = getattr(configuration, 'MAINTENANCE_MODE', False)
 MAX_PAGE_SIZE = getattr(configuration, 'MAX_PAGE_SIZE', 1000)
+METRICS_ENABLED = getattr(configuration, 'METRICS_ENABLED', False)
+METRICS_SAMPLE_RATE = getattr(configuration, 'METRICS_SAMPLE_RATE', 1.0)
 PAGINATE_COUNT = getattr(configuration, 'PAGINATE_COUNT', 50)
 PREFER_IPV4 = getattr(configuration, 'PREFER_IPV4', False)
 NAPALM_USERNAME = getattr(configuration, 'NAPALM_USERNAME', '')
@@ -52,11 +58,14 @@ NAPALM_TIMEOUT = getattr(configuration, 'NAPALM_TIMEOUT', 30)
 NAPALM_ARGS = getattr(configuration, 'NAPALM_ARGS', {})
 NETBOX_USERNAME = getattr(configuration, 'NETBOX_USERNAME', '')  # Deprecated
 NETBOX_PASSWORD = getattr(configuration, 'NETBOX_PASSWORD', '')  # Deprecated
+SEARCH_THREADS = getattr(configuration, 'SEARCH_THREADS', 0)
+SEARCH_TIMEOUT = getattr(configuration, 'SEARCH_TIMEOUT', 0)
 SHORT_DATE_FORMAT = getattr(configuration, 'SHORT_DATE_FORMAT', 'Y-m-d')
 SHORT_DATETIME_FORMAT = getattr(configuration, 'SHORT_DATETIME_FORMAT', 'Y-m-d H:i')
 SHORT_TIME_FORMAT = getattr(configuration, 'SHORT_TIME_FORMAT', 'H:i:s')
 TIME_FORMAT = getattr(configuration, 'TIME_FORMAT', 'g:i a')
 TIME_ZONE = getattr(configuration, 'TIME_ZONE', 'UTC')
+USER_ACTION_RETENTION = getattr(configuration, 'USER_ACTION_RETENTION', 90)
 
 CSRF_TRUSTED_ORIGINS = ALLOWED_HOSTS
 
@@ -150,6 +159,7 @@ INSTALLED_APPS = (
 # Middleware
 MIDDLEWARE = (
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'utilities.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -161,6 +171,7 @@ MIDDLEWARE = (
     'django.middleware.security.SecurityMiddleware',
     'utilities.middleware.LoginRequiredMiddleware',
     'utilities.middleware.APIVersionMiddleware',
+    'utilities.middleware.UserActionMiddleware',
 )
 
 ROOT_URLCONF = 'netbox.urls'
@@ -204,6 +215,9 @@ STATICFILES_DIRS = (
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/{}media/'.format(BASE_PATH)
 
+# Files uploaded for processing by background jobs are kept outside MEDIA_ROOT, which is served without authentication
+JOB_FILES_ROOT = getattr(configuration, 'JOB_FILES_ROOT', os.path.join(BASE_DIR, 'job-files'))
+
 # Disable default limit of 1000 fields per request. Needed for bulk deletion of objects. (Added in Django 1.10.)
 DATA_UPLOAD_MAX_NUMBER_FIELDS = None
 
@@ -7,7 +7,7 @@ from django.conf.urls import include, url
 from django.contrib import admin
 from django.views.static import serve
 
-from netbox.views import APIRootView, handle_500, HomeView, SearchView, trigger_500
+from netbox.views import APIRootView, handle_500, HomeView, MetricsView, SearchView, trigger_500
 from users.views import LoginView, LogoutView
 
 
@@ -43,6 +43,9 @@ _patterns = [
     url(r'^api/tenancy/', include('tenancy.api.urls')),
     url(r'^api/docs/', swagger_view, name='api_docs'),
 
+    # Metrics
+    url(r'^metrics/$', MetricsView.as_view(), name='metrics'),
+
     # Serving static media in Django to pipe it through LoginRequiredMiddleware
     url(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
 
@@ -1,64 +1,83 @@
 from __future__ import unicode_literals
 from collections import OrderedDict
+from functools import partial
+from multiprocessing.pool import ThreadPool
 import sys
+import threading
 
+from netaddr import AddrFormatError, IPNetwork
+from psycopg2.extensions import QueryCanceledError
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
 from django.views.generic import View
 
-from circuits.filters import CircuitFilter, ProviderFilter
 from circuits.models import Circuit, Provider
 from circuits.tables import CircuitTable, ProviderTable
-from dcim.filters import DeviceFilter, DeviceTypeFilter, RackFilter, SiteFilter
-from dcim.models import ConsolePort, Device, DeviceType, InterfaceConnection, PowerPort, Rack, Site
+from dcim.models import Device, DeviceType, Rack, Site
 from dcim.tables import DeviceTable, DeviceTypeTable, RackTable, SiteTable
-from extras.models import TopologyMap, UserAction
-from ipam.filters import AggregateFilter, IPAddressFilter, PrefixFilter, VLANFilter, VRFFilter
+from extras.counters import get_counters
+from extras.models import SearchEntry, TopologyMap, UserAction
 from ipam.models import Aggregate, IPAddress, Prefix, VLAN, VRF
 from ipam.tables import AggregateTable, IPAddressTable, PrefixTable, VLANTable, VRFTable
-from secrets.filters import SecretFilter
 from secrets.models import Secret
 from secrets.tables import SecretTable
-from tenancy.filters import TenantFilter
 from tenancy.models import Tenant
 from tenancy.tables import TenantTable
+from utilities.api import TokenAuthentication
+from utilities.metrics import registry as metrics_registry
 from .forms import SearchForm
 
 
+def search_prefixes(value):
+    # Match prefixes containing the given IP address or prefix
+    try:
+        return Q(prefix__net_contains_or_equals=str(IPNetwork(value.strip()).cidr))
+    except (AddrFormatError, ValueError):
+        return None
+
+
+def search_ip_addresses(value):
+    # Match IP addresses having the given host address, regardless of mask length
+    try:
+        return Q(address__net_host=str(IPNetwork(value.strip())))
+    except (AddrFormatError, ValueError):
+        return None
+
+
 SEARCH_MAX_RESULTS = 15
 SEARCH_TYPES = OrderedDict((
     # Circuits
     ('provider', {
         'queryset': Provider.objects.all(),
-        'filter': ProviderFilter,
         'table': ProviderTable,
         'url': 'circuits:provider_list',
     }),
     ('circuit', {
         'queryset': Circuit.objects.select_related('type', 'provider', 'tenant').prefetch_related('terminations__site'),
-        'filter': CircuitFilter,
         'table': CircuitTable,
         'url': 'circuits:circuit_list',
     }),
     # DCIM
     ('site', {
         'queryset': Site.objects.select_related('region', 'tenant'),
-        'filter': SiteFilter,
         'table': SiteTable,
         'url': 'dcim:site_list',
     }),
     ('rack', {
         'queryset': Rack.objects.select_related('site', 'group', 'tenant', 'role'),
-        'filter': RackFilter,
         'table': RackTable,
         'url': 'dcim:rack_list',
     }),
     ('devicetype', {
         'queryset': DeviceType.objects.select_related('manufacturer'),
-        'filter': DeviceTypeFilter,
         'table': DeviceTypeTable,
         'url': 'dcim:devicetype_list',
     }),
@@ -66,52 +85,47 @@ SEARCH_TYPES = OrderedDict((
         'queryset': Device.objects.select_related(
             'device_type__manufacturer', 'device_role', 'tenant', 'site', 'rack'
         ),
-        'filter': DeviceFilter,
         'table': DeviceTable,
         'url': 'dcim:device_list',
     }),
     # IPAM
     ('vrf', {
         'queryset': VRF.objects.select_related('tenant'),
-        'filter': VRFFilter,
         'table': VRFTable,
         'url': 'ipam:vrf_list',
     }),
     ('aggregate', {
         'queryset': Aggregate.objects.select_related('rir'),
-        'filter': AggregateFilter,
         'table': AggregateTable,
         'url': 'ipam:aggregate_list',
+        'lookup': search_prefixes,
     }),
     ('prefix', {
         'queryset': Prefix.objects.select_related('site', 'vrf__tenant', 'tenant', 'vlan', 'role'),
-        'filter': PrefixFilter,
         'table': PrefixTable,
         'url': 'ipam:prefix_list',
+        'lookup': search_prefixes,
     }),
     ('ipaddress', {
         'queryset': IPAddress.objects.select_related('vrf__tenant', 'tenant', 'interface__device'),
-        'filter': IPAddressFilter,
         'table': IPAddressTable,
         'url': 'ipam:ipaddress_list',
+        'lookup': search_ip_addresses,
     }),
     ('vlan', {
         'queryset': VLAN.objects.select_related('site', 'group', 'tenant', 'role'),
-        'filter': VLANFilter,
         'table': VLANTable,
         'url': 'ipam:vlan_list',
     }),
     # Secrets
     ('secret', {
         'queryset': Secret.objects.select_related('role', 'device'),
-        'filter': SecretFilter,
         'table': SecretTable,
         'url': 'secrets:secret_list',
     }),
     # Tenancy
     ('tenant', {
         'queryset': Tenant.objects.select_related('group'),
-        'filter': TenantFilter,
         'table': TenantTable,
         'url': 'tenancy:tenant_list',
     }),
@@ -123,34 +137,8 @@ class HomeView(View):
 
     def get(self, request):
 
-        stats = {
-
-            # Organization
-            'site_count': Site.objects.count(),
-            'tenant_count': Tenant.objects.count(),
-
-            # DCIM
-            'rack_count': Rack.objects.count(),
-            'device_count': Device.objects.count(),
-            'interface_connections_count': InterfaceConnection.objects.count(),
-            'console_connections_count': ConsolePort.objects.filter(cs_port__isnull=False).count(),
-            'power_connections_count': PowerPort.objects.filter(power_outlet__isnull=False).count(),
-
-            # IPAM
-            'vrf_count': VRF.objects.count(),
-            'aggregate_count': Aggregate.objects.count(),
-            'prefix_count': Prefix.objects.count(),
-            'ipaddress_count': IPAddress.objects.count(),
-            'vlan_count': VLAN.objects.count(),
-
-            # Circuits
-            'provider_count': Provider.objects.count(),
-            'circuit_count': Circuit.objects.count(),
-
-            # Secrets
-            'secret_count': Secret.objects.count(),
-
-        }
+        # Object counts are maintained by signals (see extras.counters)
+        stats = get_counters()
 
         return render(request, self.template_name, {
             'search_form': SearchForm(),
@@ -160,6 +148,87 @@ class HomeView(View):
         })
 
 
+def get_search_results(value, obj_types):
+    """
+    Retrieve the highest-ranked matches for each of the given object types from the search index, using a single query.
+    Returns a list of results, one for each object type having matches. If the query exceeds SEARCH_TIMEOUT, each object
+    type is instead reported as having timed out.
+    """
+    lookups = {
+        SEARCH_TYPES[obj_type]['queryset'].model: SEARCH_TYPES[obj_type]['lookup'](value)
+        for obj_type in obj_types if 'lookup' in SEARCH_TYPES[obj_type]
+    }
+    results = []
+
+    try:
+        with transaction.atomic():
+            if settings.SEARCH_TIMEOUT:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL statement_timeout = %s', [settings.SEARCH_TIMEOUT])
+
+            matches = SearchEntry.objects.search(
+                value, [SEARCH_TYPES[obj_type]['queryset'].model for obj_type in obj_types], SEARCH_MAX_RESULTS, lookups
+            )
+
+            for obj_type in obj_types:
+
+                queryset = SEARCH_TYPES[obj_type]['queryset']
+                table = SEARCH_TYPES[obj_type]['table']
+                url = SEARCH_TYPES[obj_type]['url']
+
+                if queryset.model not in matches:
+                    continue
+                count, pk_list = matches[queryset.model]
+
+                # Construct the results table for this object type, listing objects in order of rank
+                objects = queryset.in_bulk(pk_list)
+                table = table([objects[pk] for pk in pk_list if pk in objects], orderable=False)
+
+                results.append({
+                    'name': queryset.model._meta.verbose_name_plural,
+                    'table': table,
+                    'count': count,
+                    'url': '{}?q={}'.format(reverse(url), value)
+                })
+
+    except OperationalError as e:
+        if not isinstance(getattr(e, '__cause__', None), QueryCanceledError):
+            raise
+        results = [{
+            'name': SEARCH_TYPES[obj_type]['queryset'].model._meta.verbose_name_plural,
+            'timed_out': True,
+        } for obj_type in obj_types]
+
+    return results
+
+
+def search_in_thread(value, obj_types):
+    """
+    Call get_search_results() from a thread in the search pool. Each thread maintains its own database connection,
+    which (as with a request) is discarded if it has become unusable or has exceeded its maximum age.
+    """
+    close_old_connections()
+    try:
+        return get_search_results(value, obj_types)
+    finally:
+        close_old_connections()
+
+
+_search_pool = None
+_search_pool_lock = threading.Lock()
+
+
+def get_search_pool():
+    """
+    Return the pool of SEARCH_THREADS threads used to search for each object type concurrently, creating it if needed.
+    """
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            _search_pool = ThreadPool(settings.SEARCH_THREADS)
+    return _search_pool
+
+
 class SearchView(View):
 
     def get(self, request):
@@ -182,24 +251,13 @@ class SearchView(View):
             else:
                 obj_types = SEARCH_TYPES.keys()
 
-            for obj_type in obj_types:
-
-                queryset = SEARCH_TYPES[obj_type]['queryset']
-                filter_cls = SEARCH_TYPES[obj_type]['filter']
-                table = SEARCH_TYPES[obj_type]['table']
-                url = SEARCH_TYPES[obj_type]['url']
-
-                # Construct the results table for this object type
-                filtered_queryset = filter_cls({'q': form.cleaned_data['q']}, queryset=queryset).qs
-                table = table(filtered_queryset, orderable=False)
-                table.paginate(per_page=SEARCH_MAX_RESULTS)
-
-                if table.page:
-                    results.append({
-                        'name': queryset.model._meta.verbose_name_plural,
-                        'table': table,
-                        'url': '{}?q={}'.format(reverse(url), form.cleaned_data['q'])
-                    })
+            value = form.cleaned_data['q']
+            if settings.SEARCH_THREADS and len(obj_types) > 1:
+                # Search for each object type concurrently
+                type_results = get_search_pool().map(partial(search_in_thread, value), [[t] for t in obj_types])
+                results = [result for r in type_results for result in r]
+            else:
+                results = get_search_results(value, obj_types)
 
         return render(request, 'search.html', {
             'form': form,
@@ -226,6 +284,26 @@ class APIRootView(APIView):
         })
 
 
+class MetricsView(View):
+    """
+    Expose the request metrics recorded by this process in the Prometheus text format (see METRICS_ENABLED). If
+    LOGIN_REQUIRED is True, the client must be logged in or present a valid API token (as a scraper would).
+    """
+
+    def get(self, request):
+
+        if not settings.METRICS_ENABLED:
+            raise Http404
+        if settings.LOGIN_REQUIRED and not request.user.is_authenticated():
+            try:
+                authenticated = TokenAuthentication().authenticate(request) is not None
+            except AuthenticationFailed:
+                authenticated = False
+            if not authenticated:
+                return HttpResponseForbidden()
+        return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 def handle_500(request):
     """
     Custom server error handler
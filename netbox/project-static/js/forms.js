@@ -124,4 +124,31 @@ $(document).ready(function() {
         child_field.change();
 
     });
+
+    // API multiple select widget: load the options which were not rendered with the page
+    $('select.api-select-multiple').each(function() {
+        var field = $(this);
+        var display_field = field.attr('display-field') || 'name';
+        var value_field = field.attr('value-field') || 'id';
+
+        function load_choices(url) {
+            $.ajax({
+                url: url,
+                dataType: 'json',
+                success: function(response, status) {
+                    $.each(response.results, function(index, choice) {
+                        var value = String(choice[value_field]);
+                        if (!field.find('option').filter(function() { return this.value == value; }).length) {
+                            field.append($("<option></option>").attr("value", value).text(choice[display_field]));
+                        }
+                    });
+                    if (response.next) {
+                        load_choices(response.next);
+                    }
+                }
+            });
+        }
+
+        load_choices(field.attr('api-url'));
+    });
 });
@@ -4,7 +4,6 @@ from Crypto.Cipher import PKCS1_OAEP
 from Crypto.PublicKey import RSA
 
 from django import forms
-from django.db.models import Count
 
 from dcim.models import Device
 from utilities.forms import BootstrapMixin, BulkEditForm, FilterChoiceField, FlexibleModelChoiceField, SlugField
@@ -111,7 +110,8 @@ class SecretBulkEditForm(BootstrapMixin, BulkEditForm):
 class SecretFilterForm(BootstrapMixin, forms.Form):
     q = forms.CharField(required=False, label='Search')
     role = FilterChoiceField(
-        queryset=SecretRole.objects.annotate(filter_count=Count('secrets')),
+        queryset=SecretRole.objects.all(),
+        filter_count='secrets',
         to_field_name='slug'
     )
 
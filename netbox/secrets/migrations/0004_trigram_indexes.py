@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Trigram indexes supporting case-insensitive substring searches (see utilities.lookups.ILikeContains)
+TRIGRAM_INDEXES_SQL = [
+    'CREATE INDEX secrets_secret_name_trgm ON secrets_secret USING gin (name gin_trgm_ops)',
+]
+DROP_TRIGRAM_INDEXES_SQL = [
+    'DROP INDEX secrets_secret_name_trgm',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('secrets', '0003_unicode_literals'),
+        # Creates the pg_trgm extension
+        ('extras', '0010_searchentry'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=TRIGRAM_INDEXES_SQL, reverse_sql=DROP_TRIGRAM_INDEXES_SQL),
+    ]
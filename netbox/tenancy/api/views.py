@@ -1,8 +1,13 @@
 from __future__ import unicode_literals
 
+from rest_framework.decorators import detail_route
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from django.shortcuts import get_object_or_404
+
 from extras.api.views import CustomFieldModelViewSet
+from extras.rollups import get_stats
 from tenancy import filters
 from tenancy.models import Tenant, TenantGroup
 from utilities.api import WritableSerializerMixin
@@ -28,3 +33,11 @@ class TenantViewSet(WritableSerializerMixin, CustomFieldModelViewSet):
     serializer_class = serializers.TenantSerializer
     write_serializer_class = serializers.WritableTenantSerializer
     filter_class = filters.TenantFilter
+
+    @detail_route()
+    def stats(self, request, pk=None):
+        """
+        Counts of the objects assigned to a tenant.
+        """
+        tenant = get_object_or_404(Tenant, pk=pk)
+        return Response(get_stats(tenant))
@@ -1,7 +1,6 @@
 from __future__ import unicode_literals
 
 from django import forms
-from django.db.models import Count
 
 from extras.forms import CustomFieldForm, CustomFieldBulkEditForm, CustomFieldFilterForm
 from utilities.forms import (
@@ -68,7 +67,8 @@ class TenantFilterForm(BootstrapMixin, CustomFieldFilterForm):
     model = Tenant
     q = forms.CharField(required=False, label='Search')
     group = FilterChoiceField(
-        queryset=TenantGroup.objects.annotate(filter_count=Count('tenants')),
+        queryset=TenantGroup.objects.all(),
+        filter_count='tenants',
         to_field_name='slug',
         null_option=(0, 'None')
     )
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2017-08-21 14:02
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenancy', '0003_unicode_literals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='custom_field_data',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='tenant',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['custom_field_data'], name='tenancy_tenant_cf_data_gin'),
+        ),
+    ]
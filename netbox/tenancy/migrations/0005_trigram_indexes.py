@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Trigram indexes supporting case-insensitive substring searches (see utilities.lookups.ILikeContains)
+TRIGRAM_INDEXES_SQL = [
+    'CREATE INDEX tenancy_tenant_name_trgm ON tenancy_tenant USING gin (name gin_trgm_ops)',
+    'CREATE INDEX tenancy_tenant_description_trgm ON tenancy_tenant USING gin (description gin_trgm_ops)',
+    'CREATE INDEX tenancy_tenant_comments_trgm ON tenancy_tenant USING gin (comments gin_trgm_ops)',
+]
+DROP_TRIGRAM_INDEXES_SQL = [
+    'DROP INDEX tenancy_tenant_name_trgm',
+    'DROP INDEX tenancy_tenant_description_trgm',
+    'DROP INDEX tenancy_tenant_comments_trgm',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenancy', '0004_custom_field_data'),
+        # Creates the pg_trgm extension
+        ('extras', '0010_searchentry'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=TRIGRAM_INDEXES_SQL, reverse_sql=DROP_TRIGRAM_INDEXES_SQL),
+    ]
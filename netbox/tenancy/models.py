@@ -1,6 +1,8 @@
 from __future__ import unicode_literals
 
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.urls import reverse
 from django.utils.encoding import python_2_unicode_compatible
@@ -40,11 +42,14 @@ class Tenant(CreatedUpdatedModel, CustomFieldModel):
     description = models.CharField(max_length=100, blank=True, help_text="Long-form name (optional)")
     comments = models.TextField(blank=True)
     custom_field_values = GenericRelation(CustomFieldValue, content_type_field='obj_type', object_id_field='obj_id')
+    custom_field_data = JSONField(blank=True, default=dict, editable=False)
 
     csv_headers = ['name', 'slug', 'group', 'description']
+    csv_related_fields = ['group']
 
     class Meta:
         ordering = ['group', 'name']
+        indexes = [GinIndex(fields=['custom_field_data'], name='tenancy_tenant_cf_data_gin')]
 
     def __str__(self):
         return self.name
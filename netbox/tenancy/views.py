@@ -1,14 +1,12 @@
 from __future__ import unicode_literals
 
 from django.contrib.auth.mixins import PermissionRequiredMixin
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
 from django.views.generic import View
 
-from circuits.models import Circuit
-from dcim.models import Site, Rack, Device
-from ipam.models import IPAddress, Prefix, VLAN, VRF
+from extras.rollups import get_stats
 from utilities.views import (
     BulkDeleteView, BulkEditView, BulkImportView, ObjectDeleteView, ObjectEditView, ObjectListView,
 )
@@ -64,22 +62,7 @@ class TenantView(View):
     def get(self, request, slug):
 
         tenant = get_object_or_404(Tenant, slug=slug)
-        stats = {
-            'site_count': Site.objects.filter(tenant=tenant).count(),
-            'rack_count': Rack.objects.filter(tenant=tenant).count(),
-            'device_count': Device.objects.filter(tenant=tenant).count(),
-            'vrf_count': VRF.objects.filter(tenant=tenant).count(),
-            'prefix_count': Prefix.objects.filter(
-                Q(tenant=tenant) |
-                Q(tenant__isnull=True, vrf__tenant=tenant)
-            ).count(),
-            'ipaddress_count': IPAddress.objects.filter(
-                Q(tenant=tenant) |
-                Q(tenant__isnull=True, vrf__tenant=tenant)
-            ).count(),
-            'vlan_count': VLAN.objects.filter(tenant=tenant).count(),
-            'circuit_count': Circuit.objects.filter(tenant=tenant).count(),
-        }
+        stats = get_stats(tenant)
 
         return render(request, 'tenancy/tenant.html', {
             'tenant': tenant,
@@ -1,7 +1,9 @@
 from __future__ import unicode_literals
+from timeit import default_timer
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import QuerySet
 
 from rest_framework import authentication, exceptions
 from rest_framework.compat import is_authenticated
@@ -9,8 +11,11 @@ from rest_framework.exceptions import APIException
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import BasePermission, DjangoModelPermissions, SAFE_METHODS
 from rest_framework.serializers import Field, ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from users.models import Token
+from .metrics import record_serializer_duration
+from .paginator import KeysetPaginator, estimate_count
 
 
 WRITE_OPERATIONS = ['create', 'update', 'partial_update', 'delete']
@@ -151,29 +156,72 @@ class OptionalLimitOffsetPagination(LimitOffsetPagination):
     Override the stock paginator to allow setting limit=0 to disable pagination for a request. This returns all objects
     matching a query, but retains the same format as a paginated request. The limit can only be disabled if
     MAX_PAGE_SIZE has been set to 0 or None.
+
+    Passing the `cursor` query parameter (initially empty) selects keyset pagination instead: objects are ordered by
+    primary key, and each page is retrieved by filtering on the primary key of the last object of the previous page, so
+    that the cost of retrieving a page does not grow with its depth. The `next` and `previous` links carry the cursor
+    for the adjacent pages. No count is returned in this mode.
     """
+    cursor_query_param = 'cursor'
 
     def paginate_queryset(self, queryset, request, view=None):
 
-        try:
-            self.count = queryset.count()
-        except (AttributeError, TypeError):
-            self.count = len(queryset)
+        object_list = self.get_page_objects(queryset, request)
+
+        # The view serializes the page before calling get_paginated_response()
+        self.serialization_start = default_timer()
+        return object_list
+
+    def get_paginated_response(self, data):
+
+        record_serializer_duration(self.request._request, default_timer() - self.serialization_start)
+        return super(OptionalLimitOffsetPagination, self).get_paginated_response(data)
+
+    def get_page_objects(self, queryset, request):
+        """
+        Return the list of objects on the requested page.
+        """
+        self.page = None
+        self.count_is_estimate = False
+        self.has_next = False
         self.limit = self.get_limit(request)
-        self.offset = self.get_offset(request)
         self.request = request
 
+        if self.limit and isinstance(queryset, QuerySet) and self.use_cursor(request):
+            self.page = KeysetPaginator(queryset, self.limit).page(request.query_params.get(self.cursor_query_param))
+            self.count = None
+            return self.page.object_list
+
+        # The count of very large querysets is estimated
+        if isinstance(queryset, QuerySet):
+            self.count, self.count_is_estimate = estimate_count(queryset)
+        else:
+            self.count = len(queryset)
+        self.offset = self.get_offset(request)
+
         if self.limit and self.count > self.limit and self.template is not None:
             self.display_page_controls = True
 
-        if self.count == 0 or self.offset > self.count:
+        if self.count == 0 or (self.offset > self.count and not self.count_is_estimate):
             return list()
 
-        if self.limit:
-            return list(queryset[self.offset:self.offset + self.limit])
-        else:
+        if not self.limit:
             return list(queryset[self.offset:])
 
+        # An estimated count may be too low, so retrieve an extra object to determine whether another page follows
+        if self.count_is_estimate:
+            object_list = list(queryset[self.offset:self.offset + self.limit + 1])
+            self.has_next = len(object_list) > self.limit
+            return object_list[:self.limit]
+
+        return list(queryset[self.offset:self.offset + self.limit])
+
+    def use_cursor(self, request):
+        """
+        Return True if the request is to be paginated by cursor rather than by offset.
+        """
+        return self.cursor_query_param in request.query_params
+
     def get_limit(self, request):
 
         if self.limit_query_param:
@@ -192,3 +240,43 @@ class OptionalLimitOffsetPagination(LimitOffsetPagination):
                 pass
 
         return self.default_limit
+
+    def get_next_link(self):
+        if self.page is None and self.count_is_estimate:
+            if not self.has_next:
+                return None
+            url = replace_query_param(self.request.build_absolute_uri(), self.limit_query_param, self.limit)
+            return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+        if self.page is None:
+            return super(OptionalLimitOffsetPagination, self).get_next_link()
+        if not self.page.has_next():
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.page.next_cursor)
+
+    def get_previous_link(self):
+        if self.page is None:
+            return super(OptionalLimitOffsetPagination, self).get_previous_link()
+        if not self.page.has_previous():
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.page.previous_cursor)
+
+
+class KeysetPagination(OptionalLimitOffsetPagination):
+    """
+    Paginate by cursor (see OptionalLimitOffsetPagination) by default, for very large tables. The count of the
+    queryset is estimated. Requests which specify an offset, or which disable pagination by setting limit=0, are
+    paginated by offset.
+    """
+
+    def get_page_objects(self, queryset, request):
+
+        object_list = super(KeysetPagination, self).get_page_objects(queryset, request)
+        if self.page is not None:
+            self.count = self.page.paginator.count
+
+        return object_list
+
+    def use_cursor(self, request):
+        return self.offset_query_param not in request.query_params
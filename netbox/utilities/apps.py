@@ -0,0 +1,16 @@
+from __future__ import unicode_literals
+
+from django.apps import AppConfig
+from django.db.models import CharField, TextField
+
+from .lookups import ILikeContains
+
+
+class UtilitiesConfig(AppConfig):
+    name = "utilities"
+    verbose_name = "Utilities"
+
+    def ready(self):
+        # Allow substring searches on text fields to use trigram indexes
+        CharField.register_lookup(ILikeContains)
+        TextField.register_lookup(ILikeContains)
@@ -0,0 +1,187 @@
+from __future__ import unicode_literals
+import six
+
+from django import forms
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models.signals import pre_save
+
+from extras.signals import bulk_created
+from .forms import CSVLookupCache, CSVLookupMixin
+from .signals import can_skip_post_save
+
+
+class CSVImportResult(object):
+    """
+    The outcome of a CSV import.
+
+    created: The number of objects created (or updated)
+    objects: The first objects created, up to the number requested (for display)
+    errors: A list of error messages, each identifying the row to which it pertains
+    last_row: The number of the last row to have been imported. Rows up to and including this one have been committed
+              to the database; an interrupted import can be resumed by skipping this many rows.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.objects = []
+        self.errors = []
+        self.last_row = 0
+
+
+class CSVImporter(object):
+    """
+    Import objects from CSV records using a ModelForm. Records are consumed lazily and imported in chunks, each of which
+    is validated and saved in its own transaction. Where possible, the objects in a chunk are created using a single
+    bulk_create() query. This is the case when the form and model do not override save(), the model has no pre_save
+    receivers and no post_save receivers other than those connected as safe for bulk creation (see
+    utilities.signals.connect_post_save(); e.g. those maintaining the search index and object counters, which are
+    updated for each chunk instead), and the form has no many-to-many fields. Otherwise, objects are saved one at a
+    time.
+
+    model_form: The ModelForm used to validate each record
+    chunk_size: The number of records to import per transaction (default: CSV_IMPORT_CHUNK_SIZE)
+    save_obj: An optional function which saves a valid form and returns the saved object (see
+              BulkImportView._save_obj()); its use precludes bulk creation
+    skip_invalid: If True, invalid records are reported and skipped. Otherwise, the import stops at the first chunk
+                  containing an invalid record, and no records from that chunk are imported.
+    keep_objects: The number of created objects to retain in the result (for display)
+    """
+
+    def __init__(self, model_form, chunk_size=None, save_obj=None, skip_invalid=False, keep_objects=0):
+        self.model_form = model_form
+        self.chunk_size = chunk_size or settings.CSV_IMPORT_CHUNK_SIZE
+        self.save_obj = save_obj
+        self.skip_invalid = skip_invalid
+        self.keep_objects = keep_objects
+
+    def run(self, records, skip=0, progress=None):
+        """
+        Import an iterable of (row number, record) tuples (see utilities.forms.csv_records()), skipping the first
+        `skip` rows. `progress` is called with the CSVImportResult after each chunk has been committed. Returns the
+        CSVImportResult.
+        """
+        result = CSVImportResult()
+        result.last_row = skip
+        chunk = []
+
+        try:
+            for row, record in records:
+                if row <= skip:
+                    continue
+                chunk.append((row, record))
+                if len(chunk) >= self.chunk_size:
+                    if not self._import_chunk(chunk, result):
+                        return result
+                    chunk = []
+                    if progress is not None:
+                        progress(result)
+        except forms.ValidationError as e:
+            # Malformed CSV data
+            result.errors.extend(e.messages)
+            chunk = []
+
+        if chunk and self._import_chunk(chunk, result) and progress is not None:
+            progress(result)
+
+        return result
+
+    def _import_chunk(self, chunk, result):
+        """
+        Validate and save a chunk of records. Returns False if the import should stop.
+        """
+        forms_list, errors = self._validate(chunk)
+
+        objects = None
+        if not errors or self.skip_invalid:
+            if self._can_bulk_create(forms_list):
+                try:
+                    with transaction.atomic():
+                        objects = self._bulk_create(forms_list)
+                except IntegrityError:
+                    # A conflict between records within the chunk; fall back to validating each record in turn, with
+                    # those preceding it saved
+                    objects = None
+
+            if objects is None:
+                try:
+                    with transaction.atomic():
+                        objects, errors = self._save_serially(chunk)
+                        if errors and not self.skip_invalid:
+                            raise _ChunkInvalid
+                except _ChunkInvalid:
+                    objects = None
+
+        result.errors.extend(errors)
+        if objects is None:
+            return False
+
+        result.created += len(objects)
+        result.objects.extend(objects[:max(self.keep_objects - len(result.objects), 0)])
+        result.last_row = chunk[-1][0]
+        return True
+
+    def _get_form_kwargs(self, chunk):
+        # Retrieve the objects referenced by all records up front, if the model form supports it
+        if issubclass(self.model_form, CSVLookupMixin):
+            lookup_cache = CSVLookupCache()
+            self.model_form.load_lookup_cache([record for row, record in chunk], lookup_cache)
+            return {'lookup_cache': lookup_cache}
+        return {}
+
+    def _validate(self, chunk):
+        form_kwargs = self._get_form_kwargs(chunk)
+        forms_list = []
+        errors = []
+        for row, record in chunk:
+            obj_form = self.model_form(record, **form_kwargs)
+            if obj_form.is_valid():
+                forms_list.append(obj_form)
+            else:
+                errors.extend(_form_errors(row, obj_form))
+        return forms_list, errors
+
+    def _can_bulk_create(self, forms_list):
+        if self.save_obj is not None or not forms_list:
+            return False
+        model = self.model_form._meta.model
+        if six.get_unbound_function(self.model_form.save) is not six.get_unbound_function(forms.ModelForm.save):
+            return False
+        if six.get_unbound_function(model.save) is not six.get_unbound_function(models.Model.save):
+            return False
+        if pre_save.has_listeners(model):
+            return False
+        if not can_skip_post_save(model):
+            return False
+        if any(f.name in forms_list[0].fields for f in model._meta.many_to_many):
+            return False
+        # Only new objects can be created in bulk
+        return all(obj_form.instance.pk is None for obj_form in forms_list)
+
+    def _bulk_create(self, forms_list):
+        model = self.model_form._meta.model
+        objects = model.objects.bulk_create([obj_form.save(commit=False) for obj_form in forms_list])
+        bulk_created(model, objects)
+        return objects
+
+    def _save_serially(self, chunk):
+        # Validate each record only once those preceding it have been saved, so that conflicts among records are caught
+        form_kwargs = self._get_form_kwargs(chunk)
+        save_obj = self.save_obj or (lambda obj_form: obj_form.save())
+        objects = []
+        errors = []
+        for row, record in chunk:
+            obj_form = self.model_form(record, **form_kwargs)
+            if obj_form.is_valid():
+                objects.append(save_obj(obj_form))
+            else:
+                errors.extend(_form_errors(row, obj_form))
+        return objects, errors
+
+
+class _ChunkInvalid(Exception):
+    pass
+
+
+def _form_errors(row, obj_form):
+    return ["Row {} {}: {}".format(row, field, err[0]) for field, err in obj_form.errors.items()]
@@ -1,13 +1,15 @@
 from __future__ import unicode_literals
 
 from django.contrib import messages
+from django.db.models import QuerySet
 from django.utils.html import escape
 from django.utils.safestring import mark_safe
 
 
 def handle_protectederror(obj, request, e):
     """
-    Generate a user-friendly error message in response to a ProtectedError exception.
+    Generate a user-friendly error message in response to a ProtectedError exception. `obj` may be a single object, or
+    a list or QuerySet of objects.
     """
     try:
         dep_class = e.protected_objects[0]._meta.verbose_name_plural
@@ -15,7 +17,12 @@ def handle_protectederror(obj, request, e):
         raise e
 
     # Grammar for single versus multiple triggering objects
-    if type(obj) in (list, tuple):
+    if isinstance(obj, QuerySet):
+        err_message = "Unable to delete the requested {}. The following dependent {} were found: ".format(
+            obj.model._meta.verbose_name_plural,
+            dep_class,
+        )
+    elif type(obj) in (list, tuple):
         err_message = "Unable to delete the requested {}. The following dependent {} were found: ".format(
             obj[0]._meta.verbose_name_plural,
             dep_class,
@@ -1,15 +1,18 @@
 from __future__ import unicode_literals
+import copy
 import csv
-import itertools
 import re
 
 from mptt.forms import TreeNodeMultipleChoiceField
 
 from django import forms
 from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import URLValidator
 from django.urls import reverse_lazy
 
+from extras.choicecounts import get_related_counts, register_related_count
+
 
 COLOR_CHOICES = (
     ('aa1409', 'Dark red'),
@@ -107,6 +110,77 @@ def add_blank_choice(choices):
     return ((None, '---------'),) + tuple(choices)
 
 
+class CSVLookupCache(object):
+    """
+    An import-scoped cache of the objects referenced by a set of CSV records. The keys referenced by all records are
+    collected up front and the objects for each lookup are retrieved with a single query, so that the forms validating
+    individual records need not query the database for each related object. For example:
+
+        cache.load('rack', Rack.objects.all(), ['site_id', 'name'], [(1, 'R101'), (1, 'R102')])
+        cache.get('rack', (1, 'R101'))
+
+    Related fields may be traversed using double underscores (e.g. 'group__name').
+    """
+
+    def __init__(self):
+        self._lookups = {}
+        self._objects = {}
+        self._loaded = {}
+        self._claimed = {}
+
+    def load(self, name, queryset, fields, keys):
+        """
+        Retrieve all objects from the queryset matching any of the given keys (tuples of values for `fields`). Keys
+        containing empty values are ignored.
+        """
+        self._lookups[name] = (queryset, fields)
+        objects = self._objects.setdefault(name, {})
+        loaded = self._loaded.setdefault(name, set())
+
+        keys = set(key for key in keys if None not in key and '' not in key) - loaded
+        if not keys:
+            return
+
+        lookups = {'{}__in'.format(field): set(key[i] for key in keys) for i, field in enumerate(fields)}
+        for obj in queryset.filter(**lookups):
+            key = tuple(self._get_value(obj, field) for field in fields)
+            if key in keys:
+                objects[key] = obj
+        loaded.update(keys)
+
+    def get(self, name, key):
+        """
+        Return the object matching the given key, raising DoesNotExist if none was found. Keys which were not loaded
+        in advance are retrieved individually.
+        """
+        queryset, fields = self._lookups[name]
+        if key not in self._loaded[name]:
+            self.load(name, queryset, fields, [key])
+        try:
+            return self._objects[name][key]
+        except KeyError:
+            raise queryset.model.DoesNotExist()
+
+    def claim(self, name, value):
+        """
+        Record that a value (e.g. the ID of a port being connected) has been claimed by a record. Returns False if it
+        has already been claimed by a previous record.
+        """
+        claimed = self._claimed.setdefault(name, set())
+        if value in claimed:
+            return False
+        claimed.add(value)
+        return True
+
+    @staticmethod
+    def _get_value(obj, field):
+        for attr in field.split('__'):
+            if obj is None:
+                break
+            obj = getattr(obj, attr)
+        return obj
+
+
 #
 # Widgets
 #
@@ -187,6 +261,34 @@ class APISelect(SelectWithDisabled):
             self.attrs['disabled-indicator'] = disabled_indicator
 
 
+class APISelectMultiple(forms.SelectMultiple):
+    """
+    A multiple select widget which renders only its selected options, loading the remainder via an API call once the
+    page has loaded. Intended for use with a FilterChoiceField, whose null option (if any) is always rendered.
+
+    :param api_url: API URL
+    :param display_field: (Optional) Field to display for each option. Defaults to `name`.
+    :param value_field: (Optional) Field to use as the value of each option. Defaults to `id`.
+    """
+
+    def __init__(self, api_url, display_field=None, value_field=None, *args, **kwargs):
+
+        super(APISelectMultiple, self).__init__(*args, **kwargs)
+
+        self.attrs['class'] = 'api-select-multiple'
+        self.attrs['api-url'] = '/{}{}'.format(settings.BASE_PATH, api_url.lstrip('/'))  # Inject BASE_PATH
+        if display_field:
+            self.attrs['display-field'] = display_field
+        if value_field:
+            self.attrs['value-field'] = value_field
+
+    def optgroups(self, name, value, attrs=None):
+        # Restrict the choices to those selected
+        if isinstance(self.choices, FilterChoiceIterator):
+            self.choices = self.choices.selected(value)
+        return super(APISelectMultiple, self).optgroups(name, value, attrs)
+
+
 class Livesearch(forms.TextInput):
     """
     A text widget that carries a few extra bits of data for use in AJAX-powered autocomplete search
@@ -217,8 +319,8 @@ class Livesearch(forms.TextInput):
 
 class CSVDataField(forms.CharField):
     """
-    A CharField (rendered as a Textarea) which accepts CSV-formatted data. It returns a list of dictionaries mapping
-    column headers to values. Each dictionary represents an individual record.
+    A CharField (rendered as a Textarea) which accepts CSV-formatted data. It returns a list of (row number, record)
+    tuples, where each record is a dictionary mapping column headers to values (see csv_records()).
     """
     widget = forms.Textarea
 
@@ -241,34 +343,59 @@ class CSVDataField(forms.CharField):
 
     def to_python(self, value):
 
+        if not value.strip():
+            return []
+
         # Python 2's csv module has problems with Unicode
         if not isinstance(value, str):
             value = value.encode('utf-8')
 
-        records = []
-        reader = csv.reader(value.splitlines())
+        return list(csv_records(value.splitlines(), self.fields, self.required_fields))
 
-        # Consume and valdiate the first line of CSV data as column headers
-        headers = next(reader)
-        for f in self.required_fields:
-            if f not in headers:
-                raise forms.ValidationError('Required column header "{}" not found.'.format(f))
-        for f in headers:
-            if f not in self.fields:
-                raise forms.ValidationError('Unexpected column header "{}" found.'.format(f))
 
+def csv_records(lines, fields, required_fields=[]):
+    """
+    Read CSV data from an iterable of lines (such as an open file). The first line is consumed and validated as column
+    headers immediately; a generator is returned which yields a (row number, record) tuple for each subsequent line,
+    where each record is a dictionary mapping column headers to values. Rows are numbered from 1, excluding the
+    headers. A ValidationError is raised for invalid headers or malformed rows (including undecodable lines).
+    """
+    reader = csv.reader(lines)
+
+    # Consume and valdiate the first line of CSV data as column headers
+    try:
+        headers = next(reader)
+    except StopIteration:
+        raise forms.ValidationError("No CSV data found.")
+    except UnicodeDecodeError:
+        raise forms.ValidationError("Column headers: Invalid UTF-8 data")
+    for f in required_fields:
+        if f not in headers:
+            raise forms.ValidationError('Required column header "{}" not found.'.format(f))
+    for f in headers:
+        if f not in fields:
+            raise forms.ValidationError('Unexpected column header "{}" found.'.format(f))
+
+    def _records():
         # Parse CSV data
-        for i, row in enumerate(reader, start=1):
+        i = 0
+        while True:
+            i += 1
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except UnicodeDecodeError:
+                raise forms.ValidationError("Row {}: Invalid UTF-8 data".format(i))
             if row:
                 if len(row) != len(headers):
                     raise forms.ValidationError(
                         "Row {}: Expected {} columns but found {}".format(i, len(headers), len(row))
                     )
                 row = [col.strip() for col in row]
-                record = dict(zip(headers, row))
-                records.append(record)
+                yield i, dict(zip(headers, row))
 
-        return records
+    return _records()
 
 
 class CSVChoiceField(forms.ChoiceField):
@@ -347,21 +474,54 @@ class CommentField(forms.CharField):
 
 class FlexibleModelChoiceField(forms.ModelChoiceField):
     """
-    Allow a model to be reference by either '{ID}' or the field specified by `to_field_name`.
-    """
+    Allow a model to be reference by either '{ID}' or the field specified by `to_field_name`. If a CSVLookupCache has
+    been assigned to the field (see CSVLookupMixin), objects are retrieved from it rather than from the database.
+    """
+    lookup_cache = None
+    lookup_name = None
+
+    def get_lookup(self, value):
+        """
+        Return the field by which the given value references an object, and the value to be matched.
+        """
+        if not self.to_field_name:
+            return 'pk', self.queryset.model._meta.pk.to_python(value)
+        elif re.match('^\{\d+\}$', value):
+            return 'pk', self.queryset.model._meta.pk.to_python(value.strip('{}'))
+        return self.to_field_name, value
+
+    def get_cached(self, cache, name, value):
+        """
+        Retrieve the object referenced by the given value from a CSVLookupCache populated by load_cache().
+        """
+        key, value = self.get_lookup(value)
+        return cache.get((name, key), (value,))
+
+    def load_cache(self, cache, name, values):
+        """
+        Retrieve all objects referenced by the given values into a CSVLookupCache (one query per lookup field).
+        """
+        keys = {'pk': [], self.to_field_name or 'pk': []}
+        for value in values:
+            if value in self.empty_values:
+                continue
+            try:
+                key, value = self.get_lookup(value)
+            except (ValueError, TypeError, forms.ValidationError):
+                continue
+            keys.setdefault(key, []).append((value,))
+        for key, values in keys.items():
+            cache.load((name, key), self.queryset, [key], values)
+
     def to_python(self, value):
         if value in self.empty_values:
             return None
         try:
-            if not self.to_field_name:
-                key = 'pk'
-            elif re.match('^\{\d+\}$', value):
-                key = 'pk'
-                value = value.strip('{}')
-            else:
-                key = self.to_field_name
+            if self.lookup_cache is not None:
+                return self.get_cached(self.lookup_cache, self.lookup_name, value)
+            key, value = self.get_lookup(value)
             value = self.queryset.get(**{key: value})
-        except (ValueError, TypeError, self.queryset.model.DoesNotExist):
+        except (ValueError, TypeError, forms.ValidationError, self.queryset.model.DoesNotExist):
             raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
         return value
 
@@ -394,28 +554,62 @@ class SlugField(forms.SlugField):
         self.widget.attrs['slug-source'] = slug_source
 
 
+class FilterChoiceIterator(forms.models.ModelChoiceIterator):
+    """
+    Yields the null option of a FilterChoiceField (if any) ahead of the choices drawn from its queryset.
+    """
+
+    def __iter__(self):
+        if self.field.null_option is not None:
+            yield self.field.null_option
+        for choice in super(FilterChoiceIterator, self).__iter__():
+            yield choice
+
+    def __len__(self):
+        return super(FilterChoiceIterator, self).__len__() + (1 if self.field.null_option is not None else 0)
+
+    def selected(self, values):
+        """
+        Return a copy of the iterator whose queryset is restricted to the given values.
+        """
+        iterator = copy.copy(self)
+        key = self.field.to_field_name or 'pk'
+        try:
+            iterator.queryset = self.queryset.filter(**{'{}__in'.format(key): [v for v in values if v]})
+        except (ValueError, TypeError):
+            iterator.queryset = self.queryset.none()
+        return iterator
+
+
 class FilterChoiceFieldMixin(object):
-    iterator = forms.models.ModelChoiceIterator
+    """
+    Renders each choice with the number of objects related to it by `filter_count`, a lookup spanning reverse foreign
+    key relations from the queryset's model (e.g. 'racks' for Sites). Counts are cached; see extras.choicecounts.
+    """
+    iterator = FilterChoiceIterator
 
-    def __init__(self, null_option=None, *args, **kwargs):
+    def __init__(self, null_option=None, filter_count=None, *args, **kwargs):
         self.null_option = null_option
+        self.filter_count = filter_count
         if 'required' not in kwargs:
             kwargs['required'] = False
         if 'widget' not in kwargs:
             kwargs['widget'] = forms.SelectMultiple(attrs={'size': 6})
         super(FilterChoiceFieldMixin, self).__init__(*args, **kwargs)
+        if filter_count is not None:
+            register_related_count(self.queryset.model, filter_count)
 
     def label_from_instance(self, obj):
         label = super(FilterChoiceFieldMixin, self).label_from_instance(obj)
-        if hasattr(obj, 'filter_count'):
-            return '{} ({})'.format(label, obj.filter_count)
+        if self.filter_count is not None:
+            if not hasattr(self, '_filter_counts'):
+                self._filter_counts = get_related_counts(self.queryset.model, self.filter_count)
+            return '{} ({})'.format(label, self._filter_counts.get(obj.pk, 0))
         return label
 
     def _get_choices(self):
         if hasattr(self, '_choices'):
             return self._choices
-        if self.null_option is not None:
-            return itertools.chain([self.null_option], self.iterator(self))
         return self.iterator(self)
 
     choices = property(_get_choices, forms.ChoiceField._set_choices)
@@ -499,6 +693,52 @@ class ChainedFieldsMixin(forms.BaseForm):
                     field.queryset = field.queryset.none()
 
 
+class CSVLookupMixin(forms.BaseForm):
+    """
+    Resolve the objects referenced by a CSV record from a CSVLookupCache shared by all of the records being imported.
+    The cache is populated by load_lookup_cache(), which is passed every record before any are validated; a form
+    instantiated without a cache populates its own from its data. All FlexibleModelChoiceFields on the form are resolved
+    from the cache.
+    """
+    def __init__(self, *args, **kwargs):
+        lookup_cache = kwargs.pop('lookup_cache', None)
+        super(CSVLookupMixin, self).__init__(*args, **kwargs)
+
+        if lookup_cache is None:
+            lookup_cache = CSVLookupCache()
+            self.load_lookup_cache([self.data], lookup_cache)
+        self.lookup_cache = lookup_cache
+
+        for field_name, field in self.fields.items():
+            if isinstance(field, FlexibleModelChoiceField):
+                field.lookup_cache = lookup_cache
+                field.lookup_name = field_name
+
+    @classmethod
+    def load_lookup_cache(cls, records, cache):
+        """
+        Retrieve the objects referenced by the FlexibleModelChoiceFields of all records. Subclasses extend this to
+        retrieve any other objects referenced during validation.
+        """
+        for field_name, field in cls.base_fields.items():
+            if isinstance(field, FlexibleModelChoiceField):
+                field.load_cache(cache, field_name, [record.get(field_name) for record in records])
+
+    @classmethod
+    def get_cached_object(cls, cache, record, field_name):
+        """
+        Return the object referenced by a record's FlexibleModelChoiceField, or None if it cannot be resolved.
+        """
+        value = record.get(field_name)
+        field = cls.base_fields[field_name]
+        if value in field.empty_values:
+            return None
+        try:
+            return field.get_cached(cache, field_name, value)
+        except (ValueError, TypeError, forms.ValidationError, ObjectDoesNotExist):
+            return None
+
+
 class ReturnURLForm(forms.Form):
     """
     Provides a hidden return URL field to control where the user is directed after the form is submitted.
@@ -0,0 +1,83 @@
+from __future__ import unicode_literals
+import codecs
+import six
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import FileSystemStorage
+from django.http import QueryDict
+from django.utils.module_loading import import_string
+
+from extras.jobs import register_job
+from extras.models import UserAction
+from .csvimport import CSVImporter
+from .forms import csv_records
+from .utils import delete_in_chunks
+
+
+# The storage of files uploaded for processing by background jobs (see JOB_FILES_ROOT)
+job_file_storage = FileSystemStorage(location=settings.JOB_FILES_ROOT, file_permissions_mode=0o600)
+
+
+def save_job_file(content):
+    """
+    Save an uploaded file for processing by a background job under a random name (disregarding the name given by the
+    client), and return its name within job_file_storage.
+    """
+    return job_file_storage.save(uuid.uuid4().hex, content)
+
+
+@register_job('utilities.import_csv')
+def import_csv(job, model_form, path, skip=0):
+    """
+    Import objects from a CSV file held in job_file_storage (see BulkImportView), then delete the file. The number of
+    objects created is reported as the job's progress.
+    """
+    model_form = import_string(model_form)
+    model = model_form._meta.model
+    fields = model_form().fields
+    required_fields = [name for name, field in fields.items() if field.required]
+
+    try:
+        with job_file_storage.open(path) as csv_file:
+            lines = csv_file if six.PY2 else codecs.iterdecode(csv_file, 'utf-8-sig')
+            records = csv_records(lines, fields.keys(), required_fields)
+            result = CSVImporter(model_form).run(records, skip=skip, progress=lambda r: job.set_progress(r.created))
+    finally:
+        job_file_storage.delete(path)
+
+    msg = 'Imported {} {}'.format(result.created, model._meta.verbose_name_plural)
+    if result.created and job.user is not None:
+        UserAction.objects.log_import(job.user, ContentType.objects.get_for_model(model), msg)
+
+    return {
+        'message': msg,
+        'created': result.created,
+        'last_row': result.last_row,
+        'errors': result.errors,
+    }
+
+
+@register_job('utilities.bulk_delete')
+def bulk_delete(job, model, filter, query):
+    """
+    Delete all objects of the given model (identified by its label, e.g. "dcim.Device") matching the given query
+    string, as interpreted by the given FilterSet (see BulkDeleteView). Objects are deleted in chunks, and the number
+    deleted is reported as the job's progress.
+    """
+    model = apps.get_model(model)
+    queryset = import_string(filter)(QueryDict(query), model.objects.all()).qs
+    job.set_progress(0, queryset.count())
+
+    deleted_count = delete_in_chunks(queryset, progress=job.set_progress)
+
+    msg = 'Deleted {} {}'.format(deleted_count, model._meta.verbose_name_plural)
+    if job.user is not None:
+        UserAction.objects.log_bulk_delete(job.user, ContentType.objects.get_for_model(model), msg)
+
+    return {
+        'message': msg,
+        'deleted': deleted_count,
+    }
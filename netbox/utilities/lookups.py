@@ -0,0 +1,19 @@
+from __future__ import unicode_literals
+
+from django.db.models.lookups import IContains
+
+
+class ILikeContains(IContains):
+    """
+    Express case-insensitive containment (icontains) using PostgreSQL's ILIKE operator. Django's default form,
+    UPPER(column) LIKE UPPER(pattern), cannot make use of an index on the column, whereas ILIKE can use a trigram index
+    (one created with the gin_trgm_ops operator class).
+    """
+
+    def as_postgresql(self, compiler, connection):
+        if not self.rhs_is_direct_value() or self.bilateral_transforms:
+            return self.as_sql(compiler, connection)
+        lhs_sql, params = compiler.compile(self.lhs)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        params.extend(rhs_params)
+        return '{} ILIKE {}'.format(lhs_sql, rhs_sql), params
@@ -0,0 +1,85 @@
+from __future__ import unicode_literals
+from importlib import import_module
+import io
+import six
+
+from django import forms
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+
+from extras.models import UserAction
+from utilities.csvimport import CSVImporter
+from utilities.forms import csv_records
+
+
+class Command(BaseCommand):
+    help = "Import objects in bulk from a CSV file, using the same format and validation as the web UI"
+
+    def add_arguments(self, parser):
+        parser.add_argument('form', help="The CSV form used to import each object (e.g. dcim.DeviceCSVForm)")
+        parser.add_argument('filename', help="Path to the CSV file (UTF-8 encoded)")
+        parser.add_argument('--chunk-size', dest='chunk_size', type=int,
+                            help="Number of rows to validate and save per transaction (default: CSV_IMPORT_CHUNK_SIZE)")
+        parser.add_argument('--skip', dest='skip', type=int, default=0,
+                            help="Skip this many rows (e.g. to resume an interrupted import)")
+        parser.add_argument('--skip-invalid', dest='skip_invalid', action='store_true', default=False,
+                            help="Report and skip invalid rows instead of stopping")
+        parser.add_argument('-u', '--user', dest='user', help="Record the import in the user action log as this user")
+
+    def handle(self, *args, **options):
+
+        # Resolve the model form (e.g. "dcim.DeviceCSVForm")
+        try:
+            app_label, form_name = options['form'].split('.')
+            model_form = getattr(import_module('{}.forms'.format(app_label)), form_name)
+        except (ValueError, ImportError, AttributeError):
+            raise CommandError("Invalid form: {}".format(options['form']))
+        if not isinstance(model_form, type) or not issubclass(model_form, forms.ModelForm):
+            raise CommandError("{} is not a model form.".format(options['form']))
+        model = model_form._meta.model
+        if app_label == 'secrets':
+            raise CommandError(
+                "Secrets must be encrypted using a user's key and cannot be imported from the command line."
+            )
+
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError("User {} not found.".format(options['user']))
+
+        fields = model_form().fields
+        required_fields = [name for name, field in fields.items() if field.required]
+
+        def progress(result):
+            self.stdout.write("Imported {} {} (row {})".format(
+                result.created, model._meta.verbose_name_plural, result.last_row
+            ))
+
+        importer = CSVImporter(model_form, chunk_size=options['chunk_size'], skip_invalid=options['skip_invalid'])
+        with io.open(options['filename'], encoding='utf-8-sig', newline='') as csv_file:
+            # Python 2's csv module has problems with Unicode
+            lines = (line.encode('utf-8') for line in csv_file) if six.PY2 else csv_file
+            try:
+                records = csv_records(lines, fields.keys(), required_fields)
+            except forms.ValidationError as e:
+                raise CommandError(' '.join(e.messages))
+            result = importer.run(records, skip=options['skip'], progress=progress)
+
+        for error in result.errors:
+            self.stderr.write(error)
+
+        if result.created and user is not None:
+            UserAction.objects.log_import(user, ContentType.objects.get_for_model(model), 'Imported {} {}'.format(
+                result.created, model._meta.verbose_name_plural
+            ))
+
+        if result.errors and not options['skip_invalid']:
+            raise CommandError(
+                "Import stopped. Rows up to and including row {0} have been saved; to resume the import, correct the "
+                "errors and use --skip {0}.".format(result.last_row)
+            )
+
+        self.stdout.write("Finished.")
@@ -0,0 +1,122 @@
+from __future__ import unicode_literals
+from collections import OrderedDict
+import threading
+
+
+# The upper bounds (in seconds) of the buckets of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class ViewMetrics(object):
+    """
+    The measurements aggregated from the sampled requests handled by a view (for a particular HTTP method).
+
+    duration_counts: The number of requests within each bucket of DURATION_BUCKETS, followed by the number exceeding
+                     the last bucket
+    duration: The total time taken to handle the requests
+    queries: The total number of database queries executed
+    query_duration: The total time taken by database queries
+    serializer_duration: The total time taken to serialize API responses (paginated API views only)
+    """
+    __slots__ = ('duration_counts', 'duration', 'queries', 'query_duration', 'serializer_duration')
+
+    def __init__(self):
+        self.duration_counts = [0] * (len(DURATION_BUCKETS) + 1)
+        self.duration = 0.0
+        self.queries = 0
+        self.query_duration = 0.0
+        self.serializer_duration = 0.0
+
+    def copy(self):
+        metrics = ViewMetrics()
+        metrics.duration_counts = list(self.duration_counts)
+        for attr in ('duration', 'queries', 'query_duration', 'serializer_duration'):
+            setattr(metrics, attr, getattr(self, attr))
+        return metrics
+
+
+class MetricsRegistry(object):
+    """
+    The metrics recorded by the current process, keyed by view name and HTTP method.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, method, duration, queries=0, query_duration=0.0, serializer_duration=0.0):
+        bucket = len(DURATION_BUCKETS)
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                bucket = i
+                break
+        with self._lock:
+            metrics = self._views.get((view, method))
+            if metrics is None:
+                metrics = self._views[(view, method)] = ViewMetrics()
+            metrics.duration_counts[bucket] += 1
+            metrics.duration += duration
+            metrics.queries += queries
+            metrics.query_duration += query_duration
+            metrics.serializer_duration += serializer_duration
+
+    def snapshot(self):
+        """
+        Return an OrderedDict mapping each (view, method) to a copy of its ViewMetrics.
+        """
+        with self._lock:
+            return OrderedDict((key, self._views[key].copy()) for key in sorted(self._views))
+
+    def clear(self):
+        with self._lock:
+            self._views = {}
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+        """
+        views = self.snapshot()
+        lines = [
+            '# HELP netbox_request_duration_seconds The time taken to handle requests.',
+            '# TYPE netbox_request_duration_seconds histogram',
+        ]
+        for (view, method), metrics in views.items():
+            labels = _format_labels(view=view, method=method)
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ('+Inf',), metrics.duration_counts):
+                cumulative += count
+                lines.append('netbox_request_duration_seconds_bucket{} {}'.format(
+                    _format_labels(view=view, method=method, le=bound), cumulative
+                ))
+            lines.append('netbox_request_duration_seconds_sum{} {!r}'.format(labels, metrics.duration))
+            lines.append('netbox_request_duration_seconds_count{} {}'.format(labels, cumulative))
+
+        for name, attr, description in (
+            ('netbox_request_queries_total', 'queries', 'The number of database queries executed.'),
+            ('netbox_request_query_duration_seconds_total', 'query_duration', 'The time taken by database queries.'),
+            ('netbox_api_serializer_duration_seconds_total', 'serializer_duration',
+             'The time taken to serialize paginated API responses.'),
+        ):
+            lines.append('# HELP {} {}'.format(name, description))
+            lines.append('# TYPE {} counter'.format(name))
+            for (view, method), metrics in views.items():
+                lines.append('{}{} {!r}'.format(name, _format_labels(view=view, method=method), getattr(metrics, attr)))
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{{{}}}'.format(','.join('{}="{}"'.format(name, escape(labels[name])) for name in sorted(labels)))
+
+
+def record_serializer_duration(request, duration):
+    """
+    Add to the time recorded as having been spent serializing the response to a request.
+    """
+    request.metrics_serializer_duration = getattr(request, 'metrics_serializer_duration', 0.0) + duration
+
+
+# The metrics recorded by this process
+registry = MetricsRegistry()
@@ -1,13 +1,23 @@
 from __future__ import unicode_literals
+import logging
+import random
+from timeit import default_timer
 
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.http import HttpResponseRedirect
 from django.conf import settings
 from django.urls import reverse
 
+from extras.models import UserAction
+from .metrics import registry
+
 
 BASE_PATH = getattr(settings, 'BASE_PATH', False)
 LOGIN_REQUIRED = getattr(settings, 'LOGIN_REQUIRED', False)
 
+logger = logging.getLogger(__name__)
+
 
 class LoginRequiredMiddleware(object):
     """
@@ -18,10 +28,11 @@ class LoginRequiredMiddleware(object):
 
     def __call__(self, request):
         if LOGIN_REQUIRED and not request.user.is_authenticated():
-            # Redirect unauthenticated requests to the login page. API requests are exempt from redirection as the API
-            # performs its own authentication.
+            # Redirect unauthenticated requests to the login page. API and metrics requests are exempt from
+            # redirection as they perform their own authentication (see netbox.views.MetricsView).
             api_path = reverse('api-root')
-            if not request.path_info.startswith(api_path) and request.path_info != settings.LOGIN_URL:
+            exempt_paths = [settings.LOGIN_URL, reverse('metrics')]
+            if not request.path_info.startswith(api_path) and request.path_info not in exempt_paths:
                 return HttpResponseRedirect('{}?next={}'.format(settings.LOGIN_URL, request.path_info))
         return self.get_response(request)
 
@@ -39,3 +50,71 @@ class APIVersionMiddleware(object):
         if request.path_info.startswith(api_path):
             response['API-Version'] = settings.REST_FRAMEWORK_VERSION
         return response
+
+
+class UserActionMiddleware(object):
+    """
+    Buffer the user actions logged while handling a request, writing them using a single query once the response has
+    been sent (when it is closed).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        UserAction.objects.start_buffering()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            UserAction.objects.flush()
+            raise
+        response._closable_objects.append(UserActionFlusher())
+        return response
+
+
+class UserActionFlusher(object):
+    """
+    Writes the buffered user actions when closed by the response.
+    """
+    def close(self):
+        try:
+            UserAction.objects.flush()
+        except Exception:
+            logger.exception("Failed to record user actions")
+
+
+class MetricsMiddleware(object):
+    """
+    If METRICS_ENABLED is True, record the duration, database queries and (for paginated API views) serialization time
+    of a sample of requests, by view. Database queries are counted using the debug cursor, for sampled requests only.
+    The metrics are exposed at /metrics (see netbox.views.MetricsView).
+    """
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+
+        force_debug_cursor = connection.force_debug_cursor
+        connection.force_debug_cursor = True
+        query_offset = len(connection.queries_log)
+        start = default_timer()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = default_timer() - start
+            connection.force_debug_cursor = force_debug_cursor
+        queries = list(connection.queries_log)[query_offset:]
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        registry.record(
+            view=resolver_match.view_name if resolver_match else '',
+            method=request.method,
+            duration=duration,
+            queries=len(queries),
+            query_duration=sum(float(query['time']) for query in queries),
+            serializer_duration=getattr(request, 'metrics_serializer_duration', 0.0),
+        )
+        return response
@@ -1,15 +1,109 @@
 from __future__ import unicode_literals
 
+import json
+
+import six
 from django.conf import settings
-from django.core.paginator import Paginator, Page
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def _explain_rows(queryset):
+    """
+    Return the PostgreSQL query planner's estimate of the number of rows returned by a queryset.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) {}'.format(sql), params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, six.string_types):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _table_rows(queryset):
+    """
+    Return the number of rows in the table of an unfiltered queryset, as last recorded in pg_class by VACUUM or
+    ANALYZE, or None if the table has not been analyzed.
+    """
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] <= 0:
+        return None
+    return int(row[0])
+
+
+def estimate_count(queryset, threshold=None):
+    """
+    Count the objects in a queryset without scanning all of them. Returns a tuple of the count and a boolean indicating
+    whether it is an estimate.
+
+    Objects are counted exactly up to the threshold (COUNT_ESTIMATE_THRESHOLD by default). Beyond it, the count of an
+    unfiltered queryset is taken from the table statistics in pg_class, and that of a filtered queryset from the row
+    estimate of the query planner (EXPLAIN). A threshold of 0 or None disables estimation.
+    """
+    if threshold is None:
+        threshold = getattr(settings, 'COUNT_ESTIMATE_THRESHOLD', 10000)
+    if not threshold:
+        return queryset.count(), False
+
+    queryset = queryset.order_by().values('pk')
+    query = queryset.query
+    unfiltered = not query.where and not query.distinct and not getattr(query, 'combinator', None)
+
+    # The table statistics are cheaper to consult than even a bounded count
+    if unfiltered:
+        count = _table_rows(queryset)
+        if count is not None and count > threshold:
+            return count, True
+
+    count = queryset[:threshold + 1].count()
+    if count <= threshold:
+        return count, False
+
+    # The planner's estimate may be stale; never report fewer objects than were actually counted.
+    return max(_explain_rows(queryset), count), True
 
 
 class EnhancedPaginator(Paginator):
+    """
+    A Paginator which accepts a precomputed (and possibly estimated) count of the objects in its list. An estimated
+    count is used only to describe the number of objects: any page number may be requested, and whether a page is
+    followed by another is determined by retrieving one extra object.
+    """
 
-    def __init__(self, object_list, per_page, **kwargs):
+    def __init__(self, object_list, per_page, count=None, count_is_estimate=False, **kwargs):
         if not isinstance(per_page, int) or per_page < 1:
             per_page = getattr(settings, 'PAGINATE_COUNT', 50)
         super(EnhancedPaginator, self).__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+        self.count_is_estimate = count_is_estimate
+
+    def validate_number(self, number):
+        if not self.count_is_estimate:
+            return super(EnhancedPaginator, self).validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if not self.count_is_estimate:
+            return super(EnhancedPaginator, self).page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        # Retrieve one extra object to determine whether another page follows
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        page = self._get_page(object_list[:self.per_page], number, self)
+        page.next_page_exists = len(object_list) > self.per_page
+        return page
 
     def _get_page(self, *args, **kwargs):
         return EnhancedPage(*args, **kwargs)
@@ -17,16 +111,41 @@ class EnhancedPaginator(Paginator):
 
 class EnhancedPage(Page):
 
+    # Whether another page follows (determined only where the paginator's count is an estimate)
+    next_page_exists = False
+
+    def has_next(self):
+        if self.paginator.count_is_estimate:
+            return self.next_page_exists
+        return super(EnhancedPage, self).has_next()
+
+    def start_index(self):
+        if self.paginator.count_is_estimate:
+            return (self.number - 1) * self.paginator.per_page + 1 if self.object_list else 0
+        return super(EnhancedPage, self).start_index()
+
+    def end_index(self):
+        if self.paginator.count_is_estimate:
+            return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+        return super(EnhancedPage, self).end_index()
+
     def smart_pages(self):
+        n = self.number
+
+        # If the count is an estimate, the last page is unknown. Show the first page, the previous two pages, the
+        # current page, and the next page (if any).
+        if self.paginator.count_is_estimate:
+            pages_wanted = [1, n - 2, n - 1, n, n + 1 if self.has_next() else n]
+            page_list = sorted(set(p for p in pages_wanted if p >= 1))
 
         # When dealing with five or fewer pages, simply return the whole list.
-        if self.paginator.num_pages <= 5:
+        elif self.paginator.num_pages <= 5:
             return self.paginator.page_range
 
         # Show first page, last page, next/previous two pages, and current page
-        n = self.number
-        pages_wanted = [1, n - 2, n - 1, n, n + 1, n + 2, self.paginator.num_pages]
-        page_list = sorted(set(self.paginator.page_range).intersection(pages_wanted))
+        else:
+            pages_wanted = [1, n - 2, n - 1, n, n + 1, n + 2, self.paginator.num_pages]
+            page_list = sorted(set(self.paginator.page_range).intersection(pages_wanted))
 
         # Insert skip markers
         skip_pages = [x[1] for x in zip(page_list[:-1], page_list[1:]) if (x[1] - x[0] != 1)]
@@ -34,3 +153,88 @@ class EnhancedPage(Page):
             page_list.insert(page_list.index(i), False)
 
         return page_list
+
+
+class KeysetPaginator(object):
+    """
+    Paginate a queryset by primary key ("keyset" pagination) rather than by offset. Each page is retrieved by
+    filtering on the primary key of the last (or first) object of the adjacent page, so the cost of retrieving a page
+    does not grow with its depth. Pages are addressed by a cursor: "<pk>" selects the objects following the given
+    primary key, and "-<pk>" selects those preceding it.
+    """
+
+    def __init__(self, queryset, per_page):
+        if not isinstance(per_page, int) or per_page < 1:
+            per_page = getattr(settings, 'PAGINATE_COUNT', 50)
+        self.queryset = queryset
+        self.per_page = per_page
+
+    @cached_property
+    def _count(self):
+        return estimate_count(self.queryset)
+
+    @property
+    def count(self):
+        return self._count[0]
+
+    @property
+    def count_is_estimate(self):
+        return self._count[1]
+
+    def parse_cursor(self, cursor):
+        """
+        Return a tuple of (reverse, pk) for the given cursor. An empty or invalid cursor selects the first page.
+        """
+        if not cursor:
+            return False, None
+        reverse = cursor.startswith('-')
+        try:
+            pk = self.queryset.model._meta.pk.to_python(cursor[1:] if reverse else cursor)
+        except ValidationError:
+            return False, None
+        return reverse, pk
+
+    def page(self, cursor=None):
+        reverse, pk = self.parse_cursor(cursor)
+
+        queryset = self.queryset
+        if pk is not None:
+            queryset = queryset.filter(pk__lt=pk) if reverse else queryset.filter(pk__gt=pk)
+
+        # Retrieve one extra object to determine whether another page follows
+        object_list = list(queryset.order_by('-pk' if reverse else 'pk')[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+
+        if reverse:
+            return KeysetPage(object_list[::-1], self, has_previous=has_more, has_next=True)
+        return KeysetPage(object_list, self, has_previous=pk is not None, has_next=has_more)
+
+
+class KeysetPage(object):
+
+    def __init__(self, object_list, paginator, has_previous, has_next):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    @property
+    def previous_cursor(self):
+        return '-{}'.format(self.object_list[0].pk) if self.has_previous() else None
+
+    @property
+    def next_cursor(self):
+        return '{}'.format(self.object_list[-1].pk) if self.has_next() else None
@@ -0,0 +1,30 @@
+from __future__ import unicode_literals
+
+from django.db.models.signals import post_save
+
+
+# The post_save receivers connected to each model by connect_post_save(), mapped to whether they may be skipped for
+# objects created using bulk_create() (see utilities.csvimport.CSVImporter)
+POST_SAVE_RECEIVERS = {}
+
+
+def connect_post_save(receiver, sender, bulk_create_safe=False):
+    """
+    Connect a post_save receiver to a model. A receiver is safe for bulk creation if its work is unnecessary for newly
+    created objects, or is performed separately for objects created in bulk (see extras.signals.bulk_created()).
+    """
+    post_save.connect(receiver, sender=sender)
+    receivers = POST_SAVE_RECEIVERS.setdefault(sender, {})
+    receivers[receiver] = receivers.get(receiver, True) and bulk_create_safe
+
+
+def can_skip_post_save(model):
+    """
+    Return True if no post_save receiver of a model needs to be called for objects created in bulk. If the model has
+    any receiver which was not connected by connect_post_save() (including a receiver connected to all senders), its
+    receivers are assumed to be unsafe.
+    """
+    receivers = POST_SAVE_RECEIVERS.get(model, {})
+    if len(post_save._live_receivers(model)) != len(receivers):
+        return False
+    return all(receivers.values())
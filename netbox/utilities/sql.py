@@ -1,6 +1,7 @@
 from __future__ import unicode_literals
 
 from django.db import connections, models
+from django.db.models import Subquery
 from django.db.models.sql.compiler import SQLCompiler
 
 
@@ -32,3 +33,14 @@ class NullsFirstQuerySet(models.QuerySet):
     def __init__(self, model=None, query=None, using=None, hints=None):
         super(NullsFirstQuerySet, self).__init__(model, query, using, hints)
         self.query = query or NullsFirstQuery(self.model)
+
+
+class SubqueryCount(Subquery):
+    """
+    Count the rows returned by a subquery (which may reference the outer query using OuterRef), e.g. to annotate each
+    object with the number of related objects without a join and GROUP BY per relation.
+    """
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+
+    def __init__(self, queryset, **extra):
+        super(SubqueryCount, self).__init__(queryset.order_by(), output_field=models.IntegerField(), **extra)
@@ -1,6 +1,12 @@
 from __future__ import unicode_literals
 import six
 
+from django.db import transaction
+from django.db.models import QuerySet
+from django.template import VariableDoesNotExist
+from django.template.defaulttags import ForNode
+from django.utils.encoding import force_text
+
 
 def csv_format(data):
     """
@@ -37,3 +43,126 @@ def foreground_color(bg_color):
         return '000000'
     else:
         return 'ffffff'
+
+
+def render_stream(template, context):
+    """
+    Render a Template, yielding its output in pieces rather than as a single string. Each top-level {% for %} loop is
+    rendered one iteration at a time, so that the output of a loop over a large queryset is never held in memory in
+    full. (Loops which are nested within other tags are rendered as a whole.)
+    """
+    context.render_context.push()
+    try:
+        with context.bind_template(template):
+            context.template_name = template.name
+            for node in template.nodelist:
+                if isinstance(node, ForNode):
+                    for output in _render_for_node(node, context):
+                        yield output
+                else:
+                    yield force_text(node.render_annotated(context))
+    finally:
+        context.render_context.pop()
+
+
+def _render_for_node(node, context):
+    """
+    Yield the output of a ForNode one iteration at a time (mirroring ForNode.render()).
+    """
+    parentloop = context['forloop'] if 'forloop' in context else {}
+    with context.push():
+        try:
+            values = node.sequence.resolve(context, True)
+        except VariableDoesNotExist:
+            values = []
+        if values is None:
+            values = []
+        # A QuerySet is counted and its objects retrieved in batches, rather than evaluating it in full. Other objects
+        # which provide their length (e.g. a CustomFieldQueryset) are iterated lazily.
+        if isinstance(values, QuerySet) and not node.is_reversed:
+            len_values = values.count()
+            if not values._prefetch_related_lookups:
+                values = values.iterator()
+        else:
+            if node.is_reversed or not hasattr(values, '__len__'):
+                values = list(values)
+            len_values = len(values)
+        if len_values < 1:
+            yield force_text(node.nodelist_empty.render(context))
+            return
+        if node.is_reversed:
+            values = reversed(values)
+
+        num_loopvars = len(node.loopvars)
+        loop_dict = context['forloop'] = {'parentloop': parentloop}
+        for i, item in enumerate(values):
+            loop_dict['counter0'] = i
+            loop_dict['counter'] = i + 1
+            loop_dict['revcounter'] = len_values - i
+            loop_dict['revcounter0'] = len_values - i - 1
+            loop_dict['first'] = (i == 0)
+            loop_dict['last'] = (i == len_values - 1)
+
+            if num_loopvars > 1:
+                try:
+                    len_item = len(item)
+                except TypeError:
+                    len_item = 1
+                if num_loopvars != len_item:
+                    raise ValueError("Need {} values to unpack in for loop; got {}.".format(num_loopvars, len_item))
+                with context.push(**dict(zip(node.loopvars, item))):
+                    yield ''.join(force_text(n.render_annotated(context)) for n in node.nodelist_loop)
+            else:
+                context[node.loopvars[0]] = item
+                yield ''.join(force_text(n.render_annotated(context)) for n in node.nodelist_loop)
+
+
+def delete_in_chunks(queryset, chunk_size=1000, progress=None):
+    """
+    Delete the objects in a QuerySet in chunks of `chunk_size`, each in its own transaction, to limit the time for which
+    rows are locked. `progress` is called with the number of objects deleted so far after each chunk. Returns the total
+    number of objects deleted. If a chunk cannot be deleted (e.g. due to a ProtectedError), the exception is raised and
+    any preceding chunks remain deleted.
+    """
+    model = queryset.model
+    pk_queryset = queryset.order_by().values_list('pk', flat=True)
+    deleted_count = 0
+
+    while True:
+        pk_list = list(pk_queryset[:chunk_size])
+        if not pk_list:
+            break
+        with transaction.atomic():
+            deleted_count += model.objects.filter(pk__in=pk_list).delete()[1].get(model._meta.label, 0)
+        if progress is not None:
+            progress(deleted_count)
+
+    return deleted_count
+
+
+def update_in_chunks(queryset, values, chunk_size=1000, callback=None):
+    """
+    Update the objects in a QuerySet with the given field values (if any) in chunks of `chunk_size` (ordered by primary
+    key), within a single transaction. `callback` is called with the list of primary keys in each chunk once it has been
+    updated. Each chunk is identified before it is updated, so that every object is updated exactly once even where the
+    update removes objects from the QuerySet. Returns the total number of objects updated.
+    """
+    model = queryset.model
+    pk_queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    updated_count = 0
+
+    with transaction.atomic():
+        while True:
+            pk_list = list(pk_queryset[:chunk_size])
+            if not pk_list:
+                break
+            if values:
+                updated_count += model.objects.filter(pk__in=pk_list).update(**values)
+            else:
+                updated_count += len(pk_list)
+            if callback is not None:
+                callback(pk_list)
+            # Objects already updated precede the remainder of the selection, whether or not they still match it
+            pk_queryset = queryset.order_by('pk').filter(pk__gt=pk_list[-1]).values_list('pk', flat=True)
+
+    return updated_count
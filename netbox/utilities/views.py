@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 from collections import OrderedDict
+import codecs
+import six
 
 from django_tables2 import RequestConfig
 
@@ -9,8 +11,10 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
 from django.db import transaction, IntegrityError
 from django.db.models import ProtectedError
-from django.forms import CharField, Form, ModelMultipleChoiceField, MultipleHiddenInput, TypedChoiceField
-from django.http import HttpResponse
+from django.forms import (
+    CharField, FileField, Form, IntegerField, ModelMultipleChoiceField, MultipleHiddenInput, TypedChoiceField,
+)
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template import TemplateSyntaxError
 from django.urls import reverse
@@ -19,16 +23,32 @@ from django.utils.http import is_safe_url
 from django.utils.safestring import mark_safe
 from django.views.generic import View
 
-from extras.models import CustomField, CustomFieldValue, ExportTemplate, UserAction
-from utilities.forms import BootstrapMixin, CSVDataField
+from extras.models import (
+    CUSTOMFIELDVALUE_UPSERT_CHUNK_SIZE, CustomField, CustomFieldValue, ExportTemplate, Job, UserAction,
+)
+from extras.choicecounts import invalidate_choice_counts
+from extras.counters import invalidate_counters
+from extras.rollups import ROLLUP_MODELS, invalidate_stats
+from extras.search import SEARCH_INDEX, update_search_index
+from utilities.forms import BootstrapMixin, CSVDataField, csv_records
+from .csvimport import CSVImporter
 from .error_handlers import handle_protectederror
 from .forms import ConfirmationForm
-from .paginator import EnhancedPaginator
+from .jobs import save_job_file
+from .paginator import EnhancedPaginator, KeysetPaginator, estimate_count
+from .utils import delete_in_chunks, update_in_chunks
+
+
+# The number of rows written to a streamed CSV export at a time
+CSV_EXPORT_CHUNK_SIZE = 1000
 
 
 class CustomFieldQueryset:
     """
-    Annotate custom fields on objects within a QuerySet.
+    Annotate custom fields (if any) on objects within a QuerySet. Objects are retrieved from the database in batches
+    using iterator() (unless related objects are to be prefetched), and their custom field values are read from each
+    object's custom_field_data. Other QuerySet methods are available on the wrapper; those returning a QuerySet (e.g.
+    all() or filter()) return a plain QuerySet, without custom field annotation.
     """
 
     def __init__(self, queryset, custom_fields):
@@ -36,10 +56,34 @@ class CustomFieldQueryset:
         self.custom_fields = custom_fields
 
     def __iter__(self):
-        for obj in self.queryset:
-            values_dict = {cfv.field_id: cfv.value for cfv in obj.custom_field_values.all()}
-            obj.custom_fields = OrderedDict([(field, values_dict.get(field.pk)) for field in self.custom_fields])
-            yield obj
+        # iterator() cannot be used with prefetch_related()
+        objects = self.queryset if self.queryset._prefetch_related_lookups else self.queryset.iterator()
+        for obj in objects:
+            yield self._annotate(obj)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, k):
+        result = self.queryset[k]
+        if isinstance(k, slice):
+            return [self._annotate(obj) for obj in result]
+        return self._annotate(result)
+
+    def __getattr__(self, name):
+        if name == 'queryset':
+            raise AttributeError(name)
+        return getattr(self.queryset, name)
+
+    def _annotate(self, obj):
+        if self.custom_fields:
+            obj.custom_fields = OrderedDict([
+                (field, field.value_from_data(obj.custom_field_data)) for field in self.custom_fields
+            ])
+        return obj
+
+    def count(self):
+        return self.queryset.count()
 
 
 class GetReturnURLMixin(object):
@@ -68,12 +112,14 @@ class ObjectListView(View):
     filter_form: The form used to render filter options
     table: The django-tables2 Table used to render the objects list
     template_name: The name of the template
+    keyset_pagination: Paginate by primary key rather than by offset (for very large tables)
     """
     queryset = None
     filter = None
     filter_form = None
     table = None
     template_name = None
+    keyset_pagination = False
 
     def get(self, request):
 
@@ -83,16 +129,13 @@ class ObjectListView(View):
         if self.filter:
             self.queryset = self.filter(request.GET, self.queryset).qs
 
-        # If this type of object has one or more custom fields, prefetch any relevant custom field values
-        custom_fields = CustomField.objects.filter(obj_type=ContentType.objects.get_for_model(model))\
-            .prefetch_related('choices')
-        if custom_fields:
-            self.queryset = self.queryset.prefetch_related('custom_field_values')
+        # Retrieve any custom fields which apply to this type of object (for export templates)
+        custom_fields = CustomField.objects.get_for_model(model)
 
         # Check for export template rendering
         if request.GET.get('export'):
             et = get_object_or_404(ExportTemplate, content_type=object_ct, name=request.GET.get('export'))
-            queryset = CustomFieldQueryset(self.queryset, custom_fields) if custom_fields else self.queryset
+            queryset = CustomFieldQueryset(self.queryset, custom_fields)
             try:
                 response = et.to_response(context_dict={'queryset': queryset},
                                           filename='netbox_{}'.format(model._meta.verbose_name_plural))
@@ -102,11 +145,8 @@ class ObjectListView(View):
                                .format(et.name))
         # Fall back to built-in CSV export
         elif 'export' in request.GET and hasattr(model, 'to_csv'):
-            headers = getattr(model, 'csv_headers', None)
-            output = ','.join(headers) + '\n' if headers else ''
-            output += '\n'.join([obj.to_csv() for obj in self.queryset])
-            response = HttpResponse(
-                output,
+            response = StreamingHttpResponse(
+                self.stream_csv(model),
                 content_type='text/csv'
             )
             response['Content-Disposition'] = 'attachment; filename="netbox_{}.csv"'\
@@ -120,20 +160,35 @@ class ObjectListView(View):
         perm_base_name = '{}.{{}}_{}'.format(model._meta.app_label, model._meta.model_name)
         permissions = {p: request.user.has_perm(perm_base_name.format(p)) for p in ['add', 'change', 'delete']}
 
-        # Construct the table based on the user's permissions
-        table = self.table(self.queryset)
+        # Construct the table based on the user's permissions. With keyset pagination, only the requested page of
+        # objects is retrieved, and column ordering is disabled (objects are always ordered by primary key).
+        if self.keyset_pagination:
+            try:
+                per_page = int(request.GET.get('per_page', settings.PAGINATE_COUNT))
+            except ValueError:
+                per_page = settings.PAGINATE_COUNT
+            keyset_page = KeysetPaginator(self.queryset, per_page).page(request.GET.get('cursor'))
+            table = self.table(keyset_page.object_list, orderable=False)
+        else:
+            keyset_page = None
+            table = self.table(self.queryset)
         if 'pk' in table.base_columns and (permissions['change'] or permissions['delete']):
             table.columns.show('pk')
 
-        # Apply the request context
-        paginate = {
-            'klass': EnhancedPaginator,
-            'per_page': request.GET.get('per_page', settings.PAGINATE_COUNT)
-        }
-        RequestConfig(request, paginate).configure(table)
+        # Apply the request context. The count of very large querysets is estimated.
+        if keyset_page is None:
+            count, count_is_estimate = estimate_count(self.queryset)
+            paginate = {
+                'klass': EnhancedPaginator,
+                'per_page': request.GET.get('per_page', settings.PAGINATE_COUNT),
+                'count': count,
+                'count_is_estimate': count_is_estimate,
+            }
+            RequestConfig(request, paginate).configure(table)
 
         context = {
             'table': table,
+            'keyset_page': keyset_page,
             'permissions': permissions,
             'filter_form': self.filter_form(request.GET, label_suffix='') if self.filter_form else None,
             'export_templates': ExportTemplate.objects.filter(content_type=object_ct),
@@ -146,6 +201,25 @@ class ObjectListView(View):
         # .all() is necessary to avoid caching queries
         return self.queryset.all()
 
+    def stream_csv(self, model):
+        """
+        Yield the CSV representation of the queryset in chunks. Objects are retrieved with iterator() (which fetches
+        them from the database in batches), along with the related objects declared by the model's csv_related_fields.
+        """
+        headers = getattr(model, 'csv_headers', None)
+        if headers:
+            yield ','.join(headers) + '\n'
+
+        queryset = self.queryset.select_related(*getattr(model, 'csv_related_fields', []))
+        rows = []
+        for obj in queryset.iterator():
+            rows.append(obj.to_csv())
+            if len(rows) == CSV_EXPORT_CHUNK_SIZE:
+                yield '\n'.join(rows) + '\n'
+                rows = []
+        if rows:
+            yield '\n'.join(rows) + '\n'
+
     def extra_context(self):
         return {}
 
@@ -391,7 +465,28 @@ class BulkImportView(View):
         required_fields = [name for name, field in self.model_form().fields.items() if field.required]
 
         class ImportForm(BootstrapMixin, Form):
-            csv = CSVDataField(fields=fields, required_fields=required_fields)
+            csv = CSVDataField(fields=fields, required_fields=required_fields, required=False)
+            csv_file = FileField(
+                label='CSV file', required=False, help_text="Alternatively, upload a UTF-8 encoded CSV file"
+            )
+            skip_rows = IntegerField(
+                min_value=0, required=False, help_text="Skip this many rows (e.g. to resume an interrupted import)"
+            )
+
+            def clean(self):
+                if self.cleaned_data.get('csv') and self.cleaned_data.get('csv_file'):
+                    raise ValidationError("Enter CSV data or upload a file, not both.")
+                if not self.cleaned_data.get('csv') and not self.cleaned_data.get('csv_file'):
+                    raise ValidationError("Enter CSV data or upload a file.")
+                # Headers are read (and validated) from an uploaded file up front; its rows are streamed on import
+                if self.cleaned_data.get('csv_file'):
+                    csv_file = self.cleaned_data['csv_file']
+                    lines = csv_file if six.PY2 else codecs.iterdecode(csv_file, 'utf-8-sig')
+                    try:
+                        self.cleaned_data['csv'] = csv_records(lines, fields, required_fields)
+                    except ValidationError as e:
+                        self.add_error('csv_file', e)
+                return self.cleaned_data
 
         return ImportForm(*args, **kwargs)
 
@@ -412,40 +507,56 @@ class BulkImportView(View):
 
     def post(self, request):
 
-        new_objs = []
-        form = self._import_form(request.POST)
+        model = self.model_form._meta.model
+        form = self._import_form(request.POST, request.FILES)
 
         if form.is_valid():
 
-            try:
-
-                # Iterate through CSV data and bind each row to a new model form instance.
-                with transaction.atomic():
-                    for row, data in enumerate(form.cleaned_data['csv'], start=1):
-                        obj_form = self.model_form(data)
-                        if obj_form.is_valid():
-                            obj = self._save_obj(obj_form)
-                            new_objs.append(obj)
-                        else:
-                            for field, err in obj_form.errors.items():
-                                form.add_error('csv', "Row {} {}: {}".format(row, field, err[0]))
-                            raise ValidationError("")
-
-                # Compile a table containing the imported objects
-                obj_table = self.table(new_objs)
-
-                if new_objs:
-                    msg = 'Imported {} {}'.format(len(new_objs), new_objs[0]._meta.verbose_name_plural)
-                    messages.success(request, msg)
-                    UserAction.objects.log_import(request.user, ContentType.objects.get_for_model(new_objs[0]), msg)
-
-                    return render(request, "import_success.html", {
-                        'table': obj_table,
-                        'return_url': self.default_return_url,
-                    })
-
-            except ValidationError:
-                pass
+            # Objects are saved one at a time only if the view modifies them before saving
+            save_obj = None
+            if six.get_unbound_function(type(self)._save_obj) is not six.get_unbound_function(BulkImportView._save_obj):
+                save_obj = self._save_obj
+
+            # Defer the import of an uploaded file to a background worker, if enabled
+            if settings.BACKGROUND_JOBS and form.cleaned_data['csv_file'] and save_obj is None:
+                csv_file = form.cleaned_data['csv_file']
+                csv_file.seek(0)
+                job = Job.objects.enqueue(
+                    'utilities.import_csv', user=request.user,
+                    model_form='{}.{}'.format(self.model_form.__module__, self.model_form.__name__),
+                    path=save_job_file(csv_file),
+                    skip=form.cleaned_data['skip_rows'] or 0
+                )
+                messages.info(request, 'The import of {} has been queued as job {}.'.format(
+                    model._meta.verbose_name_plural, job.pk
+                ))
+                return redirect(job.get_absolute_url())
+
+            # Validate and save the records in chunks, retaining the first chunk of new objects for display
+            importer = CSVImporter(self.model_form, save_obj=save_obj, keep_objects=settings.CSV_IMPORT_CHUNK_SIZE)
+            result = importer.run(form.cleaned_data['csv'], skip=form.cleaned_data['skip_rows'] or 0)
+
+            if result.created:
+                msg = 'Imported {} {}'.format(result.created, model._meta.verbose_name_plural)
+                UserAction.objects.log_import(request.user, ContentType.objects.get_for_model(model), msg)
+
+            if not result.errors:
+                messages.success(request, msg if result.created else 'No {} imported'.format(
+                    model._meta.verbose_name_plural
+                ))
+                return render(request, "import_success.html", {
+                    'table': self.table(result.objects),
+                    'return_url': self.default_return_url,
+                })
+
+            # Report any rows already imported, so that the import can be resumed
+            if result.created:
+                messages.warning(request, '{} before encountering an error. Rows up to and including row {} have '
+                                          'been saved; to resume the import, correct the errors and skip {} '
+                                          'rows.'.format(msg, result.last_row, result.last_row))
+            field_name = 'csv_file' if form.cleaned_data['csv_file'] else 'csv'
+            for error in result.errors:
+                form.add_error(field_name, error)
 
         return render(request, self.template_name, {
             'form': form,
@@ -455,6 +566,29 @@ class BulkImportView(View):
         })
 
 
+def get_bulk_selection(request, model, filter=None):
+    """
+    Return a QuerySet of the objects selected for a bulk operation, and whether the selection comprises all objects
+    matching the filter parameters in the query string (indicated by posting `_all`) rather than a list of primary keys.
+    The QuerySet is not evaluated, so that a bulk operation on all matching objects is executed using a subquery.
+    """
+    if request.POST.get('_all') and filter is not None:
+        filtered = filter(request.GET, model.objects.all()).qs
+        return model.objects.filter(pk__in=filtered.order_by().values('pk')), True
+    return model.objects.filter(pk__in=[int(pk) for pk in request.POST.getlist('pk')]), False
+
+
+def get_bulk_table(table, queryset, selection, select_all):
+    """
+    Return a table of the objects selected for a bulk operation, for confirmation. Only the first page of objects is
+    shown if all objects matching a filter have been selected.
+    """
+    queryset = queryset.filter(pk__in=selection.values('pk'))
+    if select_all:
+        queryset = queryset[:settings.PAGINATE_COUNT]
+    return table(queryset, orderable=False)
+
+
 class BulkEditView(View):
     """
     Edit objects in bulk.
@@ -499,13 +633,12 @@ class BulkEditView(View):
             return_url = reverse(self.default_return_url)
 
         # Are we editing *all* objects in the queryset or just a selected subset?
-        if request.POST.get('_all') and self.filter is not None:
-            pk_list = [obj.pk for obj in self.filter(request.GET, self.cls.objects.only('pk')).qs]
-        else:
-            pk_list = [int(pk) for pk in request.POST.getlist('pk')]
+        selection, select_all = get_bulk_selection(request, self.cls, self.filter)
 
         if '_apply' in request.POST:
             form = self.form(self.cls, request.POST)
+            if select_all:
+                form.fields['pk'].required = False
             if form.is_valid():
 
                 custom_fields = form.custom_fields if hasattr(form, 'custom_fields') else []
@@ -522,13 +655,31 @@ class BulkEditView(View):
                             fields_to_update[field] = None
                     elif form.cleaned_data[field] not in (None, ''):
                         fields_to_update[field] = form.cleaned_data[field]
-                updated_count = self.cls.objects.filter(pk__in=pk_list).update(**fields_to_update)
-
-                # Update custom fields for objects
-                if custom_fields:
-                    objs_updated = self.update_custom_fields(pk_list, form, custom_fields, nullified_fields)
-                    if objs_updated and not updated_count:
-                        updated_count = objs_updated
+                custom_field_values = self.get_custom_field_values(form, custom_fields, nullified_fields)
+                reindex = bool(fields_to_update) and self.cls in SEARCH_INDEX
+
+                def update_chunk(pk_list):
+                    if reindex:
+                        update_search_index(self.cls.objects.filter(pk__in=pk_list))
+                    if custom_field_values:
+                        CustomFieldValue.objects.save_values(self.cls, [
+                            (field, pk, value) for pk in pk_list for field, value in custom_field_values
+                        ])
+
+                # Where objects must be reindexed or have custom fields set, the selection is updated a chunk at a
+                # time. Each chunk is identified before it is updated, as the update may alter the selection.
+                if reindex or custom_field_values:
+                    updated_count = update_in_chunks(
+                        selection, fields_to_update, chunk_size=CUSTOMFIELDVALUE_UPSERT_CHUNK_SIZE,
+                        callback=update_chunk
+                    )
+                else:
+                    updated_count = selection.update(**fields_to_update)
+                if fields_to_update:
+                    invalidate_counters(self.cls, fields_to_update)
+                    if self.cls in ROLLUP_MODELS:
+                        invalidate_stats()
+                    invalidate_choice_counts(self.cls)
 
                 if updated_count:
                     msg = 'Updated {} {}'.format(updated_count, self.cls._meta.verbose_name_plural)
@@ -538,12 +689,14 @@ class BulkEditView(View):
 
         else:
             initial_data = request.POST.copy()
-            initial_data['pk'] = pk_list
+            if select_all:
+                initial_data.pop('pk', None)
+            else:
+                initial_data['pk'] = [obj.pk for obj in selection]
             form = self.form(self.cls, initial=initial_data)
 
         # Retrieve objects being edited
-        queryset = self.queryset or self.cls.objects.all()
-        table = self.table(queryset.filter(pk__in=pk_list), orderable=False)
+        table = get_bulk_table(self.table, self.queryset or self.cls.objects.all(), selection, select_all)
         if not table.rows:
             messages.warning(request, "No {} were selected.".format(self.cls._meta.verbose_name_plural))
             return redirect(return_url)
@@ -551,13 +704,17 @@ class BulkEditView(View):
         return render(request, self.template_name, {
             'form': form,
             'table': table,
+            'count': selection.count() if select_all else len(table.rows),
+            'select_all': select_all,
             'obj_type_plural': self.cls._meta.verbose_name_plural,
             'return_url': return_url,
         })
 
-    def update_custom_fields(self, pk_list, form, fields, nullified_fields):
-        obj_type = ContentType.objects.get_for_model(self.cls)
-        objs_updated = False
+    def get_custom_field_values(self, form, fields, nullified_fields):
+        """
+        Return a list of (CustomField, value) tuples for the given custom fields to be set on all selected objects.
+        """
+        values = []
 
         for name in fields:
 
@@ -565,42 +722,19 @@ class BulkEditView(View):
 
             # Setting the field to null
             if name in form.nullable_fields and name in nullified_fields:
-
-                # Delete all CustomFieldValues for instances of this field belonging to the selected objects.
-                CustomFieldValue.objects.filter(field=field, obj_type=obj_type, obj_id__in=pk_list).delete()
-                objs_updated = True
+                values.append((field, None))
 
             # Updating the value of the field
             elif form.cleaned_data[name] not in [None, '']:
 
                 # Check for zero value (bulk editing)
                 if isinstance(form.fields[name], TypedChoiceField) and form.cleaned_data[name] == 0:
-                    serialized_value = field.serialize_value(None)
+                    value = None
                 else:
-                    serialized_value = field.serialize_value(form.cleaned_data[name])
-
-                # Gather any pre-existing CustomFieldValues for the objects being edited.
-                existing_cfvs = CustomFieldValue.objects.filter(field=field, obj_type=obj_type, obj_id__in=pk_list)
+                    value = form.cleaned_data[name]
+                values.append((field, value))
 
-                # Determine which objects have an existing CFV to update and which need a new CFV created.
-                update_list = [cfv['obj_id'] for cfv in existing_cfvs.values()]
-                create_list = list(set(pk_list) - set(update_list))
-
-                # Creating/updating CFVs
-                if serialized_value:
-                    existing_cfvs.update(serialized_value=serialized_value)
-                    CustomFieldValue.objects.bulk_create([
-                        CustomFieldValue(field=field, obj_type=obj_type, obj_id=pk, serialized_value=serialized_value)
-                        for pk in create_list
-                    ])
-
-                # Deleting CFVs
-                else:
-                    existing_cfvs.delete()
-
-                objs_updated = True
-
-        return len(pk_list) if objs_updated else 0
+        return values
 
 
 class BulkDeleteView(View):
@@ -644,42 +778,58 @@ class BulkDeleteView(View):
             return_url = reverse(self.default_return_url)
 
         # Are we deleting *all* objects in the queryset or just a selected subset?
-        if request.POST.get('_all') and self.filter is not None:
-            pk_list = [obj.pk for obj in self.filter(request.GET, self.cls.objects.only('pk')).qs]
-        else:
-            pk_list = [int(pk) for pk in request.POST.getlist('pk')]
+        selection, select_all = get_bulk_selection(request, self.cls, self.filter)
 
         form_cls = self.get_form()
 
         if '_confirm' in request.POST:
             form = form_cls(request.POST)
+            if select_all:
+                form.fields['pk'].required = False
             if form.is_valid():
 
-                # Delete objects
-                queryset = self.cls.objects.filter(pk__in=pk_list)
+                # Defer the deletion of all matching objects to a background worker, if enabled
+                if settings.BACKGROUND_JOBS and select_all:
+                    job = Job.objects.enqueue(
+                        'utilities.bulk_delete', user=request.user, model=self.cls._meta.label,
+                        filter='{}.{}'.format(self.filter.__module__, self.filter.__name__),
+                        query=request.GET.urlencode()
+                    )
+                    messages.info(request, 'The deletion of {} has been queued as job {}.'.format(
+                        self.cls._meta.verbose_name_plural, job.pk
+                    ))
+                    return redirect(job.get_absolute_url())
+
+                # Delete objects in chunks. If a chunk is protected, any preceding chunks remain deleted.
+                progress = []
                 try:
-                    deleted_count = queryset.delete()[1][self.cls._meta.label]
+                    delete_in_chunks(selection, progress=progress.append)
                 except ProtectedError as e:
-                    handle_protectederror(list(queryset), request, e)
-                    return redirect(return_url)
+                    handle_protectederror(selection, request, e)
+                    if not progress:
+                        return redirect(return_url)
 
-                msg = 'Deleted {} {}'.format(deleted_count, self.cls._meta.verbose_name_plural)
+                msg = 'Deleted {} {}'.format(progress[-1] if progress else 0, self.cls._meta.verbose_name_plural)
                 messages.success(request, msg)
                 UserAction.objects.log_bulk_delete(request.user, ContentType.objects.get_for_model(self.cls), msg)
                 return redirect(return_url)
 
         else:
-            form = form_cls(initial={'pk': pk_list, 'return_url': return_url})
+            form = form_cls(initial={
+                'pk': [] if select_all else [obj.pk for obj in selection],
+                'return_url': return_url,
+            })
 
         # Retrieve objects being deleted
-        queryset = self.queryset or self.cls.objects.all()
-        table = self.table(queryset.filter(pk__in=pk_list), orderable=False)
+        table = get_bulk_table(self.table, self.queryset or self.cls.objects.all(), selection, select_all)
         if not table.rows:
             messages.warning(request, "No {} were selected for deletion.".format(self.cls._meta.verbose_name_plural))
             return redirect(return_url)
 
         return render(request, self.template_name, {
             'form': form,
+            'count': selection.count() if select_all else len(table.rows),
+            'select_all': select_all,
             'parent_obj': parent_obj,
             'obj_type_plural': self.cls._meta.verbose_name_plural,
             'table': table,
@@ -49,6 +49,11 @@ COMMAND="${PYTHON} netbox/manage.py migrate"
 echo "Applying database migrations ($COMMAND)..."
 eval $COMMAND
 
+# Rebuild the search index
+COMMAND="${PYTHON} netbox/manage.py rebuild_search_index"
+echo "Rebuilding the search index ($COMMAND)..."
+eval $COMMAND
+
 # Collect static files
 COMMAND="${PYTHON} netbox/manage.py collectstatic --no-input"
 echo "Collecting static files ($COMMAND)..."